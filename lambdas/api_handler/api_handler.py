@@ -1,36 +1,65 @@
+import hashlib
 import json
-import boto3
-import logging
 import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from dofs_core import (
+    ORDER_SCHEMA, ORDER_STATUSES, AdaptiveThrottle, IdempotencyStore, InvalidPageToken,
+    Overloaded, bind_invocation, compile_schema, dumps, error_code, get_client,
+    get_customer_summary, get_logger, get_order, instrumented_handler, loads,
+    query_orders_by_status, require_env
+)
+from dofs_core.queries import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 ## Testing DEMO!! ##
 ## Testing DEMO!! ##
 ## Testing DEMO!! ##
 
 # Configure logging
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger = get_logger()
 
-# Initialize AWS clients
-stepfunctions = boto3.client('stepfunctions')
+# Order pipeline mode: 'stepfunctions' (default) starts the order processing
+# workflow; 'direct' runs validation and storage in-process (see run_direct_pipeline)
+ORDER_PIPELINE_MODE = os.environ.get('ORDER_PIPELINE_MODE', 'stepfunctions')
 
+# Synchronous pre-check built from the shared order schema; full validation
+# stays in the validator step so invalid orders still fail asynchronously
+PRECHECK_FIELDS = ('customer_id',)
+precheck_order = compile_schema(ORDER_SCHEMA, fields=PRECHECK_FIELDS)
+
+# Bulk intake limits - concurrency also sizes the client's HTTP connection pool
+MAX_BULK_ORDERS = int(os.environ.get('MAX_BULK_ORDERS', '500'))
+BULK_SUBMIT_CONCURRENCY = int(os.environ.get('BULK_SUBMIT_CONCURRENCY', '16'))
+
+# Client-side backpressure for StartExecution (per container): paced by an
+# adaptive token bucket with retry and a circuit breaker; an order that can't
+# be started within START_EXECUTION_WAIT_SECONDS is buffered in the intake
+# buffer queue and started later by intake_drainer
+START_EXECUTION_RATE = float(os.environ.get('START_EXECUTION_RATE', '25'))
+START_EXECUTION_BURST = float(os.environ.get('START_EXECUTION_BURST', '50'))
+START_EXECUTION_WAIT_SECONDS = float(os.environ.get('START_EXECUTION_WAIT_SECONDS', '0.25'))
+start_execution_throttle = AdaptiveThrottle(START_EXECUTION_RATE, burst=START_EXECUTION_BURST)
+
+# Idempotency-Key header (case-insensitive): repeats of a keyed POST replay the
+# first response; order IDs and execution names are derived from the key
+IDEMPOTENCY_HEADER = 'idempotency-key'
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+ORDER_ID_NAMESPACE = uuid.UUID('6f1c3a52-8d4e-4b0f-9a37-2e5d8c41b7a9')
+
+@instrumented_handler
 def lambda_handler(event, context):
     """
     API Handler Lambda - Entry point for DOFS order processing
-    Handles both health checks and order submissions
+    Handles health checks, order submissions, order status queries and
+    customer summaries
     """
     try:
         # Parse the incoming request
         http_method = event.get('httpMethod', '')
         path = event.get('path', '')
         
-        logger.info(json.dumps({
-            'event': 'api_request_received',
-            'method': http_method,
-            'path': path,
-            'request_id': context.aws_request_id
-        }))
+        logger.annotate(method=http_method, path=path)
         
         # Health check endpoint
         if http_method == 'GET' and path == '/health':
@@ -44,9 +73,25 @@ def lambda_handler(event, context):
                 })
             }
         
+        # Order lookup endpoint
+        elif http_method == 'GET' and path.startswith('/order/'):
+            return handle_get_order(event, context)
+        
+        # Orders by status endpoint
+        elif http_method == 'GET' and path == '/orders':
+            return handle_list_orders(event, context)
+        
+        # Customer summary endpoint
+        elif http_method == 'GET' and path.startswith('/customers/') and path.endswith('/summary'):
+            return handle_get_customer_summary(event, context)
+        
         # Order submission endpoint
         elif http_method == 'POST' and path == '/order':
-            return handle_order_submission(event, context)
+            return handle_idempotent_request(event, context, handle_order_submission)
+        
+        # Bulk order submission endpoint
+        elif http_method == 'POST' and path == '/orders':
+            return handle_idempotent_request(event, context, handle_bulk_order_submission)
         
         # Invalid endpoint
         else:
@@ -57,11 +102,7 @@ def lambda_handler(event, context):
             }
             
     except Exception as e:
-        logger.error(json.dumps({
-            'event': 'api_handler_error',
-            'error': str(e),
-            'request_id': context.aws_request_id
-        }))
+        logger.error('api_handler_error', error=str(e))
         
         return {
             'statusCode': 500,
@@ -69,50 +110,120 @@ def lambda_handler(event, context):
             'body': json.dumps({'error': 'Internal server error'})
         }
 
-def handle_order_submission(event, context):
+def handle_idempotent_request(event, context, handler):
+    """
+    Run a POST handler at most once per Idempotency-Key
+    Without the header the handler just runs. With it, the key is claimed with a
+    conditional write; repeats of the same request get the recorded response
+    (Idempotent-Replayed: true), a key reused for a different request gets 422
+    and a repeat that arrives while the first is still running gets 409
+    """
+    idempotency_key = get_idempotency_key(event)
+    if idempotency_key is None:
+        return handler(event, context)
+    
+    if len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({
+                'error': f'Idempotency-Key must be at most {MAX_IDEMPOTENCY_KEY_LENGTH} characters'
+            })
+        }
+    
+    store = IdempotencyStore(require_env('IDEMPOTENCY_TABLE_NAME'))
+    request_line = f"{event.get('httpMethod')} {event.get('path')}\n{event.get('body') or ''}"
+    fingerprint = hashlib.sha256(request_line.encode('utf-8')).hexdigest()
+    
+    record = store.claim(idempotency_key, fingerprint)
+    if record is not None:
+        if record['fingerprint'] != fingerprint:
+            return {
+                'statusCode': 422,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps({'error': 'Idempotency-Key was already used for a different request'})
+            }
+        if record['response'] is None:
+            return {
+                'statusCode': 409,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps({'error': 'A request with this Idempotency-Key is still being processed'})
+            }
+        
+        logger.info('idempotent_request_replayed',
+                    path=event.get('path'), status_code=record['response']['statusCode'])
+        
+        response = record['response']
+        return {
+            **response,
+            'headers': {**response.get('headers', {}), 'Idempotent-Replayed': 'true'}
+        }
+    
+    try:
+        response = handler(event, context, idempotency_key)
+    except Exception:
+        store.release(idempotency_key)
+        raise
+    
+    # Server errors are not recorded, so the client's retry runs the request again
+    if response['statusCode'] >= 500:
+        store.release(idempotency_key)
+    else:
+        store.complete(idempotency_key, fingerprint, response)
+    return response
+
+def get_idempotency_key(event):
+    """
+    Idempotency-Key header value, or None when absent or blank
+    """
+    for name, value in (event.get('headers') or {}).items():
+        if name.lower() == IDEMPOTENCY_HEADER:
+            return (value or '').strip() or None
+    return None
+
+def handle_order_submission(event, context, idempotency_key=None):
     """
     Handle POST /order requests by starting Step Function execution
+    (or running the pipeline in-process in direct mode)
     """
     try:
-        # Parse request body
-        body = json.loads(event.get('body', '{}'))
+        # Parse request body (fractional numbers straight to Decimal)
+        body = loads(event.get('body') or '{}')
         
-        # Basic validation - just check if customer_id exists
-        if not body.get('customer_id'):
+        # Basic validation - pre-check fields (customer_id) from the shared schema
+        precheck_errors = precheck_order(body)
+        if precheck_errors:
             return {
                 'statusCode': 400,
                 'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps({'error': 'customer_id is required'})
+                'body': json.dumps({'error': precheck_errors[0]})
             }
         
-        # Get Step Function ARN from environment
-        step_function_arn = os.environ.get('STEP_FUNCTION_ARN')
-        if not step_function_arn:
-            raise ValueError('STEP_FUNCTION_ARN environment variable not set')
+        # Start Step Function execution (or run the direct pipeline)
+        execution_name = execution_name_for(context, idempotency_key)
+        body['order_id'] = order_id_for(idempotency_key)
         
-        # Start Step Function execution
-        execution_name = f"order-{context.aws_request_id}"
+        result = submit_order(body, execution_name)
         
-        response = stepfunctions.start_execution(
-            stateMachineArn=step_function_arn,
-            name=execution_name,
-            input=json.dumps(body)
-        )
+        if 'validation_errors' in result:
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps({
+                    'error': 'Order validation failed',
+                    'validation_errors': result['validation_errors']
+                })
+            }
         
-        logger.info(json.dumps({
-            'event': 'step_function_started',
-            'execution_arn': response['executionArn'],
-            'customer_id': body.get('customer_id'),
-            'request_id': context.aws_request_id
-        }))
+        logger.annotate(pipeline_mode=ORDER_PIPELINE_MODE, **result, customer_id=body.get('customer_id'))
         
-        # Return success response with execution ARN
+        # Return success response with execution ARN (or order ID in direct mode)
         return {
             'statusCode': 202,
             'headers': {'Content-Type': 'application/json'},
             'body': json.dumps({
                 'message': 'Order received and processing started',
-                'execution_arn': response['executionArn'],
+                **result,
                 'customer_id': body.get('customer_id')
             })
         }
@@ -124,14 +235,367 @@ def handle_order_submission(event, context):
             'body': json.dumps({'error': 'Invalid JSON in request body'})
         }
     except Exception as e:
-        logger.error(json.dumps({
-            'event': 'order_submission_error',
-            'error': str(e),
-            'request_id': context.aws_request_id
-        }))
+        logger.error('order_submission_error', error=str(e))
         
         return {
             'statusCode': 500,
             'headers': {'Content-Type': 'application/json'},
             'body': json.dumps({'error': 'Failed to process order'})
-        }
\ No newline at end of file
+        }
+
+def handle_bulk_order_submission(event, context, idempotency_key=None):
+    """
+    Handle POST /orders requests - accepts many orders in one request
+    Body is either a JSON array of orders or {"orders": [...]}
+    Orders are pre-checked up front, then started concurrently (in direct mode:
+    stored concurrently and enqueued with SendMessageBatch); the response
+    carries an execution ARN (order ID in direct mode) or error for every
+    order, in request order
+    """
+    try:
+        body = loads(event.get('body') or '{}')
+        orders = body.get('orders') if isinstance(body, dict) else body
+        
+        if not isinstance(orders, list) or len(orders) == 0:
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps({'error': 'orders must be a non-empty array'})
+            }
+        
+        if len(orders) > MAX_BULK_ORDERS:
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps({'error': f'At most {MAX_BULK_ORDERS} orders per request'})
+            }
+        
+        # Cheap pre-check of the whole array before any AWS call
+        results = [None] * len(orders)
+        accepted = []
+        for index, order in enumerate(orders):
+            precheck_errors = precheck_order(order)
+            if precheck_errors:
+                results[index] = {'index': index, 'error': precheck_errors[0]}
+            else:
+                order['order_id'] = order_id_for(idempotency_key, index)
+                accepted.append(index)
+        
+        def submit(index):
+            order = orders[index]
+            execution_name = execution_name_for(context, idempotency_key, index)
+            try:
+                result = submit_order(order, execution_name)
+                if 'validation_errors' in result:
+                    return {'index': index, 'error': 'Order validation failed', **result}
+                return {'index': index, **result, 'customer_id': order.get('customer_id')}
+            except Exception as e:
+                logger.error('bulk_order_submission_error', index=index, error=str(e))
+                return {'index': index, 'error': 'Failed to process order'}
+        
+        if accepted and ORDER_PIPELINE_MODE == 'direct':
+            for result in run_direct_pipeline_bulk(orders, accepted, context):
+                results[result['index']] = result
+        
+        # Fan out over the shared (thread-safe) AWS clients
+        elif accepted:
+            max_workers = min(BULK_SUBMIT_CONCURRENCY, len(accepted))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for result in executor.map(bind_invocation(submit), accepted):
+                    results[result['index']] = result
+        
+        started_count = sum(1 for result in results if 'error' not in result)
+        
+        logger.annotate(pipeline_mode=ORDER_PIPELINE_MODE, orders_count=len(orders),
+                        started_count=started_count, failed_count=len(orders) - started_count)
+        
+        return {
+            'statusCode': 202,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({
+                'message': 'Orders received and processing started',
+                'accepted_count': started_count,
+                'rejected_count': len(orders) - started_count,
+                'results': results
+            })
+        }
+        
+    except json.JSONDecodeError:
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': 'Invalid JSON in request body'})
+        }
+    except Exception as e:
+        logger.error('bulk_order_submission_error', error=str(e))
+        
+        return {
+            'statusCode': 500,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': 'Failed to process orders'})
+        }
+
+def handle_get_order(event, context):
+    """
+    Handle GET /order/{order_id} requests - the stored order, read through the
+    per-container order cache
+    """
+    order_id = (event.get('pathParameters') or {}).get('order_id') or event.get('path', '').rsplit('/', 1)[-1]
+    try:
+        order = get_order(require_env('ORDERS_TABLE_NAME'), order_id)
+        
+        if order is None:
+            return {
+                'statusCode': 404,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps({'error': 'Order not found'})
+            }
+        
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'application/json'},
+            'body': dumps(order)
+        }
+        
+    except Exception as e:
+        logger.error('order_lookup_error', order_id=order_id, error=str(e))
+        
+        return {
+            'statusCode': 500,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': 'Failed to look up order'})
+        }
+
+def handle_get_customer_summary(event, context):
+    """
+    Handle GET /customers/{customer_id}/summary requests - the customer's
+    order aggregate (counts, amounts, first / last order), one GetItem
+    """
+    customer_id = ((event.get('pathParameters') or {}).get('customer_id')
+                   or event.get('path', '')[len('/customers/'):-len('/summary')])
+    try:
+        summary = get_customer_summary(require_env('CUSTOMER_SUMMARIES_TABLE_NAME'), customer_id)
+        
+        if summary is None:
+            return {
+                'statusCode': 404,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps({'error': 'Customer not found'})
+            }
+        
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'application/json'},
+            'body': dumps(summary)
+        }
+        
+    except Exception as e:
+        logger.error('customer_summary_lookup_error', customer_id=customer_id, error=str(e))
+        
+        return {
+            'statusCode': 500,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': 'Failed to look up customer summary'})
+        }
+
+def handle_list_orders(event, context):
+    """
+    Handle GET /orders?status=...&limit=...&next_token=... requests
+    Returns one page of orders with the status; next_token (absent on the last
+    page) fetches the next one
+    """
+    params = event.get('queryStringParameters') or {}
+    status = params.get('status')
+    
+    if status not in ORDER_STATUSES:
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': f"status must be one of: {', '.join(ORDER_STATUSES)}"})
+        }
+    
+    try:
+        limit = int(params.get('limit') or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'})
+        }
+    
+    try:
+        orders, next_token = query_orders_by_status(
+            require_env('ORDERS_TABLE_NAME'), status, limit, params.get('next_token')
+        )
+        
+        body = {'orders': orders, 'count': len(orders)}
+        if next_token is not None:
+            body['next_token'] = next_token
+        
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'application/json'},
+            'body': dumps(body)
+        }
+        
+    except InvalidPageToken as e:
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': str(e)})
+        }
+    except Exception as e:
+        logger.error('order_listing_error', status=status, error=str(e))
+        
+        return {
+            'statusCode': 500,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': 'Failed to list orders'})
+        }
+
+def execution_name_for(context, idempotency_key, index=None):
+    """
+    Step Function execution name for an order: per request, or derived from the
+    Idempotency-Key so a retried request reuses the execution
+    """
+    suffix = '' if index is None else f'-{index}'
+    if idempotency_key is None:
+        return f"order-{context.aws_request_id}{suffix}"
+    digest = hashlib.sha256(idempotency_key.encode('utf-8')).hexdigest()[:40]
+    return f"order-{digest}{suffix}"
+
+def order_id_for(idempotency_key, index=None):
+    """
+    Order ID assigned at intake - a fresh UUID, or one derived from the
+    Idempotency-Key so retries store the same order instead of a duplicate
+    """
+    if idempotency_key is None:
+        return str(uuid.uuid4())
+    suffix = '' if index is None else f'#{index}'
+    return str(uuid.uuid5(ORDER_ID_NAMESPACE, f'{idempotency_key}{suffix}'))
+
+def submit_order(order, execution_name):
+    """
+    Hand one order to the configured pipeline
+    Returns {'execution_arn': ..., 'order_id': ...} (plus 'buffered': True when
+    the execution will be started by intake_drainer), {'order_id': ...} (direct
+    mode) or {'validation_errors': [...]} (direct mode, invalid order)
+    """
+    if ORDER_PIPELINE_MODE == 'direct':
+        return run_direct_pipeline(order)
+    
+    step_function_arn = require_env('STEP_FUNCTION_ARN')
+    # The execution name is fixed up front, so the ARN is known even when the
+    # execution is started later from the buffer
+    execution_arn = f"{step_function_arn.replace(':stateMachine:', ':execution:')}:{execution_name}"
+    try:
+        start_order_execution(order, execution_name, step_function_arn)
+    except Overloaded as e:
+        buffer_order(order, execution_name, str(e))
+        return {'execution_arn': execution_arn, 'order_id': order['order_id'], 'buffered': True}
+    except Exception as e:
+        # Only a keyed retry reuses a name: the execution was started by the
+        # first attempt and has already finished
+        if error_code(e) != 'ExecutionAlreadyExists':
+            raise
+    return {'execution_arn': execution_arn, 'order_id': order['order_id']}
+
+def run_direct_pipeline(order):
+    """
+    Run the order processing workflow in-process: validator.validate_order, then
+    order_storage.store_and_enqueue_order - the same steps as the Step Function
+    without the state machine and two extra Lambda hops
+    Invalid orders are rejected (ValidationFailed); storage errors are raised (StorageFailed)
+    """
+    # Imported lazily so Step Functions mode doesn't pay for them at cold start;
+    # both modules are bundled into this package by buildspec.yml
+    import validator
+    import order_storage
+    
+    validation_result = validator.validate_order(order)
+    if not validation_result['valid']:
+        return {'validation_errors': validation_result['errors']}
+    
+    stored_order = order_storage.store_and_enqueue_order(order)
+    return {'order_id': stored_order['order_id']}
+
+def run_direct_pipeline_bulk(orders, indices, context):
+    """
+    Direct mode for bulk intake: validate each order, then store the valid ones
+    concurrently and enqueue them together with SendMessageBatch
+    Returns one result per index
+    """
+    import validator
+    import order_storage
+    
+    results = []
+    valid_indices = []
+    for index in indices:
+        try:
+            validation_result = validator.validate_order(orders[index])
+        except Exception as e:
+            # Reported in this order's slot, like the validator Lambda does,
+            # so one bad order doesn't fail the rest of the request
+            logger.error('bulk_order_validation_error', index=index, error=str(e))
+            validation_result = {'valid': False, 'errors': [f'Validation failed: {str(e)}']}
+        if validation_result['valid']:
+            valid_indices.append(index)
+        else:
+            results.append({
+                'index': index,
+                'error': 'Order validation failed',
+                'validation_errors': validation_result['errors']
+            })
+    
+    outcomes = order_storage.store_and_enqueue_orders(
+        [orders[index] for index in valid_indices],
+        max_workers=BULK_SUBMIT_CONCURRENCY
+    )
+    
+    for index, outcome in zip(valid_indices, outcomes):
+        if isinstance(outcome, Exception):
+            logger.error('bulk_order_submission_error', index=index, error=str(outcome))
+            results.append({'index': index, 'error': 'Failed to process order'})
+        else:
+            results.append({
+                'index': index,
+                'order_id': outcome['order_id'],
+                'customer_id': orders[index].get('customer_id')
+            })
+    
+    return results
+
+def start_order_execution(order, execution_name, step_function_arn):
+    """
+    Start the order processing Step Function execution for one order, under
+    the container's StartExecution throttle (raises Overloaded when there is
+    no capacity within START_EXECUTION_WAIT_SECONDS)
+    The client is shared by the bulk submission thread pool, so its connection
+    pool is sized to match
+    """
+    stepfunctions = get_client('stepfunctions', max_pool_connections=BULK_SUBMIT_CONCURRENCY)
+    return start_execution_throttle.call(
+        stepfunctions.start_execution,
+        wait_seconds=START_EXECUTION_WAIT_SECONDS,
+        stateMachineArn=step_function_arn,
+        name=execution_name,
+        input=dumps(order)
+    )
+
+def buffer_order(order, execution_name, reason):
+    """
+    Send an order whose execution could not be started now to the intake
+    buffer queue; intake_drainer starts it (same execution name) at a rate
+    the workflow sustains
+    """
+    get_client('sqs').send_message(
+        QueueUrl=require_env('INTAKE_BUFFER_QUEUE_URL'),
+        MessageBody=dumps({'execution_name': execution_name, 'order': order})
+    )
+    
+    logger.warning('order_buffered',
+                   order_id=order['order_id'], execution_name=execution_name, reason=reason,
+                   start_execution_rate=start_execution_throttle.rate,
+                   circuit_state=start_execution_throttle.breaker.state)
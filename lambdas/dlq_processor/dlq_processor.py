@@ -1,117 +1,181 @@
-import json
-import boto3
-import logging
-import os
+import random
+import time
 from datetime import datetime, timezone
+from dofs_core import (
+    decode_order_message, failed_date_bucket, get_logger, get_resource, instrumented_handler,
+    order_lane, require_env, timed
+)
 
 ## Testing CI/CD ##
 
 # Configure logging
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger = get_logger()
 
-# Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
+# source_queue of a failed order, by lane - both lanes' queues share this DLQ
+SOURCE_QUEUES = {'priority': 'priority_order_queue', 'standard': 'order_queue'}
 
+# BatchWriteItem limits and retry policy for UnprocessedItems
+MAX_BATCH_WRITE_ITEMS = 25
+MAX_BATCH_WRITE_ATTEMPTS = 5
+BATCH_WRITE_BASE_BACKOFF_SECONDS = 0.05
+
+@instrumented_handler
 def lambda_handler(event, context):
     """
     DLQ Processor Lambda - Processes messages from Dead Letter Queue
-    Stores failed orders in failed_orders DynamoDB table
+    Stores failed orders in failed_orders DynamoDB table using batched writes
+    and reports records whose write really failed back to SQS via batchItemFailures
     """
+    records = event.get('Records', [])
     try:
-        logger.info(json.dumps({
-            'event': 'dlq_processing_started',
-            'records_count': len(event.get('Records', [])),
-            'request_id': context.aws_request_id
-        }))
+        # Get table name from environment (once per invocation)
+        table_name = require_env('FAILED_ORDERS_TABLE_NAME')
         
-        # Process each DLQ record
-        for record in event.get('Records', []):
-            process_failed_order(record, context)
+        # Build failed order records, keyed by order_id so a batch never contains
+        # duplicate keys (BatchWriteItem rejects those); keep every message ID per key
+        failed_order_records = {}
+        message_ids_by_order = {}
+        for record in records:
+            failed_order_record = process_failed_order(record, context)
+            if failed_order_record is None:
+                continue
+            order_id = failed_order_record['order_id']
+            failed_order_records[order_id] = failed_order_record
+            message_ids_by_order.setdefault(order_id, []).append(record.get('messageId'))
         
-        return {
-            'statusCode': 200,
-            'body': json.dumps({'message': 'DLQ messages processed successfully'})
-        }
+        # Store in failed_orders table with BatchWriteItem
+        with timed('store_failed_orders'):
+            unwritten_order_ids = batch_store_failed_orders(
+                table_name, list(failed_order_records.values()), context
+            )
+        
+        batch_item_failures = [
+            {'itemIdentifier': message_id}
+            for order_id in unwritten_order_ids
+            for message_id in message_ids_by_order[order_id]
+        ]
+        
+        logger.annotate(records_count=len(records),
+                        stored_count=len(failed_order_records) - len(unwritten_order_ids),
+                        failed_count=len(batch_item_failures))
+        
+        # Partial batch response (requires ReportBatchItemFailures on the event source mapping)
+        return {'batchItemFailures': batch_item_failures}
         
     except Exception as e:
-        logger.error(json.dumps({
-            'event': 'dlq_processor_error',
-            'error': str(e),
-            'request_id': context.aws_request_id
-        }))
+        logger.error('dlq_processor_error', error=str(e))
         
-        # Don't re-raise - we don't want DLQ messages to fail again
+        # Nothing was stored - report the whole batch so SQS keeps the messages
         return {
-            'statusCode': 500,
-            'body': json.dumps({'error': 'Failed to process DLQ messages'})
+            'batchItemFailures': [
+                {'itemIdentifier': record.get('messageId')} for record in records
+            ]
         }
 
 def process_failed_order(record, context):
     """
-    Process individual DLQ message and store in failed_orders table
+    Parse individual DLQ message and build its failed_orders record
+    Returns None for messages that can never be stored (invalid body / no order_id)
     """
     try:
-        # Parse DLQ message (original SQS message)
-        message_body = json.loads(record['body'])
+        # Decode DLQ message (original order envelope) - numbers as Decimal for DynamoDB
+        # Claim-checked orders keep just their reference; the order is in the orders table
+        message_body = decode_order_message(record['body'])
         order_id = message_body.get('order_id')
         customer_id = message_body.get('customer_id')
         
-        logger.info(json.dumps({
-            'event': 'processing_failed_order',
-            'order_id': order_id,
-            'customer_id': customer_id,
-            'message_id': record.get('messageId'),
-            'request_id': context.aws_request_id
-        }))
+        if not order_id:
+            raise ValueError('DLQ message has no order_id')
         
-        # Store failed order in failed_orders table
-        store_failed_order(message_body, record, context)
+        logger.info('processing_failed_order',
+                    order_id=order_id, customer_id=customer_id, message_id=record.get('messageId'))
         
-        logger.info(json.dumps({
-            'event': 'failed_order_stored',
-            'order_id': order_id,
-            'customer_id': customer_id,
-            'request_id': context.aws_request_id
-        }))
+        return build_failed_order_record(message_body, record)
         
     except Exception as e:
-        logger.error(json.dumps({
-            'event': 'failed_order_processing_error',
-            'error': str(e),
-            'message_id': record.get('messageId'),
-            'request_id': context.aws_request_id
-        }))
-        # Don't re-raise - log error and continue
+        logger.error('failed_order_processing_error',
+                     error=str(e), message_id=record.get('messageId'))
+        # Don't report - a malformed message would fail again on every retry
+        return None
 
-def store_failed_order(original_message, dlq_record, context):
+def build_failed_order_record(original_message, dlq_record):
     """
-    Store failed order information in failed_orders DynamoDB table
+    Prepare failed order information for the failed_orders DynamoDB table
+    failed_date buckets the record by day for the failed-date-index GSI
+    attempt_count is the message's ApproximateReceiveCount as delivered here:
+    SQS keeps counting after moving a message to the DLQ, so it covers the
+    order queue receives plus this DLQ delivery
+    redrive_count is carried over from messages replayed by dofs_core.redrive
+    source_queue is the queue of the order's lane (dofs_core.lanes), the one
+    redrive sends it back to; source_queue_arn is the queue SQS actually moved
+    the message from (DeadLetterQueueSourceArn), when the record carries it
     """
-    # Get table name from environment
-    table_name = os.environ.get('FAILED_ORDERS_TABLE_NAME')
-    if not table_name:
-        raise ValueError('FAILED_ORDERS_TABLE_NAME environment variable not set')
-    
-    table = dynamodb.Table(table_name)
-    
-    # Prepare failed order record
-    failed_order_record = {
+    failed_at = datetime.now(timezone.utc).isoformat()
+    record = {
         'order_id': original_message.get('order_id'),
         'customer_id': original_message.get('customer_id'),
         'original_message': original_message,
         'dlq_message_id': dlq_record.get('messageId'),
         'failure_reason': 'Order fulfillment failed after maximum retries',
-        'failed_at': datetime.now(timezone.utc).isoformat(),
-        'retry_count': 2,  # Based on our max_receive_count setting
-        'source_queue': 'order_queue'
+        'failed_at': failed_at,
+        'failed_date': failed_date_bucket(failed_at),
+        'attempt_count': receive_count(dlq_record),
+        'redrive_count': original_message.get('redrive_count', 0),
+        'source_queue': SOURCE_QUEUES[order_lane(original_message)]
     }
+    source_queue_arn = dlq_record.get('attributes', {}).get('DeadLetterQueueSourceArn')
+    if source_queue_arn:
+        record['source_queue_arn'] = source_queue_arn
+    return record
+
+def receive_count(dlq_record):
+    """
+    ApproximateReceiveCount of an SQS event record (0 if missing)
+    """
+    try:
+        return int(dlq_record.get('attributes', {}).get('ApproximateReceiveCount', 0))
+    except (TypeError, ValueError):
+        return 0
+
+def batch_store_failed_orders(table_name, failed_order_records, context):
+    """
+    Store failed orders in 25-item BatchWriteItem calls, retrying UnprocessedItems
+    with jittered exponential backoff
+    Returns the order_ids that could not be written after all attempts
+    """
+    unwritten_order_ids = []
     
-    # Store in failed_orders table
-    table.put_item(Item=failed_order_record)
+    for start in range(0, len(failed_order_records), MAX_BATCH_WRITE_ITEMS):
+        chunk = failed_order_records[start:start + MAX_BATCH_WRITE_ITEMS]
+        request_items = {
+            table_name: [{'PutRequest': {'Item': item}} for item in chunk]
+        }
+        
+        attempt = 0
+        while request_items:
+            attempt += 1
+            try:
+                response = get_resource('dynamodb').batch_write_item(RequestItems=request_items)
+                request_items = response.get('UnprocessedItems') or {}
+            except Exception as e:
+                # Whole call failed (e.g. throttling) - retry the same request
+                logger.warning('batch_write_error',
+                               error=str(e), attempt=attempt, table_name=table_name)
+            
+            if not request_items:
+                break
+            
+            if attempt >= MAX_BATCH_WRITE_ATTEMPTS:
+                unwritten_order_ids.extend(
+                    request['PutRequest']['Item']['order_id']
+                    for request in request_items.get(table_name, [])
+                )
+                break
+            
+            # Full-jitter exponential backoff before retrying unprocessed items
+            time.sleep(random.uniform(0, BATCH_WRITE_BASE_BACKOFF_SECONDS * (2 ** attempt)))
+        
+        logger.info('failed_orders_batch_saved_to_dynamodb',
+                    items_count=len(chunk), attempts=attempt, table_name=table_name)
     
-    logger.info(json.dumps({
-        'event': 'failed_order_saved_to_dynamodb',
-        'order_id': original_message.get('order_id'),
-        'table_name': table_name
-    }))
\ No newline at end of file
+    return unwritten_order_ids
\ No newline at end of file
@@ -1,159 +1,275 @@
 import json
-import boto3
-import logging
 import os
 import random
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from dofs_core import (
+    FulfillmentError, FulfillmentThrottled, LaneSender, bind_invocation, get_fulfillment_provider,
+    get_logger, instrumented_handler, order_lane, read_order_message, record_customer_fulfillments,
+    require_env, timed, touch_orders, transition_order_statuses
+)
 
 ## Testing CI/CD ##
 
 
 # Configure logging
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger = get_logger()
 
-# Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
+# Records of a batch processed at once (1 = one after another)
+FULFILLMENT_CONCURRENCY = int(os.environ.get('FULFILLMENT_CONCURRENCY', '10'))
 
+# Records the provider throttled are sent back to their lane's queue as new
+# messages, delayed by jittered exponential backoff (THROTTLE_BACKOFF_BASE_SECONDS
+# doubling per requeue, capped at SQS's 900 s), and the original is deleted -
+# every receive counts toward the queue's maxReceiveCount, so failing them
+# would dead-letter healthy orders. After THROTTLE_MAX_REQUEUES requeues a
+# throttled record is failed like any other. Each requeue stamps the order's
+# updated_at, so the reconciler does not re-send an order still in backoff.
+THROTTLE_BACKOFF_BASE_SECONDS = int(os.environ.get('THROTTLE_BACKOFF_BASE_SECONDS', '5'))
+THROTTLE_MAX_REQUEUES = int(os.environ.get('THROTTLE_MAX_REQUEUES', '10'))
+MAX_DELAY_SECONDS = 900
+
+@instrumented_handler
 def lambda_handler(event, context):
     """
-    Fulfillment Lambda - Processes orders from SQS with 70% success rate
-    Failed orders will be retried by SQS and eventually sent to DLQ
+    Fulfillment Lambda - Processes batches of orders from SQS through the
+    configured fulfillment provider (FULFILLMENT_PROVIDER, simulated by default)
+    Failed records are reported back via batchItemFailures so only they are retried
+    by SQS (and eventually sent to DLQ); successful records are deleted from the queue
+    Records are processed concurrently (up to FULFILLMENT_CONCURRENCY at once),
+    each with its own error handling; status transitions for the whole batch
+    are written together after processing, then the customers of newly
+    fulfilled orders get one summary update each. Throttled records are
+    requeued with a delay (see THROTTLE_BACKOFF_BASE_SECONDS)
     """
     try:
-        logger.info(json.dumps({
-            'event': 'fulfillment_started',
-            'records_count': len(event.get('Records', [])),
-            'request_id': context.aws_request_id
-        }))
+        records = event.get('Records', [])
+        
+        # Process each SQS record independently - one bad order must not
+        # force the rest of the batch to be redelivered
+        batch_item_failures = []
+        transitions = []
+        throttled = []
+        fulfilled_message_ids = {}
+        fulfilled_orders = {}
+        results = process_records(records, context, transitions, throttled)
+        requeued = requeue_throttled(throttled)
+        for record, order in zip(records, results):
+            if order is None:
+                # Error already logged by process_order_from_sqs
+                if record.get('messageId') not in requeued:
+                    batch_item_failures.append({'itemIdentifier': record.get('messageId')})
+            else:
+                fulfilled_message_ids.setdefault(order['order_id'], []).append(record.get('messageId'))
+                fulfilled_orders[order['order_id']] = order
         
-        # Process each SQS record (should be 1 due to batch_size=1)
-        for record in event.get('Records', []):
-            process_order_from_sqs(record, context)
+        # A fulfilled record only leaves the queue once FULFILLED is recorded;
+        # a failed write is retried with the message (transitions are idempotent)
+        with timed('status_update'):
+            status_results = update_order_statuses(transitions)
+        for order_id, message_ids in fulfilled_message_ids.items():
+            if isinstance(status_results.get(order_id), Exception):
+                batch_item_failures.extend({'itemIdentifier': message_id} for message_id in message_ids)
+        
+        # Only the transitions written here count - a redelivered order was counted before
+        update_customer_summaries(
+            [order for order_id, order in fulfilled_orders.items() if status_results.get(order_id) is True]
+        )
         
-        return {
-            'statusCode': 200,
-            'body': json.dumps({'message': 'Orders processed successfully'})
-        }
+        logger.annotate(records_count=len(records), failed_count=len(batch_item_failures),
+                        requeued_count=len(requeued))
+        
+        # Partial batch response (requires ReportBatchItemFailures on the event source mapping)
+        return {'batchItemFailures': batch_item_failures}
         
     except Exception as e:
-        logger.error(json.dumps({
-            'event': 'fulfillment_handler_error',
-            'error': str(e),
-            'request_id': context.aws_request_id
-        }))
+        logger.error('fulfillment_handler_error', error=str(e))
         
-        # Re-raise exception to trigger SQS retry mechanism
+        # Re-raise exception to trigger SQS retry of the whole batch
         raise e
 
-def process_order_from_sqs(record, context):
+def process_records(records, context, transitions, throttled, max_workers=None):
+    """
+    Run process_order_from_sqs for every record, up to max_workers
+    (FULFILLMENT_CONCURRENCY) at a time
+    Returns one entry per record, in order: the fulfilled order, or None
+    if the record failed; transitions collects every record's transitions
+    (in any order - duplicates collapse to the furthest status), throttled
+    the (record, order) of every record the provider throttled
+    """
+    max_workers = max_workers or FULFILLMENT_CONCURRENCY
+    
+    def process(record):
+        try:
+            with timed('fulfill'):
+                return process_order_from_sqs(record, context, transitions, throttled)
+        except Exception:
+            return None
+    
+    if max_workers > 1 and len(records) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(records))) as executor:
+            return list(executor.map(bind_invocation(process), records))
+    return [process(record) for record in records]
+
+def process_order_from_sqs(record, context, transitions, throttled):
     """
     Process individual SQS message containing order data
-    Simulates 70% success rate - failures will trigger SQS retries
+    Hands the order to the configured fulfillment provider - failures are
+    raised to the handler, which reports the record as a batch item failure
+    so SQS retries it
+    The resulting status (FULFILLED / FAILED) is appended to transitions for the
+    handler to write; a throttled record is appended to throttled for the
+    handler to requeue. Returns the fulfilled order
     """
+    message_body = {}
     try:
-        # Parse SQS message
-        message_body = json.loads(record['body'])
+        # Decode the order envelope (one GetItem for claim-checked large orders)
+        message_body = read_order_message(record['body'], require_env('ORDERS_TABLE_NAME'))
         order_id = message_body.get('order_id')
         customer_id = message_body.get('customer_id')
         
-        logger.info(json.dumps({
-            'event': 'processing_order',
-            'order_id': order_id,
-            'customer_id': customer_id,
-            'message_id': record.get('messageId'),
-            'request_id': context.aws_request_id
-        }))
+        if not order_id:
+            raise ValueError('SQS message has no order_id')
         
-        # Simulate fulfillment with 70% success rate
-        success_rate = 0.7
-        is_successful = random.random() < success_rate
+        logger.info('processing_order',
+                    order_id=order_id, customer_id=customer_id, message_id=record.get('messageId'))
         
-        if is_successful:
-            # Success case - update order status to FULFILLED
-            update_order_status(order_id, 'FULFILLED')
-            
-            logger.info(json.dumps({
-                'event': 'order_fulfilled_successfully',
-                'order_id': order_id,
-                'customer_id': customer_id,
-                'request_id': context.aws_request_id
-            }))
-            
-        else:
+        try:
+            fulfillment_id = get_fulfillment_provider().fulfill(message_body)
+        except FulfillmentThrottled as e:
+            # Provider pushed back - retry later without marking the order FAILED
+            logger.warning('order_fulfillment_throttled',
+                           order_id=order_id, message_id=record.get('messageId'))
+            throttled.append((record, message_body))
+            raise e
+        except FulfillmentError as e:
             # Failure case - this will trigger SQS retry
-            logger.warning(json.dumps({
-                'event': 'order_fulfillment_failed',
-                'order_id': order_id,
-                'customer_id': customer_id,
-                'message_id': record.get('messageId'),
-                'request_id': context.aws_request_id
-            }))
+            logger.warning('order_fulfillment_failed',
+                           order_id=order_id, customer_id=customer_id, error=str(e),
+                           message_id=record.get('messageId'))
             
-            # Update order status to FAILED (for tracking)
-            update_order_status(order_id, 'FAILED')
+            # Order status moves to FAILED (for tracking) - written once, later
+            # retries of the same message skip it
+            transitions.append((order_id, 'FAILED'))
             
             # Raise exception to trigger SQS retry mechanism
             # After max retries (2), message will go to DLQ
-            raise Exception(f'Fulfillment failed for order {order_id} (simulated 30% failure rate)')
+            raise e
+        
+        # Success case - order status moves to FULFILLED
+        transitions.append((order_id, 'FULFILLED'))
+        
+        logger.info('order_fulfilled_successfully',
+                    order_id=order_id, customer_id=customer_id, fulfillment_id=fulfillment_id)
+        
+        return message_body
             
     except json.JSONDecodeError as e:
-        logger.error(json.dumps({
-            'event': 'invalid_sqs_message',
-            'error': str(e),
-            'message_id': record.get('messageId'),
-            'request_id': context.aws_request_id
-        }))
+        logger.error('invalid_sqs_message', error=str(e), message_id=record.get('messageId'))
         # Raise exception to trigger SQS retry and eventual DLQ
         raise e
         
     except Exception as e:
-        logger.error(json.dumps({
-            'event': 'order_processing_error',
-            'order_id': message_body.get('order_id', 'unknown'),
-            'error': str(e),
-            'message_id': record.get('messageId'),
-            'request_id': context.aws_request_id
-        }))
+        logger.error('order_processing_error',
+                     order_id=message_body.get('order_id', 'unknown'), error=str(e),
+                     message_id=record.get('messageId'))
         
         # Re-raise to trigger SQS retry
         raise e
 
-def update_order_status(order_id, status):
+def requeue_throttled(throttled):
     """
-    Update order status in DynamoDB orders table
+    Send throttled records back to their lane's queue as new messages, with
+    the order's throttle_count attribute incremented and a delay of
+    THROTTLE_BACKOFF_BASE_SECONDS * 2**throttle_count (full jitter from half)
+    Returns the message ids of the requeued records - the handler deletes
+    them rather than failing them; records past THROTTLE_MAX_REQUEUES, or
+    whose resend failed, stay batch item failures. Requeued orders get
+    updated_at stamped (touch_orders), which restarts the reconciler's
+    RECONCILE_MIN_AGE_SECONDS wait
     """
-    try:
-        # Get table name from environment
-        table_name = os.environ.get('ORDERS_TABLE_NAME')
-        if not table_name:
-            raise ValueError('ORDERS_TABLE_NAME environment variable not set')
-        
-        table = dynamodb.Table(table_name)
-        
-        # Update order status
-        table.update_item(
-            Key={'order_id': order_id},
-            UpdateExpression='SET #status = :status, updated_at = :updated_at',
-            ExpressionAttributeNames={'#status': 'status'},
-            ExpressionAttributeValues={
-                ':status': status,
-                ':updated_at': datetime.now(timezone.utc).isoformat()
-            }
-        )
-        
-        logger.info(json.dumps({
-            'event': 'order_status_updated',
-            'order_id': order_id,
-            'status': status,
-            'table_name': table_name
-        }))
-        
-    except Exception as e:
-        logger.error(json.dumps({
-            'event': 'status_update_error',
-            'order_id': order_id,
-            'error': str(e)
-        }))
-        # Don't fail the entire process if status update fails
-        pass
\ No newline at end of file
+    if not throttled:
+        return set()
+    
+    message_ids = {}
+    with timed('enqueue'):
+        with LaneSender() as sender:
+            for record, order in throttled:
+                attribute = record.get('messageAttributes', {}).get('throttle_count', {})
+                throttle_count = int(attribute.get('stringValue') or 0)
+                if throttle_count >= THROTTLE_MAX_REQUEUES:
+                    logger.warning('order_throttle_requeues_exhausted',
+                                   order_id=order['order_id'], throttle_count=throttle_count)
+                    continue
+                delay = min(MAX_DELAY_SECONDS, THROTTLE_BACKOFF_BASE_SECONDS * 2 ** throttle_count)
+                entry_id = sender.add(
+                    record['body'], order_lane(order),
+                    message_attributes={
+                        'throttle_count': {'DataType': 'Number', 'StringValue': str(throttle_count + 1)}
+                    },
+                    delay_seconds=random.randint(delay // 2, delay)
+                )
+                message_ids[entry_id] = (record.get('messageId'), order['order_id'])
+    
+    requeued = set()
+    requeued_order_ids = []
+    for entry_id, (message_id, order_id) in message_ids.items():
+        if entry_id in sender.failures:
+            logger.error('order_requeue_failed', message_id=message_id, error=sender.failures[entry_id])
+        else:
+            requeued.add(message_id)
+            requeued_order_ids.append(order_id)
+    
+    if requeued_order_ids:
+        with timed('status_update'):
+            touched = touch_orders(require_env('ORDERS_TABLE_NAME'), requeued_order_ids)
+        for order_id, result in touched.items():
+            if isinstance(result, Exception):
+                # The requeue stands; at worst the reconciler sends the order once more
+                logger.error('order_touch_error', order_id=order_id, error=str(result))
+    return requeued
+
+def update_order_statuses(transitions):
+    """
+    Apply the batch's status transitions in DynamoDB orders table - one
+    conditional write per order, run concurrently; repeated or illegal
+    transitions (e.g. FAILED again, or FULFILLED back to FAILED) are skipped
+    Returns {order_id: True (written) | False (skipped) | exception}
+    """
+    if not transitions:
+        return {}
+    
+    # Get table name from environment
+    table_name = require_env('ORDERS_TABLE_NAME')
+    
+    results = transition_order_statuses(table_name, transitions)
+    
+    for order_id, result in results.items():
+        if isinstance(result, Exception):
+            logger.error('status_update_error', order_id=order_id, error=str(result))
+    
+    logger.info('order_statuses_updated',
+                orders_count=len(results),
+                written_count=sum(1 for result in results.values() if result is True),
+                skipped_count=sum(1 for result in results.values() if result is False),
+                failed_count=sum(1 for result in results.values() if isinstance(result, Exception)),
+                table_name=table_name)
+    
+    return results
+
+def update_customer_summaries(orders):
+    """
+    Add newly fulfilled orders to their customers' summaries (one ADD per
+    customer) when CUSTOMER_SUMMARIES_TABLE_NAME is set
+    A failed summary write is logged, not raised - the orders are fulfilled
+    """
+    table_name = os.environ.get('CUSTOMER_SUMMARIES_TABLE_NAME')
+    if not table_name or not orders:
+        return
+    
+    with timed('customer_summary'):
+        results = record_customer_fulfillments(table_name, orders, datetime.now(timezone.utc).isoformat())
+    
+    for customer_id, result in results.items():
+        if isinstance(result, Exception):
+            logger.warning('customer_summary_update_failed', customer_id=customer_id, error=str(result))
@@ -0,0 +1,91 @@
+import os
+from dofs_core import (
+    AdaptiveThrottle, Overloaded, dumps, error_code, get_client, get_logger,
+    instrumented_handler, loads, require_env
+)
+
+# Configure logging
+logger = get_logger()
+
+# StartExecution pace per container while draining - the event source
+# mapping's maximum concurrency caps how many containers drain at once
+DRAIN_START_EXECUTION_RATE = float(os.environ.get('DRAIN_START_EXECUTION_RATE', '10'))
+start_execution_throttle = AdaptiveThrottle(DRAIN_START_EXECUTION_RATE, burst=DRAIN_START_EXECUTION_RATE)
+
+# Time kept back at the end of an invocation to report the batch
+DRAIN_TIME_MARGIN_MS = 2000
+
+@instrumented_handler
+def lambda_handler(event, context):
+    """
+    Intake Drainer Lambda - Starts the Step Function executions of orders that
+    api_handler buffered because the workflow was throttling
+    Starts are paced by this container's adaptive throttle. Once the workflow
+    pushes back again (throttled, circuit open) or the invocation runs short of
+    time, the rest of the batch is reported via batchItemFailures, so SQS
+    redelivers it after the visibility timeout
+    """
+    records = event.get('Records', [])
+    try:
+        step_function_arn = require_env('STEP_FUNCTION_ARN')
+
+        batch_item_failures = []
+        started_count = 0
+        for position, record in enumerate(records):
+            wait_seconds = max(0, context.get_remaining_time_in_millis() - DRAIN_TIME_MARGIN_MS) / 1000
+            try:
+                start_buffered_order(record, step_function_arn, wait_seconds)
+                started_count += 1
+            except Overloaded as e:
+                # Backpressure - leave this record and the rest for a later delivery
+                logger.warning('intake_drain_backpressure',
+                               error=str(e), deferred_count=len(records) - position,
+                               start_execution_rate=start_execution_throttle.rate)
+                batch_item_failures.extend(
+                    {'itemIdentifier': deferred.get('messageId')} for deferred in records[position:]
+                )
+                break
+            except Exception as e:
+                logger.error('buffered_order_start_error',
+                             error=str(e), message_id=record.get('messageId'))
+                batch_item_failures.append({'itemIdentifier': record.get('messageId')})
+
+        logger.annotate(records_count=len(records), started_count=started_count,
+                        failed_count=len(batch_item_failures))
+
+        # Partial batch response (requires ReportBatchItemFailures on the event source mapping)
+        return {'batchItemFailures': batch_item_failures}
+
+    except Exception as e:
+        logger.error('intake_drainer_error', error=str(e))
+
+        # Nothing was started - report the whole batch so SQS keeps the messages
+        return {
+            'batchItemFailures': [
+                {'itemIdentifier': record.get('messageId')} for record in records
+            ]
+        }
+
+def start_buffered_order(record, step_function_arn, wait_seconds):
+    """
+    Start the execution of one buffered order under the name api_handler
+    reserved for it; an execution that already exists was started by an
+    earlier delivery of the same message
+    """
+    message = loads(record['body'])
+    execution_name = message['execution_name']
+
+    try:
+        start_execution_throttle.call(
+            get_client('stepfunctions').start_execution,
+            wait_seconds=wait_seconds,
+            stateMachineArn=step_function_arn,
+            name=execution_name,
+            input=dumps(message['order'])
+        )
+    except Exception as e:
+        if error_code(e) != 'ExecutionAlreadyExists':
+            raise
+
+    logger.info('buffered_order_started',
+                order_id=message['order'].get('order_id'), execution_name=execution_name)
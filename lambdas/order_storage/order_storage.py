@@ -1,22 +1,29 @@
-import json
-import boto3
-import logging
 import os
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from decimal import Decimal
+from dofs_core import (
+    LaneSender, bind_invocation, encode_order_message, error_code, get_client, get_logger,
+    instrumented_handler, lane_queue_url, order_lane, record_customer_orders, require_env,
+    status_shard_key, timed, to_item
+)
 
 ## Testing CI/CD ##
 
 
 # Configure logging
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger = get_logger()
 
-# Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
-sqs = boto3.client('sqs')
+# send: store the order, then send it to SQS (two independent calls)
+# outbox: store the order and its outbox entry in one TransactWriteItems;
+#         the outbox_relay Lambda sends outbox entries to SQS in batches
+ORDER_ENQUEUE_MODE = os.environ.get('ORDER_ENQUEUE_MODE', 'send')
 
+# Outbox entries expire (DynamoDB TTL) once the relay has long had them
+OUTBOX_TTL_SECONDS = int(os.environ.get('OUTBOX_TTL_SECONDS', '86400'))
+
+@instrumented_handler
 def lambda_handler(event, context):
     """
     Order Storage Lambda - Stores validated orders and sends to SQS
@@ -26,27 +33,16 @@ def lambda_handler(event, context):
         # Extract validated order from Step Function
         order_data = event.get('order', {})
         
-        logger.info(json.dumps({
-            'event': 'order_storage_started',
-            'customer_id': order_data.get('customer_id'),
-            'request_id': context.aws_request_id
-        }))
+        # Orders from older callers carry no order_id; derive it from the
+        # execution so a retried StoreOrder step writes the same order again
+        if not order_data.get('order_id') and event.get('execution_id'):
+            order_data['order_id'] = str(uuid.uuid5(uuid.NAMESPACE_URL, event['execution_id']))
         
-        # Generate unique order ID
-        order_id = str(uuid.uuid4())
+        # Store order in DynamoDB and send it to SQS for fulfillment
+        stored_order = store_and_enqueue_order(order_data)
+        order_id = stored_order['order_id']
         
-        # Store order in DynamoDB
-        stored_order = store_order_in_dynamodb(order_data, order_id)
-        
-        # Send order to SQS for fulfillment
-        send_order_to_sqs(stored_order)
-        
-        logger.info(json.dumps({
-            'event': 'order_stored_successfully',
-            'order_id': order_id,
-            'customer_id': order_data.get('customer_id'),
-            'request_id': context.aws_request_id
-        }))
+        logger.annotate(order_id=order_id, customer_id=order_data.get('customer_id'))
         
         # Return success result for Step Function
         return {
@@ -56,102 +52,259 @@ def lambda_handler(event, context):
         }
         
     except Exception as e:
-        logger.error(json.dumps({
-            'event': 'order_storage_error',
-            'error': str(e),
-            'customer_id': order_data.get('customer_id'),
-            'request_id': context.aws_request_id
-        }))
+        logger.error('order_storage_error', error=str(e), customer_id=order_data.get('customer_id'))
         
         # Re-raise exception to fail Step Function
         raise e
 
-def convert_floats_to_decimal(obj):
+def store_and_enqueue_order(order_data):
     """
-    Convert float values to Decimal for DynamoDB compatibility
+    Store a validated order and send it to SQS for fulfillment (in outbox
+    mode, store it with its outbox entry for the relay to send)
+    Shared by this Lambda and the api_handler direct pipeline mode
     """
-    if isinstance(obj, list):
-        return [convert_floats_to_decimal(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {key: convert_floats_to_decimal(value) for key, value in obj.items()}
-    elif isinstance(obj, float):
-        return Decimal(str(obj))
-    else:
-        return obj
+    # Order ID assigned at intake by api_handler (generated for older callers)
+    order_id = order_data.get('order_id') or str(uuid.uuid4())
+    
+    if ORDER_ENQUEUE_MODE == 'outbox':
+        # One atomic write - the relay does the enqueueing
+        with timed('store'):
+            return store_order_with_outbox(order_data, order_id)
+    
+    # Store order in DynamoDB
+    with timed('store'):
+        stored_order = store_order_in_dynamodb(order_data, order_id)
+    
+    # Send order to SQS for fulfillment
+    with timed('enqueue'):
+        send_order_to_sqs(stored_order)
+    
+    return stored_order
+
+def store_and_enqueue_orders(orders, max_workers=1):
+    """
+    Store many validated orders, then send them to SQS with SendMessageBatch
+    (in outbox mode each order is stored with its outbox entry instead)
+    Used by batched / bulk intake paths; stores run on max_workers threads
+    Returns one result per order, in order: the stored order, or the exception
+    that stopped it (storage or enqueue failure)
+    """
+    put = put_order_with_outbox if ORDER_ENQUEUE_MODE == 'outbox' else put_order
+    
+    def store(order_data):
+        try:
+            order_record = build_order_record(order_data, order_data.get('order_id') or str(uuid.uuid4()))
+            return order_record, put(order_record)
+        except Exception as e:
+            return e, False
+    
+    with timed('store'):
+        if max_workers > 1 and len(orders) > 1:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(orders))) as executor:
+                stored = list(executor.map(bind_invocation(store), orders))
+        else:
+            stored = [store(order_data) for order_data in orders]
+    
+    # One summary write per customer for the whole batch
+    results = [result for result, _ in stored]
+    update_customer_summaries([result for result, created in stored if created])
+    
+    if ORDER_ENQUEUE_MODE == 'outbox':
+        return results
+    
+    stored_orders = [result for result in results if not isinstance(result, Exception)]
+    with timed('enqueue'):
+        sender = send_orders_to_sqs(stored_orders)
+    
+    for index, result in enumerate(results):
+        if not isinstance(result, Exception) and result['order_id'] in sender.failures:
+            results[index] = RuntimeError(
+                f"Failed to send order {result['order_id']} to SQS: {sender.failures[result['order_id']]}"
+            )
+    
+    return results
 
 def store_order_in_dynamodb(order_data, order_id):
     """
-    Store order in DynamoDB orders table
+    Store order in DynamoDB orders table and add it to its customer's summary
+    """
+    order_record = build_order_record(order_data, order_id)
+    if put_order(order_record):
+        update_customer_summaries([order_record])
+    return order_record
+
+def put_order(order_record):
+    """
+    Write an order record to the orders table
+    The write is conditional on order_id being new, so a retried step (Step
+    Functions retry, repeated request) never overwrites or duplicates the order
+    Returns False when an earlier attempt already stored it
     """
     # Get table name from environment
-    table_name = os.environ.get('ORDERS_TABLE_NAME')
-    if not table_name:
-        raise ValueError('ORDERS_TABLE_NAME environment variable not set')
+    table_name = require_env('ORDERS_TABLE_NAME')
+    order_id = order_record['order_id']
     
-    table = dynamodb.Table(table_name)
+    # Store in DynamoDB - serialized to an attribute map in a single walk
+    try:
+        get_client('dynamodb').put_item(
+            TableName=table_name,
+            Item=to_item(order_record),
+            ConditionExpression='attribute_not_exists(order_id)'
+        )
+    except Exception as e:
+        if error_code(e) != 'ConditionalCheckFailedException':
+            raise
+        # Stored by an earlier attempt - the caller still (re)sends it to SQS, as
+        # that attempt may have failed before enqueueing (SQS is at-least-once anyway)
+        logger.info('order_already_stored', order_id=order_id, table_name=table_name)
+        return False
     
-    # Prepare order record with Decimal conversion for DynamoDB
-    order_record = {
+    logger.info('order_saved_to_dynamodb', order_id=order_id, table_name=table_name)
+    
+    return True
+
+def store_order_with_outbox(order_data, order_id):
+    """
+    Store the order with its outbox entry and add it to its customer's summary
+    """
+    order_record = build_order_record(order_data, order_id)
+    if put_order_with_outbox(order_record):
+        update_customer_summaries([order_record])
+    return order_record
+
+def put_order_with_outbox(order_record):
+    """
+    Write an order record and its outbox entry (the SQS message body) in one
+    TransactWriteItems - both are written or neither is
+    Conditional on order_id being new, like put_order; an order stored by an
+    earlier attempt already has its outbox entry
+    Returns False when an earlier attempt already stored it
+    """
+    table_name = require_env('ORDERS_TABLE_NAME')
+    outbox_table_name = require_env('ORDER_OUTBOX_TABLE_NAME')
+    order_id = order_record['order_id']
+    
+    outbox_entry = {
         'order_id': order_id,
-        'customer_id': order_data['customer_id'],
-        'items': convert_floats_to_decimal(order_data['items']),
-        'total_amount': convert_floats_to_decimal(order_data['total_amount']),
-        'shipping_address': order_data.get('shipping_address', {}),
-        'status': 'PENDING',
-        'created_at': datetime.now(timezone.utc).isoformat(),
-        'updated_at': datetime.now(timezone.utc).isoformat()
+        'message': build_order_message(order_record),
+        'lane': order_lane(order_record),
+        'created_at': order_record['created_at'],
+        'expires_at': int(time.time()) + OUTBOX_TTL_SECONDS
     }
     
-    # Store in DynamoDB
-    table.put_item(Item=order_record)
+    try:
+        get_client('dynamodb').transact_write_items(TransactItems=[
+            {'Put': {
+                'TableName': table_name,
+                'Item': to_item(order_record),
+                'ConditionExpression': 'attribute_not_exists(order_id)'
+            }},
+            {'Put': {'TableName': outbox_table_name, 'Item': to_item(outbox_entry)}}
+        ])
+    except Exception as e:
+        if not is_order_conflict(e):
+            raise
+        logger.info('order_already_stored', order_id=order_id, table_name=table_name)
+        return False
     
-    logger.info(json.dumps({
-        'event': 'order_saved_to_dynamodb',
-        'order_id': order_id,
-        'table_name': table_name
-    }))
+    logger.info('order_saved_with_outbox', order_id=order_id, table_name=table_name)
     
-    return order_record
+    return True
 
-def send_order_to_sqs(order_record):
+def is_order_conflict(exc):
+    """
+    Whether a cancelled store transaction failed only on the order's condition
+    (the order already exists)
     """
-    Send order to SQS queue for fulfillment processing
+    if error_code(exc) != 'TransactionCanceledException':
+        return False
+    reasons = getattr(exc, 'response', {}).get('CancellationReasons', [])
+    return bool(reasons) and reasons[0].get('Code') == 'ConditionalCheckFailed'
+
+def update_customer_summaries(order_records):
     """
-    # Get queue URL from environment
-    queue_url = os.environ.get('ORDER_QUEUE_URL')
-    if not queue_url:
-        raise ValueError('ORDER_QUEUE_URL environment variable not set')
+    Add newly stored orders to their customers' summaries (one ADD per
+    customer) when CUSTOMER_SUMMARIES_TABLE_NAME is set
+    A failed summary write is logged, not raised - the orders are stored
+    """
+    table_name = os.environ.get('CUSTOMER_SUMMARIES_TABLE_NAME')
+    if not table_name or not order_records:
+        return
+    
+    with timed('customer_summary'):
+        results = record_customer_orders(table_name, order_records)
     
-    # Prepare SQS message (convert Decimal back to float for JSON serialization)
-    message_body = {
-        'order_id': order_record['order_id'],
-        'customer_id': order_record['customer_id'],
-        'total_amount': float(order_record['total_amount']),
-        'status': order_record['status'],
-        'created_at': order_record['created_at']
+    for customer_id, result in results.items():
+        if isinstance(result, Exception):
+            logger.warning('customer_summary_update_failed', customer_id=customer_id, error=str(result))
+
+def build_order_record(order_data, order_id, status='PENDING', created_at=None):
+    """
+    Build the orders table record for a validated order
+    New orders are PENDING and created now; the bulk importer passes the
+    status and created_at of historical orders
+    """
+    # Numbers keep their parsed type (float or Decimal)
+    created_at = created_at or datetime.now(timezone.utc).isoformat()
+    order_record = {
+        'order_id': order_id,
+        'customer_id': order_data['customer_id'],
+        'items': order_data['items'],
+        'total_amount': order_data['total_amount'],
+        'shipping_address': order_data.get('shipping_address', {}),
+        'status': status,
+        # Write-sharded status-shard-index key (status#shard)
+        'status_shard': status_shard_key(status, order_id),
+        'created_at': created_at,
+        'updated_at': created_at
     }
+    # Optional - expedited shipping routes the order to the priority lane
+    if order_data.get('shipping_method'):
+        order_record['shipping_method'] = order_data['shipping_method']
+    return order_record
+
+def send_order_to_sqs(order_record):
+    """
+    Send order to its lane's SQS queue for fulfillment processing
+    """
+    # Priority or standard queue (dofs_core.lanes)
+    lane = order_lane(order_record)
+    queue_url = lane_queue_url(lane)
     
     # Send message to SQS
-    response = sqs.send_message(
+    response = get_client('sqs').send_message(
         QueueUrl=queue_url,
-        MessageBody=json.dumps(message_body),
-        MessageAttributes={
-            'order_id': {
-                'StringValue': order_record['order_id'],
-                'DataType': 'String'
-            },
-            'customer_id': {
-                'StringValue': order_record['customer_id'],
-                'DataType': 'String'
-            }
-        }
+        MessageBody=build_order_message(order_record)
     )
     
-    logger.info(json.dumps({
-        'event': 'order_sent_to_sqs',
-        'order_id': order_record['order_id'],
-        'message_id': response['MessageId'],
-        'queue_url': queue_url
-    }))
+    logger.info('order_sent_to_sqs',
+                order_id=order_record['order_id'], message_id=response['MessageId'],
+                lane=lane, queue_url=queue_url)
     
-    return response
\ No newline at end of file
+    return response
+
+def send_orders_to_sqs(order_records):
+    """
+    Send many orders to their lanes' SQS queues with SendMessageBatch (10 per
+    call / 256 KB, batched per queue)
+    Returns the LaneSender - its failures map order_id -> error for unsent orders
+    """
+    lanes = {}
+    with LaneSender() as sender:
+        for order_record in order_records:
+            lane = order_lane(order_record)
+            lanes[lane] = lanes.get(lane, 0) + 1
+            sender.add(build_order_message(order_record), lane, entry_id=order_record['order_id'])
+    
+    logger.info('orders_sent_to_sqs',
+                orders_count=len(order_records), failed_count=len(sender.failures),
+                batch_calls=sender.batch_calls, lanes=lanes)
+    
+    return sender
+
+def build_order_message(order_record):
+    """
+    Build the SQS message body for a stored order - the compact versioned
+    envelope of dofs_core.envelope (claim check for very large orders)
+    """
+    return encode_order_message(order_record)
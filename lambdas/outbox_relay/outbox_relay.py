@@ -0,0 +1,51 @@
+from dofs_core import LaneSender, from_item, get_logger, instrumented_handler, timed
+
+# Configure logging
+logger = get_logger()
+
+@instrumented_handler
+def lambda_handler(event, context):
+    """
+    Outbox Relay Lambda - Sends order outbox entries to their lanes' order queues
+    Triggered by the outbox table's DynamoDB stream (new entries only). Each
+    batch of entries goes out in SendMessageBatch calls; entries that could
+    not be sent, or not even queued (e.g. a malformed entry), are reported via
+    batchItemFailures, so the stream retries from the first of them (entries
+    after it may be sent twice - SQS delivery is at-least-once anyway). The
+    event source mapping bounds those retries and sends batches it gives up
+    on to the outbox relay DLQ, so one poison entry can't block its shard
+    """
+    records = [record for record in event.get('Records', []) if record.get('eventName') == 'INSERT']
+    try:
+        sequence_numbers = {}
+        batch_item_failures = []
+        with timed('enqueue'):
+            with LaneSender() as sender:
+                for record in records:
+                    sequence_number = record['dynamodb']['SequenceNumber']
+                    try:
+                        entry = from_item(record['dynamodb']['NewImage'])
+                        # Entries written before lanes existed go to the standard lane
+                        entry_id = sender.add(entry['message'], entry.get('lane', 'standard'))
+                    except Exception as e:
+                        logger.error('outbox_relay_entry_error', sequence_number=sequence_number, error=str(e))
+                        batch_item_failures.append({'itemIdentifier': sequence_number})
+                        continue
+                    sequence_numbers[entry_id] = (sequence_number, entry['order_id'])
+
+        for entry_id, error in sender.failures.items():
+            sequence_number, order_id = sequence_numbers[entry_id]
+            logger.error('outbox_relay_send_failed', order_id=order_id, error=error)
+            batch_item_failures.append({'itemIdentifier': sequence_number})
+
+        logger.annotate(records_count=len(records), sent_count=len(sender.message_ids),
+                        batch_calls=sender.batch_calls, failed_count=len(batch_item_failures))
+
+        # Partial batch response (requires ReportBatchItemFailures on the event source mapping)
+        return {'batchItemFailures': batch_item_failures}
+
+    except Exception as e:
+        logger.error('outbox_relay_error', error=str(e))
+
+        # Re-raise so the stream retries the whole batch
+        raise e
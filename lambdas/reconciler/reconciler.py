@@ -0,0 +1,172 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from dofs_core import (
+    LaneSender, bind_invocation, encode_order_message, error_code, get_client, get_logger,
+    instrumented_handler, iter_orders_by_status, order_lane, require_env, timed, to_item
+)
+
+# Configure logging
+logger = get_logger()
+
+# Statuses swept, and the created_at window an order must fall in: older than
+# RECONCILE_MIN_AGE_SECONDS, newer than RECONCILE_MAX_AGE_SECONDS (so
+# long-dead orders are not re-read on every run). The order must also not have
+# been updated for RECONCILE_MIN_AGE_SECONDS. fulfill_order stamps updated_at
+# on every throttle requeue, so the minimum age must exceed the longest time an
+# order in flight goes without an update: one throttle delay (up to 900 s) plus
+# the order queue's retry cycle (visibility timeout x max receive count)
+RECONCILE_STATUSES = [
+    status for status in os.environ.get('RECONCILE_STATUSES', 'PENDING,FAILED').split(',') if status
+]
+RECONCILE_MIN_AGE_SECONDS = int(os.environ.get('RECONCILE_MIN_AGE_SECONDS', '2100'))
+RECONCILE_MAX_AGE_SECONDS = int(os.environ.get('RECONCILE_MAX_AGE_SECONDS', '604800'))
+
+# Orders re-enqueued per invocation at most, and times one order is re-enqueued
+RECONCILE_MAX_ORDERS = int(os.environ.get('RECONCILE_MAX_ORDERS', '1000'))
+MAX_RECONCILES = int(os.environ.get('MAX_RECONCILES', '3'))
+
+RECONCILE_PAGE_SIZE = int(os.environ.get('RECONCILE_PAGE_SIZE', '100'))
+RECONCILE_CONCURRENCY = int(os.environ.get('RECONCILE_CONCURRENCY', '10'))
+
+# Time kept back at the end of an invocation - no new page is started after it
+RECONCILE_TIME_MARGIN_MS = 10000
+
+@instrumented_handler
+def lambda_handler(event, context):
+    """
+    Reconciler Lambda - Re-enqueues orders stuck in PENDING or FAILED
+    Runs on a schedule. An order whose SQS send failed after it was stored,
+    or whose retries ran out, stays PENDING / FAILED with nothing left to move
+    it; each invocation sends such orders back to their lanes' order queues
+    """
+    try:
+        table_name = require_env('ORDERS_TABLE_NAME')
+
+        summary = reconcile_orders(table_name, datetime.now(timezone.utc), context)
+
+        logger.annotate(**summary)
+        return summary
+
+    except Exception as e:
+        logger.error('reconciler_error', error=str(e))
+
+        # Re-raise so the failed run shows in the function's error metrics;
+        # the next scheduled run picks up where this one stopped
+        raise e
+
+def reconcile_orders(table_name, now, context=None,
+                     statuses=None, max_orders=None, max_workers=None):
+    """
+    Sweep statuses (RECONCILE_STATUSES) through the status-shard-index, oldest
+    first, one page of every shard at a time, and re-enqueue stale orders -
+    at most max_orders (RECONCILE_MAX_ORDERS) of them
+    Returns counts: scanned, claimed, enqueued, send_failed, plus complete
+    (False when the run stopped at max_orders or for lack of time)
+    """
+    statuses = statuses or RECONCILE_STATUSES
+    max_orders = RECONCILE_MAX_ORDERS if max_orders is None else max_orders
+    max_workers = max_workers or RECONCILE_CONCURRENCY
+    created_between = (
+        (now - timedelta(seconds=RECONCILE_MAX_AGE_SECONDS)).isoformat(),
+        (now - timedelta(seconds=RECONCILE_MIN_AGE_SECONDS)).isoformat()
+    )
+    stale_before = created_between[1]
+    reconciled_at = now.isoformat()
+
+    summary = {'scanned': 0, 'claimed': 0, 'enqueued': 0, 'send_failed': 0, 'complete': False}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for status in statuses:
+            pages = iter_orders_by_status(table_name, status, RECONCILE_PAGE_SIZE, created_between)
+            for orders in pages:
+                if summary['claimed'] >= max_orders or _out_of_time(context):
+                    pages.close()
+                    return summary
+                summary['scanned'] += len(orders)
+                candidates = [order for order in orders if is_stale(order, stale_before)]
+                candidates = candidates[:max_orders - summary['claimed']]
+                _reconcile_page(table_name, executor, candidates, stale_before, reconciled_at, summary)
+    summary['complete'] = True
+    return summary
+
+def _out_of_time(context):
+    return context is not None and context.get_remaining_time_in_millis() < RECONCILE_TIME_MARGIN_MS
+
+def is_stale(order, stale_before):
+    """
+    Whether an order is due for re-enqueueing: last updated before stale_before,
+    not reconciled since then, and reconciled fewer than MAX_RECONCILES times
+    """
+    return (order.get('updated_at', order.get('created_at', '')) < stale_before
+            and order.get('reconciled_at', '') < stale_before
+            and order.get('reconcile_count', 0) < MAX_RECONCILES)
+
+def _reconcile_page(table_name, executor, orders, stale_before, reconciled_at, summary):
+    """
+    Claim a page of stale orders, then send the claimed ones in SendMessageBatch calls
+    """
+    def claim(order):
+        try:
+            return claim_order(table_name, order, stale_before, reconciled_at)
+        except Exception as e:
+            # Left unclaimed - the next run tries it again
+            logger.error('order_claim_error', order_id=order['order_id'], error=str(e))
+            return False
+
+    claim = bind_invocation(claim)
+    with timed('reconcile_claim'):
+        claimed = [order for order, won in zip(orders, executor.map(claim, orders)) if won]
+    summary['claimed'] += len(claimed)
+    if not claimed:
+        return
+
+    with timed('enqueue'):
+        with LaneSender() as sender:
+            for order in claimed:
+                sender.add(encode_order_message(order), order_lane(order), entry_id=order['order_id'])
+
+    for order in claimed:
+        if order['order_id'] in sender.failures:
+            summary['send_failed'] += 1
+            logger.warning('order_reconcile_send_failed',
+                           order_id=order['order_id'], status=order['status'],
+                           error=sender.failures[order['order_id']])
+        else:
+            summary['enqueued'] += 1
+            logger.info('order_reconciled',
+                        order_id=order['order_id'], status=order['status'],
+                        created_at=order['created_at'],
+                        reconcile_count=order.get('reconcile_count', 0) + 1)
+
+def claim_order(table_name, order, stale_before, reconciled_at):
+    """
+    Mark an order as reconciled, on condition that it is unchanged since it
+    was read and no other run has reconciled it since stale_before - so
+    overlapping runs, and an order met twice in one run, are sent only once
+    Returns False when the condition failed
+    """
+    try:
+        get_client('dynamodb').update_item(
+            TableName=table_name,
+            Key=to_item({'order_id': order['order_id']}),
+            UpdateExpression='SET reconciled_at = :reconciled_at ADD reconcile_count :one',
+            ConditionExpression=(
+                '#status = :status AND updated_at = :updated_at'
+                ' AND (attribute_not_exists(reconciled_at) OR reconciled_at < :stale_before)'
+                ' AND (attribute_not_exists(reconcile_count) OR reconcile_count < :max_reconciles)'
+            ),
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues=to_item({
+                ':reconciled_at': reconciled_at,
+                ':one': 1,
+                ':status': order['status'],
+                ':updated_at': order['updated_at'],
+                ':stale_before': stale_before,
+                ':max_reconciles': MAX_RECONCILES
+            })
+        )
+        return True
+    except Exception as e:
+        if error_code(e) != 'ConditionalCheckFailedException':
+            raise
+        return False
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+DOFS index key backfill
+
+Orders stored before the write-sharded status index have no status_shard, so
+they are missing from the status-shard-index: GET /orders?status= and the
+reconciler's sweep never see them. Failed orders stored before the
+failed-date-index have no failed_date and are missing from date-range reads
+and redrives. Run this once after deploying the sharded indexes.
+
+The table is read with a parallel segmented Scan filtered to items without
+the key. Each item then gets one conditional UpdateItem: status_shard from
+its current status, on condition that the key is still missing and the status
+is unchanged. An order that moved on in the meantime already got its
+status_shard from the transition. failed_date is derived the same way from
+failed_at. Reruns only touch items still missing the key, so an interrupted
+backfill is simply run again. Prints a JSON summary per table.
+
+Usage: python scripts/backfill_index_keys.py [--table dofs-orders-dev]
+           [--failed-orders-table dofs-failed-orders-dev]
+           [--segments 4] [--concurrency 10] [--dry-run]
+Tables default to ORDERS_TABLE_NAME / FAILED_ORDERS_TABLE_NAME (either may be
+left out); ORDER_STATUS_SHARDS must match the deployed Lambdas. Requires boto3
+and credentials for the target account
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'shared'))
+
+from dofs_core import (  # noqa: E402
+    error_code, failed_date_bucket, from_item, get_client, status_shard_key, to_item
+)
+from dofs_core.redrive import REDRIVE_SCAN_SEGMENTS, scan_segments  # noqa: E402
+
+BACKFILL_CONCURRENCY = 10
+
+def backfill(table_name, missing, source, derive, segments, concurrency, dry_run):
+    """
+    Set the attribute missing on every item that lacks it, to derive(value of source)
+    Returns counts: found (items without it), updated, skipped (changed or
+    already backfilled meanwhile, or without source) and failed
+    """
+    summary = {'table': table_name, 'attribute': missing, 'found': 0, 'updated': 0, 'skipped': 0, 'failed': 0}
+
+    def update(item):
+        if source not in item:
+            return 'skipped'
+        try:
+            get_client('dynamodb').update_item(
+                TableName=table_name,
+                Key=to_item({'order_id': item['order_id']}),
+                UpdateExpression='SET #missing = :value',
+                ConditionExpression='attribute_not_exists(#missing) AND #source = :source',
+                ExpressionAttributeNames={'#missing': missing, '#source': source},
+                ExpressionAttributeValues=to_item({':value': derive(item), ':source': item[source]})
+            )
+            return 'updated'
+        except Exception as e:
+            if error_code(e) == 'ConditionalCheckFailedException':
+                return 'skipped'
+            print(json.dumps({'event': 'backfill_update_failed', 'table': table_name,
+                              'order_id': item['order_id'], 'error': str(e)}), file=sys.stderr)
+            return 'failed'
+
+    pages = scan_segments(
+        table_name, segments,
+        FilterExpression='attribute_not_exists(#missing)',
+        ProjectionExpression='order_id, #source',
+        ExpressionAttributeNames={'#missing': missing, '#source': source}
+    )
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for page in pages:
+            items = [from_item(item) for item in page]
+            summary['found'] += len(items)
+            if not dry_run:
+                for outcome in executor.map(update, items):
+                    summary[outcome] += 1
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--table', default=os.environ.get('ORDERS_TABLE_NAME'), help='orders table')
+    parser.add_argument('--failed-orders-table', default=os.environ.get('FAILED_ORDERS_TABLE_NAME'))
+    parser.add_argument('--segments', type=int, default=REDRIVE_SCAN_SEGMENTS)
+    parser.add_argument('--concurrency', type=int, default=BACKFILL_CONCURRENCY, help='UpdateItem threads')
+    parser.add_argument('--dry-run', action='store_true', help='count the items missing a key only')
+    args = parser.parse_args()
+    if not args.table and not args.failed_orders_table:
+        parser.error('--table or --failed-orders-table (or ORDERS_TABLE_NAME / FAILED_ORDERS_TABLE_NAME) is required')
+    if min(args.segments, args.concurrency) < 1:
+        parser.error('--segments and --concurrency must be at least 1')
+
+    if args.table:
+        summary = backfill(args.table, 'status_shard', 'status',
+                           lambda order: status_shard_key(order['status'], order['order_id']),
+                           args.segments, args.concurrency, args.dry_run)
+        print(json.dumps({'event': 'backfill_completed', 'dry_run': args.dry_run, **summary}))
+    if args.failed_orders_table:
+        summary = backfill(args.failed_orders_table, 'failed_date', 'failed_at',
+                           lambda failed_order: failed_date_bucket(failed_order['failed_at']),
+                           args.segments, args.concurrency, args.dry_run)
+        print(json.dumps({'event': 'backfill_completed', 'dry_run': args.dry_run, **summary}))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+DOFS cold-start import benchmark
+
+Measures, in a fresh interpreter per sample, how long each Lambda module takes
+to import now that AWS clients are built lazily by dofs_core, against the same
+import followed by building the clients the module used to create eagerly at
+import time (the previous behaviour).
+
+The difference is deferred, not saved: the client is still built on the first
+invocation that uses it. order_storage, fulfill_order and dlq_processor use
+their clients on every invocation, so each of their cold starts still pays it
+in full; only invocations that never touch a client (api_handler's GET routes,
+the validator) avoid it.
+
+Usage: python scripts/bench_cold_start.py [--runs 15]
+Requires boto3/botocore to be installed locally (see lambdas/api_handler/requirements.txt)
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# When the deferred client build is paid, per module
+FIRST_USE = {
+    'api_handler': 'POST (stepfunctions mode)',
+    'validator': '-',
+    'order_storage': 'every cold start',
+    'fulfill_order': 'every cold start',
+    'dlq_processor': 'every cold start',
+}
+
+# Clients each module built at import time before dofs_core
+EAGER_CLIENTS = {
+    'api_handler': [('client', 'stepfunctions')],
+    'validator': [],
+    'order_storage': [('resource', 'dynamodb'), ('client', 'sqs')],
+    'fulfill_order': [('resource', 'dynamodb')],
+    'dlq_processor': [('resource', 'dynamodb')],
+}
+
+SAMPLE_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+import dofs_core
+for kind, service in {clients!r}:
+    getattr(dofs_core, 'get_' + kind)(service)
+eager = time.perf_counter()
+print(json.dumps({{'lazy_ms': (imported - start) * 1000, 'eager_ms': (eager - start) * 1000}}))
+'''
+
+def run_sample(module, clients):
+    """
+    Import one Lambda module in a fresh interpreter and return its timings
+    """
+    env = dict(os.environ)
+    env.setdefault('AWS_DEFAULT_REGION', 'ap-south-1')
+    env['PYTHONPATH'] = os.pathsep.join([
+        os.path.join(REPO_ROOT, 'lambdas', module),
+        os.path.join(REPO_ROOT, 'shared'),
+        env.get('PYTHONPATH', '')
+    ])
+    output = subprocess.run(
+        [sys.executable, '-c', SAMPLE_SCRIPT.format(module=module, clients=clients)],
+        env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=15, help='fresh interpreters per function')
+    args = parser.parse_args()
+
+    print(f"{'function':<16}{'lazy import (ms)':>18}{'eager clients (ms)':>20}{'deferred (ms)':>15}"
+          f"  paid at first call")
+    for module, clients in EAGER_CLIENTS.items():
+        samples = [run_sample(module, clients) for _ in range(args.runs)]
+        lazy = statistics.median(sample['lazy_ms'] for sample in samples)
+        eager = statistics.median(sample['eager_ms'] for sample in samples)
+        print(f"{module:<16}{lazy:>18.1f}{eager:>20.1f}{eager - lazy:>15.1f}  {FIRST_USE[module]}")
+
+if __name__ == '__main__':
+    main()
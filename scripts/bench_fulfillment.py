@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+DOFS fulfillment batch benchmark
+
+Runs fulfill_order.lambda_handler on SQS batches against the in-memory
+DynamoDB stand-in (scripts/local_aws.py), every call sleeping for a simulated
+round trip, with a dofs_core.SimulatedProvider as the fulfillment backend
+(--provider-latency distribution, --error-rate, --throttle-rate calls/s).
+
+Default mode reports the wall-clock time per batch with the records
+processed one after another (concurrency 1) and with each --concurrency.
+--sweep runs every --batch-sizes x --concurrency combination and reports
+records per second, failures and throttled calls for each, and the knee per
+batch size: the concurrency after which one more step gains less than
+--knee-gain (or starts to be throttled).
+
+--claim-check sends claim-check envelopes, so every record also does its own
+GetItem, as an order too large for the message would. The batch's status
+updates are written concurrently in every mode.
+
+Usage: python scripts/bench_fulfillment.py [--batch-size 10] [--batches 20]
+           [--latency-ms 10] [--concurrency 2,5,10] [--provider-latency fixed:20]
+           [--error-rate 0] [--throttle-rate 0] [--claim-check]
+       python scripts/bench_fulfillment.py --sweep [--batch-sizes 1,5,10,25,50]
+           [--concurrency 1,2,4,8,16,32] [--provider-latency lognormal:20:0.5]
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+import uuid
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'shared'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'lambdas', 'fulfill_order'))
+
+ORDERS_TABLE = 'dofs-orders-bench'
+os.environ.update({'ORDERS_TABLE_NAME': ORDERS_TABLE, 'DOFS_METRICS_ENABLED': 'false'})
+
+from dofs_core import (  # noqa: E402
+    SimulatedProvider, encode_order_message, to_item, use_fulfillment_provider, use_stub
+)
+from local_aws import FakeDynamoDB  # noqa: E402
+import fulfill_order  # noqa: E402
+
+class Context:
+    aws_request_id = 'bench'
+    function_name = 'bench-fulfillment'
+
+def make_batch(dynamodb, batch_size, claim_check):
+    """
+    Store batch_size PENDING orders and return an SQS event for them
+    """
+    records = []
+    for index in range(batch_size):
+        order = {
+            'order_id': str(uuid.uuid4()),
+            'customer_id': f'cust_{index:03d}',
+            'items': [{'product_id': 'prod_0001', 'quantity': 1, 'price': 19.99}],
+            'total_amount': 19.99,
+            'status': 'PENDING'
+        }
+        dynamodb.tables[ORDERS_TABLE][(order['order_id'], None)] = to_item(order)
+        message = {'order_id': order['order_id'], 'claim_check': True} if claim_check else order
+        records.append({
+            'messageId': str(uuid.uuid4()),
+            'body': encode_order_message(message),
+            'attributes': {'ApproximateReceiveCount': '1'}
+        })
+    return {'Records': records}
+
+def run(dynamodb, args, concurrency, batch_size):
+    """
+    Process args.batches batches; returns (batch timings in ms, failed records, provider)
+    """
+    provider = SimulatedProvider(args.provider_latency, args.error_rate, args.throttle_rate)
+    use_fulfillment_provider(provider)
+    fulfill_order.FULFILLMENT_CONCURRENCY = concurrency
+    timings = []
+    failed = 0
+    for _ in range(args.batches):
+        event = make_batch(dynamodb, batch_size, args.claim_check)
+        start = time.perf_counter()
+        response = fulfill_order.lambda_handler(event, Context())
+        timings.append((time.perf_counter() - start) * 1000)
+        failed += len(response['batchItemFailures'])
+    return timings, failed, provider
+
+def compare(dynamodb, args, concurrencies):
+    print(f"{'concurrency':>12}{'batch':>7}{'p50 ms':>10}{'max ms':>10}{'records/s':>11}{'speedup':>9}")
+    baseline = None
+    for concurrency in [1] + [value for value in concurrencies if value != 1]:
+        timings, _, _ = run(dynamodb, args, concurrency, args.batch_size)
+        median = statistics.median(timings)
+        baseline = baseline or median
+        print(f"{concurrency:>12}{args.batch_size:>7}{median:>10.1f}{max(timings):>10.1f}"
+              f"{args.batch_size * 1000 / median:>11.0f}{baseline / median:>8.1f}x")
+
+def sweep(dynamodb, args, concurrencies):
+    batch_sizes = [int(value) for value in args.batch_sizes.split(',')]
+    print(f"{'batch':>7}{'concurrency':>13}{'records/s':>11}{'p50 ms':>10}{'failed':>8}{'throttled':>11}")
+    knees = {}
+    for batch_size in batch_sizes:
+        rows = []
+        for concurrency in sorted(set(concurrencies)):
+            timings, failed, provider = run(dynamodb, args, concurrency, batch_size)
+            rate = batch_size * len(timings) * 1000 / sum(timings)
+            rows.append((concurrency, rate, provider.throttled))
+            print(f"{batch_size:>7}{concurrency:>13}{rate:>11.0f}{statistics.median(timings):>10.1f}"
+                  f"{failed:>8}{provider.throttled:>11}")
+        knees[batch_size] = find_knee(rows, args.knee_gain)
+    print()
+    for batch_size, (concurrency, rate) in knees.items():
+        print(f'knee  batch {batch_size:>4}: concurrency {concurrency:>3}  {rate:.0f} records/s')
+    best_batch, (best_concurrency, best_rate) = max(knees.items(), key=lambda entry: entry[1][1])
+    print(f'best  batch {best_batch:>4}: concurrency {best_concurrency:>3}  {best_rate:.0f} records/s')
+
+def find_knee(rows, knee_gain):
+    """
+    (concurrency, records/s) of the last step that still gained at least
+    knee_gain over the previous one without being throttled
+    """
+    knee = rows[0][:2]
+    for (_, previous_rate, _), (concurrency, rate, throttled) in zip(rows, rows[1:]):
+        if throttled or rate < previous_rate * (1 + knee_gain):
+            break
+        knee = (concurrency, rate)
+    return knee
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--batches', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=10.0, help='DynamoDB round trip')
+    parser.add_argument('--concurrency', default=None, help='default 2,5,10 (1,2,4,8,16,32 with --sweep)')
+    parser.add_argument('--provider-latency', default='fixed:20', help='fulfillment latency distribution (ms)')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='provider calls/s (0 = unlimited)')
+    parser.add_argument('--claim-check', action='store_true')
+    parser.add_argument('--sweep', action='store_true')
+    parser.add_argument('--batch-sizes', default='1,5,10,25,50')
+    parser.add_argument('--knee-gain', type=float, default=0.1)
+    args = parser.parse_args()
+    concurrencies = [int(value) for value in
+                     (args.concurrency or ('1,2,4,8,16,32' if args.sweep else '2,5,10')).split(',')]
+
+    # The handler logs every record through the root logger
+    logging.disable(logging.CRITICAL)
+    dynamodb = FakeDynamoDB({ORDERS_TABLE: ('order_id', None)}, latency=args.latency_ms / 1000)
+    use_stub('dynamodb', client=dynamodb)
+
+    print(f'provider latency {args.provider_latency}  error rate {args.error_rate}  '
+          f"throttle rate {args.throttle_rate or 'unlimited'}  dynamodb {args.latency_ms} ms")
+    if args.sweep:
+        sweep(dynamodb, args, concurrencies)
+    else:
+        compare(dynamodb, args, concurrencies)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+DOFS logging overhead benchmark
+
+Runs fulfill_order.lambda_handler on SQS batches against the in-memory
+DynamoDB stand-in (scripts/local_aws.py, no simulated latency) with an
+instant, always-succeeding SimulatedProvider, so the handler's own CPU time
+dominates. Each mode configures logging differently; all of them write to a
+Lambda-style formatter on a null stream:
+  off        LOG_LEVEL=WARNING - nothing on the success path is written
+  on         LOG_LEVEL=INFO, every invocation logged (LOG_SAMPLE_RATE=1)
+  sampled    LOG_LEVEL=INFO, --sample-rate of invocations logged
+Reports microseconds per record and the log lines and bytes written per
+batch. A micro-benchmark then compares one success-path event logged the old
+way (logger.info(json.dumps({...})), serialized even when INFO is off) with
+dofs_core's event logger, at both levels.
+
+Usage: python scripts/bench_logging.py [--batch-size 10] [--batches 500]
+           [--sample-rate 0.1] [--calls 200000]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import timeit
+import uuid
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'shared'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'lambdas', 'fulfill_order'))
+
+ORDERS_TABLE = 'dofs-orders-bench'
+os.environ.update({'ORDERS_TABLE_NAME': ORDERS_TABLE, 'DOFS_METRICS_ENABLED': 'false'})
+
+from dofs_core import (  # noqa: E402
+    SimulatedProvider, encode_order_message, to_item, use_fulfillment_provider, use_stub
+)
+from dofs_core import log  # noqa: E402
+from local_aws import FakeDynamoDB  # noqa: E402
+import fulfill_order  # noqa: E402
+
+# The Lambda Python runtime's log format
+LAMBDA_FORMAT = '[%(levelname)s]\t%(asctime)s.%(msecs)03dZ\t%(aws_request_id)s\t%(message)s'
+
+class Context:
+    aws_request_id = 'bench'
+    function_name = 'bench-logging'
+
+class CountingStream:
+    """
+    Null stream counting the lines and bytes written to it
+    """
+    def __init__(self):
+        self.lines = 0
+        self.bytes = 0
+
+    def write(self, text):
+        self.lines += text.count('\n')
+        self.bytes += len(text)
+
+    def flush(self):
+        pass
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.aws_request_id = Context.aws_request_id
+        return True
+
+def make_batch(dynamodb, batch_size):
+    """
+    Store batch_size PENDING orders and return an SQS event for them
+    """
+    records = []
+    for index in range(batch_size):
+        order = {
+            'order_id': str(uuid.uuid4()),
+            'customer_id': f'cust_{index:03d}',
+            'items': [{'product_id': 'prod_0001', 'quantity': 1, 'price': 19.99}],
+            'total_amount': 19.99,
+            'status': 'PENDING'
+        }
+        dynamodb.tables[ORDERS_TABLE][(order['order_id'], None)] = to_item(order)
+        records.append({
+            'messageId': str(uuid.uuid4()),
+            'body': encode_order_message(order),
+            'attributes': {'ApproximateReceiveCount': '1'}
+        })
+    return {'Records': records}
+
+def run_mode(dynamodb, stream, args, level, sample_rate):
+    """
+    Returns (microseconds per record, lines per batch, bytes per batch)
+    """
+    logging.getLogger().setLevel(level)
+    log.LOG_SAMPLE_RATE = sample_rate
+    events = [make_batch(dynamodb, args.batch_size) for _ in range(args.batches)]
+    stream.lines = stream.bytes = 0
+
+    start = time.perf_counter()
+    for event in events:
+        fulfill_order.lambda_handler(event, Context())
+    elapsed = time.perf_counter() - start
+    return (elapsed * 1e6 / (args.batches * args.batch_size),
+            stream.lines / args.batches, stream.bytes / args.batches)
+
+def micro(args):
+    """
+    Nanoseconds per success-path event: eager json.dumps vs the event logger
+    """
+    root = logging.getLogger()
+    logger = log.EventLogger(root)
+    fields = {'order_id': str(uuid.uuid4()), 'customer_id': 'cust_001', 'message_id': str(uuid.uuid4())}
+
+    def eager():
+        root.info(json.dumps({'event': 'processing_order', **fields, 'request_id': 'bench'}))
+
+    def lazy():
+        logger.info('processing_order', **fields)
+
+    print(f"\n{'one INFO event':<24}{'INFO off ns':>13}{'INFO on ns':>12}")
+    for name, call in (('json.dumps + logger.info', eager), ('EventLogger.info', lazy)):
+        timings = []
+        for level in (logging.WARNING, logging.INFO):
+            root.setLevel(level)
+            timings.append(timeit.timeit(call, number=args.calls) * 1e9 / args.calls)
+        print(f'{name:<24}{timings[0]:>13.0f}{timings[1]:>12.0f}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--batches', type=int, default=500)
+    parser.add_argument('--sample-rate', type=float, default=0.1)
+    parser.add_argument('--calls', type=int, default=200000, help='micro-benchmark iterations')
+    args = parser.parse_args()
+
+    stream = CountingStream()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter(LAMBDA_FORMAT, '%Y-%m-%dT%H:%M:%S'))
+    handler.addFilter(RequestIdFilter())
+    logging.getLogger().handlers = [handler]
+
+    dynamodb = FakeDynamoDB({ORDERS_TABLE: ('order_id', None)})
+    use_stub('dynamodb', client=dynamodb)
+    use_fulfillment_provider(SimulatedProvider('fixed:0', error_rate=0.0))
+    fulfill_order.FULFILLMENT_CONCURRENCY = 1
+
+    modes = (
+        ('off', logging.WARNING, 1.0),
+        ('on', logging.INFO, 1.0),
+        (f'sampled {args.sample_rate:g}', logging.INFO, args.sample_rate),
+    )
+    # Warm up imports, caches and the fake table
+    run_mode(dynamodb, stream, argparse.Namespace(batch_size=args.batch_size, batches=20), logging.INFO, 1.0)
+
+    print(f'batch size {args.batch_size}  batches {args.batches}')
+    print(f"{'mode':<14}{'us/record':>11}{'overhead':>10}{'lines/batch':>13}{'bytes/batch':>13}")
+    baseline = None
+    for name, level, sample_rate in modes:
+        per_record, lines, size = run_mode(dynamodb, stream, args, level, sample_rate)
+        baseline = baseline or per_record
+        print(f'{name:<14}{per_record:>11.1f}{(per_record / baseline - 1) * 100:>9.0f}%'
+              f'{lines:>13.1f}{size:>13.0f}')
+
+    micro(args)
+
+if __name__ == '__main__':
+    main()
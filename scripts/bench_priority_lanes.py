@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+DOFS priority lane simulation
+
+Feeds a flood of bulk orders (standard lane) and a steady trickle of
+expedited orders (priority lane) through order_storage into the in-memory
+SQS stand-in (scripts/local_aws.py). fulfill_order pollers stand in for the
+queues' event source mappings, with a dofs_core.SimulatedProvider as the
+fulfillment backend. The same load runs twice:
+  single   PRIORITY_ORDER_QUEUE_URL unset - every order goes to the order
+           queue and every poller (batch --batch-size) reads it
+  lanes    priority orders go to their own queue, read by --priority-pollers
+           pollers (batch --priority-batch-size, no batching window); the
+           rest of the pollers read the order queue
+Both runs have the same number of pollers. Reports, per run and lane, the
+queue wait of each order - sent to first received - as percentiles.
+
+Usage: python scripts/bench_priority_lanes.py [--bulk-orders 6000] [--bulk-rate 3000]
+           [--bulk-size 100] [--priority-rate 20] [--pollers 4] [--priority-pollers 1]
+           [--batch-size 10] [--priority-batch-size 1] [--provider-latency fixed:20]
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'shared'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'lambdas', 'order_storage'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'lambdas', 'fulfill_order'))
+
+ORDERS_TABLE = 'dofs-orders-bench'
+ORDER_QUEUE_URL = 'https://sqs.local/000000000000/dofs-order-queue-bench'
+PRIORITY_ORDER_QUEUE_URL = 'https://sqs.local/000000000000/dofs-priority-order-queue-bench'
+os.environ.update({
+    'ORDERS_TABLE_NAME': ORDERS_TABLE,
+    'ORDER_QUEUE_URL': ORDER_QUEUE_URL,
+    'DOFS_METRICS_ENABLED': 'false'
+})
+
+from dofs_core import (  # noqa: E402
+    ORDER_LANES, SimulatedProvider, decode_order_message, order_lane, use_fulfillment_provider, use_stub
+)
+from local_aws import FakeDynamoDB, FakeSqs  # noqa: E402
+import fulfill_order  # noqa: E402
+import order_storage  # noqa: E402
+
+class Context:
+    aws_request_id = 'bench'
+    function_name = 'bench-priority-lanes'
+
+def make_order(index, expedited):
+    """
+    A bulk order (under the priority amount threshold) or an expedited one
+    """
+    order = {
+        'order_id': str(uuid.uuid4()),
+        'customer_id': f'cust_{index % 100:03d}',
+        'items': [{'product_id': 'prod_0001', 'quantity': 1, 'price': 19.99}],
+        'total_amount': 19.99
+    }
+    if expedited:
+        order['shipping_method'] = 'expedited'
+    return order
+
+def percentile(samples, p):
+    return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))] * 1000
+
+class Run:
+    def __init__(self, args, lanes):
+        self.args = args
+        self.lanes = lanes
+        self.sqs = FakeSqs()
+        self.sqs.create_queue(ORDER_QUEUE_URL)
+        self.sqs.create_queue(PRIORITY_ORDER_QUEUE_URL)
+        self.waits = {lane: [] for lane in ORDER_LANES}
+        self.stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def poll(self, queue_url, batch_size, window_seconds):
+        while not self.stop.is_set():
+            records, messages = self.sqs.receive(queue_url, batch_size, window_seconds, self.stop)
+            if not records:
+                continue
+            received = time.time()
+            with self._lock:
+                for record in records:
+                    if record['attributes']['ApproximateReceiveCount'] == '1':
+                        lane = order_lane(decode_order_message(record['body']))
+                        self.waits[lane].append(received - int(record['attributes']['SentTimestamp']) / 1000)
+            response = fulfill_order.lambda_handler({'Records': records}, Context())
+            failed = {failure['itemIdentifier'] for failure in response['batchItemFailures']}
+            self.sqs.settle(queue_url, messages, failed)
+
+    def send_bulk(self):
+        args = self.args
+        interval = args.bulk_size / args.bulk_rate
+        started = time.perf_counter()
+        for chunk, start in enumerate(range(0, args.bulk_orders, args.bulk_size)):
+            delay = started + chunk * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            orders = [make_order(index, False) for index in range(start, min(start + args.bulk_size, args.bulk_orders))]
+            order_storage.store_and_enqueue_orders(orders, max_workers=8)
+
+    def send_priority(self, bulk_sender):
+        index = 0
+        while bulk_sender.is_alive():
+            order_storage.store_and_enqueue_order(make_order(index, True))
+            index += 1
+            time.sleep(1 / self.args.priority_rate)
+
+    def run(self):
+        args = self.args
+        use_stub('sqs', client=self.sqs)
+        if self.lanes:
+            os.environ['PRIORITY_ORDER_QUEUE_URL'] = PRIORITY_ORDER_QUEUE_URL
+            pollers = [(ORDER_QUEUE_URL, args.batch_size, args.batching_window_ms / 1000)] * args.pollers
+            pollers += [(PRIORITY_ORDER_QUEUE_URL, args.priority_batch_size, 0)] * args.priority_pollers
+        else:
+            os.environ.pop('PRIORITY_ORDER_QUEUE_URL', None)
+            pollers = [(ORDER_QUEUE_URL, args.batch_size, args.batching_window_ms / 1000)] * (
+                args.pollers + args.priority_pollers)
+
+        threads = [threading.Thread(target=self.poll, args=poller, daemon=True) for poller in pollers]
+        for thread in threads:
+            thread.start()
+        bulk_sender = threading.Thread(target=self.send_bulk)
+        priority_sender = threading.Thread(target=self.send_priority, args=(bulk_sender,))
+        bulk_sender.start()
+        priority_sender.start()
+        bulk_sender.join()
+        priority_sender.join()
+        while not self.sqs.idle():
+            time.sleep(0.01)
+        self.stop.set()
+        self.sqs.wake()
+        for thread in threads:
+            thread.join()
+        return self.waits
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--bulk-orders', type=int, default=6000)
+    parser.add_argument('--bulk-rate', type=float, default=3000, help='bulk orders per second')
+    parser.add_argument('--bulk-size', type=int, default=100, help='orders per bulk request')
+    parser.add_argument('--priority-rate', type=float, default=20, help='expedited orders per second')
+    parser.add_argument('--pollers', type=int, default=4, help='order queue pollers (lanes run)')
+    parser.add_argument('--priority-pollers', type=int, default=1, help='priority queue pollers (lanes run)')
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--priority-batch-size', type=int, default=1)
+    parser.add_argument('--batching-window-ms', type=float, default=50)
+    parser.add_argument('--provider-latency', default='fixed:20', help='fulfillment latency distribution (ms)')
+    args = parser.parse_args()
+
+    # The handlers log every order through the root logger
+    logging.disable(logging.CRITICAL)
+    use_stub('dynamodb', client=FakeDynamoDB({ORDERS_TABLE: ('order_id', None)}))
+    use_fulfillment_provider(SimulatedProvider(args.provider_latency, error_rate=0.0))
+
+    print(f'bulk {args.bulk_orders} orders at {args.bulk_rate:g}/s  expedited {args.priority_rate:g}/s  '
+          f'pollers {args.pollers}+{args.priority_pollers}  provider {args.provider_latency}')
+    print(f"{'run':<8}{'lane':<10}{'orders':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, lanes in (('single', False), ('lanes', True)):
+        waits = Run(args, lanes).run()
+        for lane in ORDER_LANES:
+            samples = sorted(waits[lane])
+            if not samples:
+                continue
+            print(f'{name:<8}{lane:<10}{len(samples):>8}{percentile(samples, 50):>10.1f}'
+                  f'{percentile(samples, 95):>10.1f}{percentile(samples, 99):>10.1f}{samples[-1] * 1000:>10.1f}')
+
+if __name__ == '__main__':
+    main()
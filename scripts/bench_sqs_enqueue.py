@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+DOFS SQS enqueue benchmark
+
+Sends N order messages (as built by order_storage.build_order_message) to a
+stubbed SQS client that sleeps for a simulated per-call round trip, and reports
+messages per second for:
+  single   one send_message call per order (order_storage.send_order_to_sqs)
+  batched  dofs_core.SqsBatchSender - SendMessageBatch, 10 messages per call
+The stub can fail a fraction of batch entries to exercise individual retries.
+
+It then compares bytes per message (body plus attributes, as SQS counts them)
+for orders of increasing size: the previous message (verbose JSON without
+items, order_id/customer_id repeated as attributes), that message with the
+items added (what fulfillment needs), and the compact envelope
+(dofs_core.envelope), which carries the items too.
+
+Usage: python scripts/bench_sqs_enqueue.py [--messages 1000] [--latency-ms 5]
+                                           [--entry-failure-rate 0.0] [--items 3]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'shared'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'lambdas', 'order_storage'))
+
+from dofs_core import SqsBatchSender, dumps  # noqa: E402
+from dofs_core.sqs import message_size  # noqa: E402
+from order_storage import build_order_message  # noqa: E402
+
+class StubSqsClient:
+    """
+    Minimal SQS client: every call costs latency seconds; batch entries fail
+    (retryable, not sender fault) with probability entry_failure_rate
+    """
+    def __init__(self, latency, entry_failure_rate=0.0):
+        self.latency = latency
+        self.entry_failure_rate = entry_failure_rate
+        self.calls = 0
+        self.delivered = 0
+
+    def send_message(self, QueueUrl, MessageBody, MessageAttributes=None):
+        self.calls += 1
+        time.sleep(self.latency)
+        self.delivered += 1
+        return {'MessageId': str(uuid.uuid4())}
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self.calls += 1
+        time.sleep(self.latency)
+        response = {'Successful': [], 'Failed': []}
+        for entry in Entries:
+            if random.random() < self.entry_failure_rate:
+                response['Failed'].append({
+                    'Id': entry['Id'],
+                    'SenderFault': False,
+                    'Code': 'InternalError'
+                })
+            else:
+                self.delivered += 1
+                response['Successful'].append({'Id': entry['Id'], 'MessageId': str(uuid.uuid4())})
+        return response
+
+def make_order_record(index, items=3):
+    return {
+        'order_id': str(uuid.uuid4()),
+        'customer_id': f'cust_{index % 100:03d}',
+        'items': [
+            {'product_id': f'prod_{(index + line) % 500:04d}', 'quantity': 1 + line % 3, 'price': 19.99}
+            for line in range(items)
+        ],
+        'total_amount': round(sum(19.99 * (1 + line % 3) for line in range(items)), 2),
+        'shipping_address': {'street': '1 Main St', 'city': 'Springfield', 'zip': '12345'},
+        'status': 'PENDING',
+        'created_at': '2024-01-01T00:00:00+00:00'
+    }
+
+def legacy_message_size(record, with_items=False):
+    """
+    Size of the message order_storage sent before the compact envelope
+    (optionally with the order's items and shipping address added)
+    """
+    message = {
+        'order_id': record['order_id'],
+        'customer_id': record['customer_id'],
+        'total_amount': record['total_amount'],
+        'status': record['status'],
+        'created_at': record['created_at']
+    }
+    if with_items:
+        message.update(items=record['items'], shipping_address=record['shipping_address'])
+    return message_size(dumps(message), {
+        'order_id': {'StringValue': record['order_id'], 'DataType': 'String'},
+        'customer_id': {'StringValue': record['customer_id'], 'DataType': 'String'}
+    })
+
+def run_single(client, records):
+    for record in records:
+        client.send_message(QueueUrl='stub', MessageBody=build_order_message(record))
+
+def run_batched(client, records):
+    with SqsBatchSender('stub', client=client) as sender:
+        for record in records:
+            sender.add(build_order_message(record), entry_id=record['order_id'])
+    return sender
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--latency-ms', type=float, default=5.0)
+    parser.add_argument('--entry-failure-rate', type=float, default=0.0)
+    parser.add_argument('--items', type=int, default=3, help='items per order in the throughput run')
+    args = parser.parse_args()
+
+    records = [make_order_record(i, args.items) for i in range(args.messages)]
+    latency = args.latency_ms / 1000
+
+    print(f"{'path':>8}{'messages':>10}{'calls':>8}{'delivered':>11}{'seconds':>10}{'msg/s':>10}")
+    rates = {}
+    for name, run in (('single', run_single), ('batched', run_batched)):
+        client = StubSqsClient(latency, args.entry_failure_rate if name == 'batched' else 0.0)
+        start = time.perf_counter()
+        run(client, records)
+        elapsed = time.perf_counter() - start
+        rates[name] = args.messages / elapsed
+        print(f"{name:>8}{args.messages:>10}{client.calls:>8}{client.delivered:>11}"
+              f"{elapsed:>10.3f}{rates[name]:>10.0f}")
+    print(f"batched / single throughput: {rates['batched'] / rates['single']:.1f}x")
+
+    print()
+    print(f"{'items':>8}{'legacy B':>10}{'+items B':>10}{'envelope B':>12}{'form':>8}")
+    for items in (1, 3, 10, 100, 1000):
+        record = make_order_record(0, items)
+        message_body = build_order_message(record)
+        form = 'ref' if '"ref"' in message_body else 'zlib' if '"z"' in message_body else 'inline'
+        print(f"{items:>8}{legacy_message_size(record):>10}{legacy_message_size(record, True):>10}"
+              f"{message_size(message_body):>12}{form:>8}")
+
+if __name__ == '__main__':
+    main()
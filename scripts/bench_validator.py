@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+DOFS order validator micro-benchmark
+
+Compares the schema validator (dofs_core.check_order, used by
+validator.validate_order) on valid orders of 1 to 1,000 items with:
+  legacy        the hand-written validate_order it replaced - the real
+                baseline. It checks fewer rules (no string or item limits, no
+                decimal places, no total_amount sum, no NaN / Infinity), and
+                the schema validator is still about 2x slower than it
+  legacy+rules  the previous validator extended the straightforward way with
+                the rules the schema adds (string limits, decimal precision via
+                Decimal, total_amount check in a second pass over items) -
+                what the extra rules would cost without the schema's fast path
+
+Usage: python scripts/bench_validator.py [--sizes 1 10 100 1000]
+"""
+import argparse
+import os
+import sys
+import timeit
+from decimal import Decimal
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'shared'))
+
+from dofs_core import check_order  # noqa: E402
+
+def legacy_validate_order(order_data):
+    """
+    Previous validator.validate_order implementation, kept here as the baseline
+    """
+    errors = []
+    required_fields = ['customer_id', 'items', 'total_amount']
+    for field in required_fields:
+        if not order_data.get(field):
+            errors.append(f'Missing required field: {field}')
+    items = order_data.get('items', [])
+    if not isinstance(items, list) or len(items) == 0:
+        errors.append('Items must be a non-empty array')
+    else:
+        for i, item in enumerate(items):
+            if not item.get('product_id'):
+                errors.append(f'Item {i}: missing product_id')
+            if not isinstance(item.get('quantity'), (int, float)) or item.get('quantity') <= 0:
+                errors.append(f'Item {i}: quantity must be positive number')
+            if not isinstance(item.get('price'), (int, float)) or item.get('price') < 0:
+                errors.append(f'Item {i}: price must be non-negative number')
+    total_amount = order_data.get('total_amount')
+    if not isinstance(total_amount, (int, float)) or total_amount <= 0:
+        errors.append('total_amount must be positive number')
+    return {'valid': len(errors) == 0, 'errors': errors}
+
+def legacy_validate_order_with_rules(order_data):
+    """
+    Previous implementation plus the schema's extra rules, written the obvious way
+    """
+    result = legacy_validate_order(order_data)
+    errors = result['errors']
+    if len(order_data.get('customer_id') or '') > 128:
+        errors.append('customer_id must be at most 128 characters')
+    items = order_data.get('items') or []
+    if len(items) > 1000:
+        errors.append('items must contain at most 1000 entries')
+    for i, item in enumerate(items):
+        if len(str(item.get('product_id', ''))) > 128:
+            errors.append(f'Item {i}: product_id must be at most 128 characters')
+        if Decimal(str(item.get('price', 0))).as_tuple().exponent < -2:
+            errors.append(f'Item {i}: price must have at most 2 decimal places')
+    total = Decimal(str(order_data.get('total_amount', 0)))
+    if total.as_tuple().exponent < -2:
+        errors.append('total_amount must have at most 2 decimal places')
+    expected = sum(Decimal(str(item['quantity'])) * Decimal(str(item['price'])) for item in items)
+    if total != expected:
+        errors.append('total_amount does not match sum of quantity x price')
+    return {'valid': len(errors) == 0, 'errors': errors}
+
+def make_order(item_count):
+    """
+    Build a valid order with item_count line items
+    """
+    items = [
+        {'product_id': f'prod_{i:05d}', 'quantity': 1 + i % 3, 'price': 9.99}
+        for i in range(item_count)
+    ]
+    total = sum(item['quantity'] for item in items) * 999 / 100
+    return {
+        'customer_id': 'cust_bench',
+        'items': items,
+        'total_amount': round(total, 2),
+        'shipping_address': {'street': '1 Bench St', 'city': 'Anytown'}
+    }
+
+def time_per_call(func, order):
+    """
+    Best-of-5 seconds per call
+    """
+    timer = timeit.Timer(lambda: func(order))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=number)) / number
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100, 1000])
+    args = parser.parse_args()
+
+    print(f"{'items':>6}{'legacy (us)':>14}{'legacy+rules (us)':>20}{'schema (us)':>14}"
+          f"{'vs legacy':>12}{'vs legacy+rules':>18}")
+    for size in args.sizes:
+        order = make_order(size)
+        assert check_order(order) == [], check_order(order)
+        assert legacy_validate_order_with_rules(order)['valid']
+        legacy = time_per_call(legacy_validate_order, order) * 1e6
+        legacy_rules = time_per_call(legacy_validate_order_with_rules, order) * 1e6
+        schema = time_per_call(check_order, order) * 1e6
+        print(f"{size:>6}{legacy:>14.1f}{legacy_rules:>20.1f}{schema:>14.1f}"
+              f"{schema / legacy:>11.2f}x{schema / legacy_rules:>17.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+DOFS streaming bulk import of historical orders
+
+Reads NDJSON orders (one JSON object per line) from a file or stdin and
+stores them in the orders table under the same rules as the live path:
+validator.validate_order checks each order and order_storage.build_order_record
+shapes the record (status_shard included). Historical orders must carry
+their status and created_at (ISO 8601), which are kept - defaulting them to
+PENDING / now would hand old orders to the reconciler for fulfillment.
+order_id defaults to a UUID derived from the line, so re-importing a line
+writes the same item again.
+
+The import is a bounded generator pipeline, so memory stays flat whatever
+the file size:
+  read      chunks of --chunk-rows lines, with their byte offsets
+  validate  chunks parsed and validated in a process pool (--workers)
+  write     chunks written by --writers threads, each through its own
+            Table.batch_writer (25-item BatchWriteItem calls)
+At most two chunks per worker / writer are in flight. Results are consumed in
+input order, and after each fully written chunk the byte offset just past it
+is checkpointed (--checkpoint, written atomically); a rerun resumes from
+there. Batch writes are unconditional, so rows between the checkpoint and a
+crash are simply written again.
+
+Rejected lines (bad JSON, failed validation, missing status or created_at,
+an order_id that is not a string of at most MAX_ORDER_ID_LENGTH characters)
+go to --rejects as NDJSON with their byte offset and errors. Progress with
+rows per second goes to stderr every --progress-seconds, and a JSON summary
+to stdout at the end.
+
+Usage: python scripts/import_orders.py orders.ndjson [--table dofs-orders-dev]
+           [--checkpoint orders.ndjson.checkpoint] [--rejects rejects.ndjson]
+           [--workers 4] [--writers 8] [--chunk-rows 500] [--restart]
+       gzip -dc orders.ndjson.gz | python scripts/import_orders.py - --checkpoint import.checkpoint
+       python scripts/import_orders.py orders.ndjson --local [--latency-ms 5]   # in-memory table
+The table defaults to ORDERS_TABLE_NAME; requires boto3 and credentials for
+the target account unless --local is given
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Metrics are never flushed here - don't let validate_order buffer samples
+os.environ.setdefault('DOFS_METRICS_ENABLED', 'false')
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'shared'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'lambdas', 'validator'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'lambdas', 'order_storage'))
+
+from dofs_core import ORDER_STATUSES, get_table, loads  # noqa: E402
+from order_storage import build_order_record  # noqa: E402
+from validator import validate_order  # noqa: E402
+
+# Namespace of the order IDs derived from lines without one
+IMPORT_NAMESPACE = uuid.UUID('6f1c2a54-3c1e-4d4b-9a0e-7b3f5d2e8c91')
+
+# Longest order_id accepted from a line - well inside DynamoDB's 2048-byte
+# partition key limit even if every character takes 4 UTF-8 bytes
+MAX_ORDER_ID_LENGTH = 128
+
+# Seconds between checkpoint writes (the last chunk is always checkpointed)
+CHECKPOINT_INTERVAL_SECONDS = 1.0
+
+def read_chunks(stream, offset, chunk_rows):
+    """
+    Yield (end_offset, [(line_offset, line), ...]) for the non-blank lines of
+    a binary stream positioned at offset
+    """
+    chunk = []
+    for line in stream:
+        line_offset = offset
+        offset += len(line)
+        if line.strip():
+            chunk.append((line_offset, line))
+        if len(chunk) == chunk_rows:
+            yield offset, chunk
+            chunk = []
+    if chunk:
+        yield offset, chunk
+
+def validate_chunk(chunk):
+    """
+    Process pool task: parse and validate one chunk
+    Returns (end_offset, records, rejects, rows)
+    """
+    end_offset, lines = chunk
+    records = []
+    rejects = []
+    for line_offset, line in lines:
+        try:
+            order = loads(line)
+        except ValueError as e:
+            rejects.append({'offset': line_offset, 'errors': [f'Invalid JSON: {e}']})
+            continue
+        if not isinstance(order, dict):
+            rejects.append({'offset': line_offset, 'errors': ['Order must be a JSON object']})
+            continue
+
+        try:
+            errors = validate_order(order)['errors']
+        except Exception as e:
+            errors = [f'Validation failed: {e}']
+        # Required rather than defaulted: a row stored as PENDING / now would be
+        # picked up by the reconciler and sent for fulfillment again
+        status = order.get('status')
+        if status not in ORDER_STATUSES:
+            errors.append(f'status must be one of {", ".join(ORDER_STATUSES)}')
+        if not is_timestamp(order.get('created_at')):
+            errors.append('created_at must be an ISO 8601 timestamp')
+        order_id = order.get('order_id')
+        if order_id is not None and not (isinstance(order_id, str) and 0 < len(order_id) <= MAX_ORDER_ID_LENGTH):
+            errors.append(f'order_id must be a non-empty string of at most {MAX_ORDER_ID_LENGTH} characters')
+        if errors:
+            rejects.append({'offset': line_offset, 'order_id': order_id, 'errors': errors})
+            continue
+
+        order_id = order_id or str(uuid.uuid5(IMPORT_NAMESPACE, line.decode('utf-8', 'replace')))
+        try:
+            records.append(build_order_record(order, order_id, status=status, created_at=order['created_at']))
+        except Exception as e:
+            # One bad row must not fail the chunk - the checkpoint could never pass it
+            rejects.append({'offset': line_offset, 'order_id': order_id, 'errors': [f'Record failed: {e}']})
+    return end_offset, records, rejects, len(lines)
+
+def is_timestamp(value):
+    if not isinstance(value, str):
+        return False
+    try:
+        datetime.fromisoformat(value.replace('Z', '+00:00'))
+        return True
+    except ValueError:
+        return False
+
+def write_chunk(table_name, validated):
+    """
+    Writer thread task: store one validated chunk through a batch_writer
+    """
+    end_offset, records, rejects, rows = validated
+    if records:
+        with get_table(table_name).batch_writer(overwrite_by_pkeys=['order_id']) as batch:
+            for record in records:
+                batch.put_item(Item=record)
+    return end_offset, len(records), rejects, rows
+
+def ordered_map(executor, fn, items, window):
+    """
+    executor.map that keeps at most window tasks in flight and pulls items
+    lazily, yielding results in input order
+    """
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def load_checkpoint(path, source):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as checkpoint_file:
+        checkpoint = json.load(checkpoint_file)
+    if checkpoint.get('source') != source:
+        raise SystemExit(f"Checkpoint {path} belongs to {checkpoint.get('source')!r}, not {source!r} "
+                         f'(use --restart to ignore it)')
+    return checkpoint
+
+def save_checkpoint(path, checkpoint):
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'w') as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file)
+    os.replace(temporary_path, path)
+
+def open_source(source, offset):
+    """
+    Binary stream of the source positioned at offset (stdin is read forward)
+    """
+    if source == '-':
+        stream = sys.stdin.buffer
+        remaining = offset
+        while remaining:
+            skipped = len(stream.read(min(remaining, 1 << 20)))
+            if not skipped:
+                raise SystemExit(f'stdin ended before the checkpointed offset {offset}')
+            remaining -= skipped
+        return stream
+    stream = open(source, 'rb')
+    stream.seek(offset)
+    return stream
+
+def use_local_table(table_name, latency):
+    """
+    Serve DynamoDB from the in-memory stand-in (scripts/local_aws.py)
+    """
+    from dofs_core import use_stub
+    from local_aws import FakeDynamoDB, FakeDynamoDBResource
+    dynamodb = FakeDynamoDB({table_name: ('order_id', None)}, latency=latency)
+    use_stub('dynamodb', client=dynamodb, resource=FakeDynamoDBResource(dynamodb))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('source', help="NDJSON file, or - for stdin")
+    parser.add_argument('--table', default=os.environ.get('ORDERS_TABLE_NAME'))
+    parser.add_argument('--checkpoint', help='checkpoint file (default <source>.checkpoint; required to resume stdin)')
+    parser.add_argument('--restart', action='store_true', help='ignore an existing checkpoint')
+    parser.add_argument('--rejects', help='append rejected lines here as NDJSON')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='validation processes')
+    parser.add_argument('--writers', type=int, default=8, help='batch_writer threads')
+    parser.add_argument('--chunk-rows', type=int, default=500)
+    parser.add_argument('--progress-seconds', type=float, default=5.0)
+    parser.add_argument('--local', action='store_true', help='write to an in-memory table instead of DynamoDB')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='simulated round trip per --local call')
+    args = parser.parse_args()
+    if not args.table and not args.local:
+        parser.error('--table (or ORDERS_TABLE_NAME) is required')
+    if min(args.workers, args.writers, args.chunk_rows) < 1:
+        parser.error('--workers, --writers and --chunk-rows must be at least 1')
+
+    table_name = args.table or 'dofs-orders-local'
+    if args.local:
+        use_local_table(table_name, args.latency_ms / 1000)
+
+    checkpoint_path = args.checkpoint or (None if args.source == '-' else f'{args.source}.checkpoint')
+    checkpoint = None if args.restart else load_checkpoint(checkpoint_path, args.source)
+    checkpoint = checkpoint or {'source': args.source, 'offset': 0, 'rows': 0, 'imported': 0, 'rejected': 0}
+    resumed_from = checkpoint['offset']
+
+    stream = open_source(args.source, checkpoint['offset'])
+    rejects_file = open(args.rejects, 'a') if args.rejects else None
+    start = time.monotonic()
+    rows = 0
+    last_progress = last_checkpoint = start
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as validators, \
+                ThreadPoolExecutor(max_workers=args.writers) as writers:
+            chunks = read_chunks(stream, checkpoint['offset'], args.chunk_rows)
+            validated = ordered_map(validators, validate_chunk, chunks, args.workers * 2)
+            written = ordered_map(writers, lambda chunk: write_chunk(table_name, chunk), validated,
+                                  args.writers * 2)
+            for end_offset, imported, rejects, chunk_rows in written:
+                if rejects_file:
+                    for reject in rejects:
+                        rejects_file.write(json.dumps(reject) + '\n')
+                rows += chunk_rows
+                checkpoint.update(
+                    offset=end_offset,
+                    rows=checkpoint['rows'] + chunk_rows,
+                    imported=checkpoint['imported'] + imported,
+                    rejected=checkpoint['rejected'] + len(rejects)
+                )
+
+                now = time.monotonic()
+                if checkpoint_path and now - last_checkpoint >= CHECKPOINT_INTERVAL_SECONDS:
+                    if rejects_file:
+                        rejects_file.flush()
+                    save_checkpoint(checkpoint_path, checkpoint)
+                    last_checkpoint = now
+                if now - last_progress >= args.progress_seconds:
+                    print(f"rows {checkpoint['rows']}  imported {checkpoint['imported']}  "
+                          f"rejected {checkpoint['rejected']}  offset {end_offset}  "
+                          f'{rows / (now - start):.0f} rows/s', file=sys.stderr)
+                    last_progress = now
+    finally:
+        if rejects_file:
+            rejects_file.close()
+        if checkpoint_path:
+            save_checkpoint(checkpoint_path, checkpoint)
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+    elapsed = time.monotonic() - start
+    print(json.dumps({
+        'event': 'import_completed',
+        'source': args.source,
+        'resumed_from_offset': resumed_from,
+        **checkpoint,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed) if elapsed else None
+    }))
+
+if __name__ == '__main__':
+    main()
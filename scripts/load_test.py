@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+DOFS local end-to-end load test
+
+Runs the pipeline's Lambda handlers in-process, wired together through in-memory
+AWS stand-ins (scripts/local_aws.py) the way they are deployed:
+
+  api_handler --start_execution--> validator -> order_storage --SQS--> fulfill_order
+       |  (backpressure)     ^                    (maxReceiveCount) --DLQ--> dlq_processor
+       +--intake buffer--> intake_drainer
+
+Orders are generated at a target rate from a configurable mix and submitted
+to api_handler from a thread pool (open loop). Step Functions executions, the
+fulfillment event source mapping (batch size + batching window, concurrent
+pollers) and the DLQ processor run concurrently until every queue drains.
+For each stage the harness reports invocations, p50/p95/p99 invocation latency
+and orders per second; end_to_end is request submitted -> order FULFILLED.
+--sfn-rate caps StartExecution like the service quota (throttling beyond
+it), so bursts exercise api_handler's backpressure and the intake drainer.
+Fulfillment goes to a dofs_core.SimulatedProvider (--provider-latency,
+--provider-error-rate, --provider-throttle-rate).
+--enqueue-mode outbox stores each order with an outbox entry instead of
+sending it, and outbox_relay - fed by the outbox table's stream - sends it.
+
+Order kinds (--mix kind=weight,...):
+  valid      well-formed order
+  invalid    passes the API pre-check, fails validation in the workflow
+  malformed  rejected by the API pre-check (missing customer_id)
+  duplicate  repeats an earlier request with the same Idempotency-Key
+
+Usage: python scripts/load_test.py [--orders 2000] [--rate 500]
+           [--mix valid=90,invalid=5,malformed=3,duplicate=2] [--mode stepfunctions]
+           [--bulk-size 1] [--enqueue-mode send] [--latency-ms 0] [--json]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAMBDA_NAMES = ('api_handler', 'validator', 'order_storage', 'fulfill_order', 'dlq_processor',
+                'intake_drainer', 'outbox_relay')
+sys.path.insert(0, os.path.join(REPO_ROOT, 'shared'))
+for lambda_name in LAMBDA_NAMES:
+    sys.path.insert(0, os.path.join(REPO_ROOT, 'lambdas', lambda_name))
+
+ORDERS_TABLE = 'dofs-orders-local'
+FAILED_ORDERS_TABLE = 'dofs-failed-orders-local'
+IDEMPOTENCY_TABLE = 'dofs-idempotency-keys-local'
+ORDER_OUTBOX_TABLE = 'dofs-order-outbox-local'
+CUSTOMER_SUMMARIES_TABLE = 'dofs-customer-summaries-local'
+ORDER_QUEUE_URL = 'https://sqs.local/000000000000/dofs-order-queue-local'
+ORDER_DLQ_URL = 'https://sqs.local/000000000000/dofs-order-dlq-local'
+INTAKE_BUFFER_QUEUE_URL = 'https://sqs.local/000000000000/dofs-intake-buffer-local'
+STATE_MACHINE_ARN = 'arn:aws:states:local:000000000000:stateMachine:dofs-order-processing-local'
+
+STAGES = ('api', 'drain', 'validate', 'store', 'relay', 'fulfill', 'dlq', 'end_to_end')
+
+class StageStats:
+    """
+    Thread-safe latency samples and order counts for one pipeline stage
+    """
+    def __init__(self):
+        self.durations = []
+        self.orders = 0
+        self.first_start = None
+        self.last_end = None
+        self._lock = threading.Lock()
+
+    def record(self, start, end, orders=1):
+        with self._lock:
+            self.durations.append(end - start)
+            self.orders += orders
+            if self.first_start is None or start < self.first_start:
+                self.first_start = start
+            if self.last_end is None or end > self.last_end:
+                self.last_end = end
+
+    def summary(self):
+        durations = sorted(self.durations)
+        if not durations:
+            return {'invocations': 0, 'orders': 0}
+
+        def percentile(p):
+            return durations[min(len(durations) - 1, int(round(p / 100 * (len(durations) - 1))))] * 1000
+
+        window = max(self.last_end - self.first_start, 1e-9)
+        return {
+            'invocations': len(durations),
+            'orders': self.orders,
+            'p50_ms': percentile(50),
+            'p95_ms': percentile(95),
+            'p99_ms': percentile(99),
+            'orders_per_second': self.orders / window
+        }
+
+class FakeContext:
+    """
+    The parts of the Lambda context object the handlers use
+    """
+    def __init__(self, function_name, timeout_seconds=30):
+        self.aws_request_id = str(uuid.uuid4())
+        self.function_name = function_name
+        self.memory_limit_in_mb = 128
+        self._deadline = time.monotonic() + timeout_seconds
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        if kind not in ('valid', 'invalid', 'malformed', 'duplicate'):
+            raise argparse.ArgumentTypeError(f'Unknown order kind: {kind}')
+        mix[kind] = float(weight)
+    return mix
+
+def make_order(rng, max_items):
+    items = [
+        {'product_id': f'prod_{rng.randrange(10000):05d}',
+         'quantity': rng.randint(1, 5),
+         'price': rng.randrange(100, 20000) / 100}
+        for _ in range(rng.randint(1, max_items))
+    ]
+    total_cents = sum(item['quantity'] * round(item['price'] * 100) for item in items)
+    return {
+        'customer_id': f'cust_{rng.randrange(1000):04d}',
+        'items': items,
+        'total_amount': total_cents / 100,
+        'shipping_address': {'street': '1 Load Test Way', 'city': 'Localhost'}
+    }
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.stats = {stage: StageStats() for stage in STAGES}
+        self.responses = {}
+        self.buffered_orders = 0
+        self.submitted_at = {}
+        self.fulfilled_at = {}
+        self.sent_requests = []
+        self._lock = threading.Lock()
+        self.stop = threading.Event()
+        self.emf_lines = 0
+
+    def setup(self):
+        os.environ.update({
+            'ORDER_PIPELINE_MODE': self.args.mode,
+            'ORDER_ENQUEUE_MODE': self.args.enqueue_mode,
+            'ORDER_OUTBOX_TABLE_NAME': ORDER_OUTBOX_TABLE,
+            'CUSTOMER_SUMMARIES_TABLE_NAME': CUSTOMER_SUMMARIES_TABLE,
+            'ORDERS_TABLE_NAME': ORDERS_TABLE,
+            'FAILED_ORDERS_TABLE_NAME': FAILED_ORDERS_TABLE,
+            'IDEMPOTENCY_TABLE_NAME': IDEMPOTENCY_TABLE,
+            'ORDER_QUEUE_URL': ORDER_QUEUE_URL,
+            'INTAKE_BUFFER_QUEUE_URL': INTAKE_BUFFER_QUEUE_URL,
+            'START_EXECUTION_RATE': str(self.args.start_rate),
+            'START_EXECUTION_BURST': str(self.args.start_rate),
+            'DRAIN_START_EXECUTION_RATE': str(self.args.drain_rate),
+            'STEP_FUNCTION_ARN': STATE_MACHINE_ARN,
+            'LOG_LEVEL': self.args.log_level
+        })
+        # Handlers log through the root logger; keep the records off the console
+        logging.getLogger().addHandler(logging.NullHandler())
+
+        from dofs_core import SimulatedProvider, use_fulfillment_provider, use_metrics_sink, use_stub
+        from local_aws import FakeDynamoDB, FakeDynamoDBResource, FakeSqs, FakeStepFunctions
+
+        latency = self.args.latency_ms / 1000
+        self.dynamodb = FakeDynamoDB({
+            ORDERS_TABLE: ('order_id', None),
+            FAILED_ORDERS_TABLE: ('order_id', None),
+            IDEMPOTENCY_TABLE: ('idempotency_key', None),
+            ORDER_OUTBOX_TABLE: ('order_id', None),
+            CUSTOMER_SUMMARIES_TABLE: ('customer_id', None)
+        }, latency=latency, streams=(ORDER_OUTBOX_TABLE,))
+        # Throttled records come back after DelaySeconds / 100 (5 s backoff -> 50 ms)
+        self.sqs = FakeSqs(latency=latency, delay_scale=0.01)
+        self.sqs.create_queue(ORDER_DLQ_URL)
+        self.sqs.create_queue(ORDER_QUEUE_URL, dlq_url=ORDER_DLQ_URL,
+                              max_receive_count=self.args.max_receive_count)
+        self.sqs.create_queue(INTAKE_BUFFER_QUEUE_URL)
+        self.workflow_pool = ThreadPoolExecutor(max_workers=self.args.workflow_concurrency)
+        self.stepfunctions = FakeStepFunctions(self.workflow_pool, self.run_workflow, latency=latency,
+                                               rate_limit=self.args.sfn_rate)
+
+        use_stub('dynamodb', client=self.dynamodb, resource=FakeDynamoDBResource(self.dynamodb))
+        use_stub('sqs', client=self.sqs)
+        use_stub('stepfunctions', client=self.stepfunctions)
+        # Count the handlers' EMF metric lines instead of printing them
+        use_metrics_sink(self.count_emf_line)
+        use_fulfillment_provider(SimulatedProvider(self.args.provider_latency, self.args.provider_error_rate,
+                                                   self.args.provider_throttle_rate))
+
+        import api_handler
+        import validator
+        import order_storage
+        import fulfill_order
+        import dlq_processor
+        import intake_drainer
+        import outbox_relay
+        self.handlers = {
+            'api': api_handler.lambda_handler,
+            'drain': intake_drainer.lambda_handler,
+            'validate': validator.lambda_handler,
+            'store': order_storage.lambda_handler,
+            'fulfill': fulfill_order.lambda_handler,
+            'dlq': dlq_processor.lambda_handler,
+            'relay': outbox_relay.lambda_handler
+        }
+
+    def count_emf_line(self, line):
+        with self._lock:
+            self.emf_lines += 1
+
+    def invoke(self, stage, event, orders=1):
+        context = FakeContext(stage)
+        start = time.perf_counter()
+        try:
+            return self.handlers[stage](event, context)
+        finally:
+            self.stats[stage].record(start, time.perf_counter(), orders)
+
+    def run_workflow(self, execution_input):
+        """
+        The order processing state machine: ValidateOrder -> CheckValidation -> StoreOrder
+        """
+        order = json.loads(execution_input)
+        validation = self.invoke('validate', order)
+        if validation.get('valid'):
+            try:
+                # StoreOrder's Parameters: the order plus the execution id
+                self.invoke('store', {'order': validation['order'], 'execution_id': str(uuid.uuid4())})
+            except Exception:
+                pass  # StorageFailed - counted by the stage timing, not retried
+
+    def next_request(self):
+        kinds, weights = zip(*self.args.mix.items())
+        kind = self.rng.choices(kinds, weights)[0]
+        if kind == 'duplicate' and self.sent_requests:
+            return self.rng.choice(self.sent_requests)
+
+        def one_order():
+            order = make_order(self.rng, self.args.max_items)
+            if kind == 'invalid':
+                order['total_amount'] = round(order['total_amount'] + 1, 2)
+            elif kind == 'malformed':
+                del order['customer_id']
+            return order
+
+        if self.args.bulk_size > 1:
+            path, body = '/orders', {'orders': [one_order() for _ in range(self.args.bulk_size)]}
+        else:
+            path, body = '/order', one_order()
+        request = (path, json.dumps(body), f'load-{uuid.uuid4()}')
+        with self._lock:
+            self.sent_requests.append(request)
+        return request
+
+    def submit(self, request):
+        path, body, idempotency_key = request
+        event = {
+            'httpMethod': 'POST',
+            'path': path,
+            'headers': {'Content-Type': 'application/json', 'Idempotency-Key': idempotency_key},
+            'body': body
+        }
+        submitted_at = time.perf_counter()
+        try:
+            response = self.invoke('api', event, orders=self.args.bulk_size)
+        except Exception:
+            with self._lock:
+                self.responses['exception'] = self.responses.get('exception', 0) + 1
+            return
+        payload = json.loads(response['body'])
+        results = payload.get('results', [payload])
+        with self._lock:
+            self.responses[response['statusCode']] = self.responses.get(response['statusCode'], 0) + 1
+            for result in results:
+                if result.get('buffered'):
+                    self.buffered_orders += 1
+                if result.get('order_id') and result['order_id'] not in self.submitted_at:
+                    self.submitted_at[result['order_id']] = submitted_at
+
+    def poll(self, stage, queue_url, batch_size, window_seconds, visibility_seconds=0):
+        """
+        One event source mapping poller: receive a batch, invoke, settle
+        With visibility_seconds, failed records stay invisible that long first
+        """
+        while not self.stop.is_set():
+            records, messages = self.sqs.receive(queue_url, batch_size, window_seconds, self.stop)
+            if not records:
+                continue
+            try:
+                response = self.invoke(stage, {'Records': records}, orders=len(records))
+                failed = {failure['itemIdentifier'] for failure in response.get('batchItemFailures', [])}
+            except Exception:
+                failed = {record['messageId'] for record in records}
+            if stage == 'fulfill':
+                self.record_fulfilled(records, failed)
+            if failed and visibility_seconds:
+                self.stop.wait(visibility_seconds)
+            self.sqs.settle(queue_url, messages, failed)
+
+    def relay(self, batch_size, window_seconds):
+        """
+        The outbox stream's event source mapping: read a batch, invoke, settle
+        """
+        while not self.stop.is_set():
+            records = self.dynamodb.read_stream(ORDER_OUTBOX_TABLE, batch_size, window_seconds, self.stop)
+            if not records:
+                continue
+            try:
+                response = self.invoke('relay', {'Records': records}, orders=len(records))
+                failed = {failure['itemIdentifier'] for failure in response.get('batchItemFailures', [])}
+            except Exception:
+                failed = {record['dynamodb']['SequenceNumber'] for record in records}
+            self.dynamodb.settle_stream(ORDER_OUTBOX_TABLE, records, failed)
+
+    def record_fulfilled(self, records, failed):
+        from dofs_core import decode_order_message
+        now = time.perf_counter()
+        for record in records:
+            if record['messageId'] not in failed:
+                self.fulfilled_at.setdefault(decode_order_message(record['body']).get('order_id'), now)
+
+    def run(self):
+        self.setup()
+        args = self.args
+        pollers = [
+            threading.Thread(target=self.poll, daemon=True,
+                             args=('fulfill', ORDER_QUEUE_URL, args.fulfillment_batch_size,
+                                   args.batching_window_ms / 1000))
+            for _ in range(args.fulfillment_concurrency)
+        ] + [
+            threading.Thread(target=self.poll, daemon=True,
+                             args=('dlq', ORDER_DLQ_URL, args.dlq_batch_size, args.batching_window_ms / 1000))
+        ] + [
+            threading.Thread(target=self.poll, daemon=True,
+                             args=('drain', INTAKE_BUFFER_QUEUE_URL, 10, 0, args.buffer_visibility_ms / 1000))
+            for _ in range(args.drain_concurrency)
+        ] + [
+            threading.Thread(target=self.relay, daemon=True,
+                             args=(args.relay_batch_size, args.batching_window_ms / 1000))
+        ]
+        for poller in pollers:
+            poller.start()
+
+        requests_count = max(1, args.orders // args.bulk_size)
+        interval = args.bulk_size / args.rate
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.api_concurrency) as api_pool:
+            for index in range(requests_count):
+                delay = started + index * interval - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                api_pool.submit(self.submit, self.next_request())
+        submitted = time.perf_counter()
+
+        # Drain: workflows first (they feed SQS and the outbox), then the outbox and the queues
+        while not (self.stepfunctions.idle() and self.dynamodb.stream_idle() and self.sqs.idle()):
+            time.sleep(0.01)
+        finished = time.perf_counter()
+        self.stop.set()
+        self.sqs.wake()
+        for poller in pollers:
+            poller.join()
+        self.workflow_pool.shutdown()
+
+        # Fulfillment can finish before api_handler returns (direct mode), so
+        # end-to-end samples are matched up once everything has run
+        for order_id, fulfilled_at in self.fulfilled_at.items():
+            if order_id in self.submitted_at:
+                self.stats['end_to_end'].record(self.submitted_at[order_id], fulfilled_at)
+
+        statuses = {}
+        for order in self.dynamodb.items(ORDERS_TABLE):
+            statuses[order['status']] = statuses.get(order['status'], 0) + 1
+        return {
+            'config': {key: value for key, value in vars(args).items() if key != 'json'},
+            'requests': requests_count,
+            'submit_seconds': submitted - started,
+            'wall_seconds': finished - started,
+            'api_status_codes': dict(sorted(self.responses.items(), key=str)),
+            'orders_by_status': statuses,
+            'failed_orders_stored': len(self.dynamodb.items(FAILED_ORDERS_TABLE)),
+            'customer_summaries': self.check_customer_summaries(),
+            'buffered_orders': self.buffered_orders,
+            'emf_lines': self.emf_lines,
+            'stages': {stage: self.stats[stage].summary() for stage in STAGES},
+            'aws_calls': {
+                'dynamodb': self.dynamodb.calls,
+                'sqs': self.sqs.calls,
+                'stepfunctions': self.stepfunctions.calls
+            }
+        }
+
+    def check_customer_summaries(self):
+        """
+        Recount every customer's orders from the orders table and compare
+        with the incrementally maintained summaries
+        """
+        expected = {}
+        for order in self.dynamodb.items(ORDERS_TABLE):
+            counts = expected.setdefault(order['customer_id'], {'order_count': 0, 'fulfilled_count': 0})
+            counts['order_count'] += 1
+            counts['fulfilled_count'] += order['status'] == 'FULFILLED'
+        mismatched = 0
+        for summary in self.dynamodb.items(CUSTOMER_SUMMARIES_TABLE):
+            counts = expected.pop(summary['customer_id'], {})
+            if any(summary.get(name, 0) != count for name, count in counts.items()):
+                mismatched += 1
+        return {'customers': len(self.dynamodb.items(CUSTOMER_SUMMARIES_TABLE)),
+                'mismatched': mismatched + len(expected)}
+
+def print_report(report):
+    print(f"requests: {report['requests']}  wall: {report['wall_seconds']:.2f}s "
+          f"(submitting {report['submit_seconds']:.2f}s)")
+    print(f"api status codes: {report['api_status_codes']}")
+    print(f"orders by status: {report['orders_by_status']}  "
+          f"failed orders stored: {report['failed_orders_stored']}  "
+          f"buffered orders: {report['buffered_orders']}")
+    print(f"customer summaries: {report['customer_summaries']['customers']}  "
+          f"mismatched: {report['customer_summaries']['mismatched']}")
+    print()
+    print(f"{'stage':<12}{'invocations':>12}{'orders':>9}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}{'orders/s':>11}")
+    for stage, summary in report['stages'].items():
+        if not summary['invocations']:
+            print(f"{stage:<12}{0:>12}{0:>9}{'-':>10}{'-':>10}{'-':>10}{'-':>11}")
+            continue
+        print(f"{stage:<12}{summary['invocations']:>12}{summary['orders']:>9}"
+              f"{summary['p50_ms']:>10.2f}{summary['p95_ms']:>10.2f}{summary['p99_ms']:>10.2f}"
+              f"{summary['orders_per_second']:>11.0f}")
+    print()
+    print(f"aws calls: {report['aws_calls']}  emf metric lines: {report['emf_lines']}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--orders', type=int, default=2000, help='orders to submit')
+    parser.add_argument('--rate', type=float, default=500, help='target orders per second')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('valid=90,invalid=5,malformed=3,duplicate=2'))
+    parser.add_argument('--mode', choices=('stepfunctions', 'direct'), default='stepfunctions')
+    parser.add_argument('--bulk-size', type=int, default=1, help='orders per request (>1 uses POST /orders)')
+    parser.add_argument('--enqueue-mode', choices=('send', 'outbox'), default='send',
+                        help='order_storage ORDER_ENQUEUE_MODE')
+    parser.add_argument('--relay-batch-size', type=int, default=100, help='outbox stream batch size')
+    parser.add_argument('--max-items', type=int, default=5, help='maximum line items per order')
+    parser.add_argument('--api-concurrency', type=int, default=32)
+    parser.add_argument('--workflow-concurrency', type=int, default=32)
+    parser.add_argument('--fulfillment-concurrency', type=int, default=5, help='concurrent fulfillment pollers')
+    parser.add_argument('--fulfillment-batch-size', type=int, default=10)
+    parser.add_argument('--dlq-batch-size', type=int, default=25)
+    parser.add_argument('--batching-window-ms', type=float, default=50)
+    parser.add_argument('--max-receive-count', type=int, default=3)
+    parser.add_argument('--latency-ms', type=float, default=0, help='simulated latency per AWS call')
+    parser.add_argument('--sfn-rate', type=float, default=0,
+                        help='StartExecution quota per second (0 = unlimited)')
+    parser.add_argument('--start-rate', type=float, default=1000,
+                        help="api_handler's StartExecution rate before buffering (START_EXECUTION_RATE)")
+    parser.add_argument('--drain-rate', type=float, default=10,
+                        help='intake drainer StartExecution rate (DRAIN_START_EXECUTION_RATE)')
+    parser.add_argument('--drain-concurrency', type=int, default=2, help='concurrent intake drainer pollers')
+    parser.add_argument('--buffer-visibility-ms', type=float, default=500,
+                        help='intake buffer visibility timeout for deferred records')
+    parser.add_argument('--provider-latency', default='fixed:0',
+                        help='fulfillment provider latency distribution in ms (e.g. lognormal:20:0.5)')
+    parser.add_argument('--provider-error-rate', type=float, default=0.3, help='fulfillment failure rate')
+    parser.add_argument('--provider-throttle-rate', type=float, default=0,
+                        help='fulfillment provider calls per second (0 = unlimited)')
+    parser.add_argument('--log-level', default='INFO')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    report = Harness(args).run()
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+if __name__ == '__main__':
+    main()
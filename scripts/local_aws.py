@@ -0,0 +1,737 @@
+"""
+In-memory stand-ins for the AWS services DOFS uses, for local load tests
+
+FakeDynamoDB      low-level DynamoDB client: put/get/update/delete_item,
+                  batch_write_item, transact_write_items, query and scan over
+                  attribute maps, with the condition and update expressions the
+                  Lambdas use; tables listed in streams get a stream of INSERT
+                  records, read with read_stream/settle_stream like an event
+                  source mapping
+FakeDynamoDBResource  resource-style wrapper (batch_write_item and Table
+                  put_item / batch_writer with plain values)
+FakeSqs           SQS client plus receive/settle hooks that emulate an event
+                  source mapping (receive counts, redrive to a DLQ)
+FakeStepFunctions start_execution that runs the order workflow in-process
+
+Install them with dofs_core.use_stub(). Every call can sleep for a simulated
+network round trip (latency, seconds).
+"""
+import itertools
+import re
+import threading
+import time
+import uuid
+from collections import deque
+
+from dofs_core import from_attribute_value, from_item, to_attribute_value, to_item
+
+class FakeClientError(Exception):
+    """
+    Shaped like botocore's ClientError (exc.response['Error']['Code'])
+    """
+    def __init__(self, code, message='', **extra):
+        super().__init__(f'{code}: {message}' if message else code)
+        self.response = {'Error': {'Code': code, 'Message': message}, **extra}
+
+_TOKEN = re.compile(r'\s*(?:(<=|>=|<>|[=<>(),+-])|([#:]?[A-Za-z_][A-Za-z0-9_]*))')
+_MISSING = object()
+
+def _tokenize(expression):
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if not match or match.end() == position:
+            raise ValueError(f'Unsupported expression syntax near: {expression[position:]!r}')
+        tokens.append(match.group(1) or match.group(2))
+        position = match.end()
+    return tokens
+
+class _Expression:
+    """
+    Evaluates condition / key condition expressions against one item
+    Supports OR / AND / NOT, parentheses, = <> < <= > >=, IN, BETWEEN,
+    attribute_exists, attribute_not_exists and begins_with
+    """
+    def __init__(self, expression, names, values):
+        self.tokens = _tokenize(expression)
+        self.names = names or {}
+        self.values = {key: from_attribute_value(value) for key, value in (values or {}).items()}
+
+    def matches(self, item):
+        self.item = item
+        self.position = 0
+        result = self._or()
+        if self.position != len(self.tokens):
+            raise ValueError(f'Unexpected token {self.tokens[self.position]!r}')
+        return result
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _take(self, expected=None):
+        token = self._peek()
+        if expected is not None and (token is None or token.upper() != expected.upper()):
+            raise ValueError(f'Expected {expected!r}, got {token!r}')
+        self.position += 1
+        return token
+
+    def _keyword(self, word):
+        token = self._peek()
+        return token is not None and token.upper() == word
+
+    def _or(self):
+        result = self._and()
+        while self._keyword('OR'):
+            self._take()
+            right = self._and()
+            result = result or right
+        return result
+
+    def _and(self):
+        result = self._not()
+        while self._keyword('AND'):
+            self._take()
+            right = self._not()
+            result = result and right
+        return result
+
+    def _not(self):
+        if self._keyword('NOT'):
+            self._take()
+            return not self._not()
+        return self._primary()
+
+    def _primary(self):
+        token = self._peek()
+        if token == '(':
+            self._take('(')
+            result = self._or()
+            self._take(')')
+            return result
+        function = token.lower() if token else None
+        if function in ('attribute_exists', 'attribute_not_exists', 'begins_with'):
+            self._take()
+            self._take('(')
+            value = self._operand()
+            if function == 'begins_with':
+                self._take(',')
+                prefix = self._operand()
+                self._take(')')
+                return isinstance(value, str) and value.startswith(prefix)
+            self._take(')')
+            return (value is not _MISSING) == (function == 'attribute_exists')
+
+        left = self._operand()
+        if self._keyword('IN'):
+            self._take()
+            self._take('(')
+            options = [self._operand()]
+            while self._peek() == ',':
+                self._take(',')
+                options.append(self._operand())
+            self._take(')')
+            return left is not _MISSING and left in options
+        if self._keyword('BETWEEN'):
+            self._take()
+            low = self._operand()
+            self._take('AND')
+            high = self._operand()
+            return left is not _MISSING and low <= left <= high
+        operator = self._take()
+        right = self._operand()
+        if left is _MISSING or right is _MISSING:
+            return operator == '<>'
+        if operator == '=':
+            return left == right
+        if operator == '<>':
+            return left != right
+        if operator == '<':
+            return left < right
+        if operator == '<=':
+            return left <= right
+        if operator == '>':
+            return left > right
+        if operator == '>=':
+            return left >= right
+        raise ValueError(f'Unsupported operator {operator!r}')
+
+    def _operand(self):
+        token = self._take()
+        if token.startswith(':'):
+            return self.values[token]
+        name = self.names.get(token, token)
+        if name not in self.item:
+            return _MISSING
+        return from_attribute_value(self.item[name])
+
+def _apply_update(item, expression, names, values):
+    """
+    Apply a SET / ADD / REMOVE update expression to an attribute map in place
+    SET supports `a = :v`, `a = a + :v` and `a = if_not_exists(a, :v)`
+    """
+    values = values or {}
+    names = names or {}
+    for clause in re.split(r'\s+(?=(?:SET|ADD|REMOVE)\s)', ' ' + expression.strip()):
+        clause = clause.strip()
+        if not clause:
+            continue
+        action, _, body = clause.partition(' ')
+        action = action.upper()
+        for part in _split_top_level(body):
+            if action == 'REMOVE':
+                item.pop(names.get(part, part), None)
+            elif action == 'ADD':
+                target, value_token = part.split()
+                target = names.get(target, target)
+                increment = from_attribute_value(values[value_token])
+                current = from_attribute_value(item[target]) if target in item else 0
+                item[target] = to_attribute_value(current + increment)
+            elif action == 'SET':
+                target, _, source = (token.strip() for token in part.partition('='))
+                target = names.get(target, target)
+                item[target] = _evaluate_set(item, source, names, values)
+            else:
+                raise ValueError(f'Unsupported update action {action!r}')
+
+def _split_top_level(body):
+    parts, depth, current = [], 0, ''
+    for char in body:
+        depth += (char == '(') - (char == ')')
+        if char == ',' and depth == 0:
+            parts.append(current.strip())
+            current = ''
+        else:
+            current += char
+    return [part for part in parts + [current.strip()] if part]
+
+def _evaluate_set(item, source, names, values):
+    match = re.fullmatch(r'if_not_exists\(\s*([#\w]+)\s*,\s*(:\w+)\s*\)', source)
+    if match:
+        existing = names.get(match.group(1), match.group(1))
+        return item[existing] if existing in item else values[match.group(2)]
+    match = re.fullmatch(r'([#\w]+)\s*([+-])\s*(:\w+)', source)
+    if match:
+        attribute = names.get(match.group(1), match.group(1))
+        current = from_attribute_value(item[attribute]) if attribute in item else 0
+        operand = from_attribute_value(values[match.group(3)])
+        return to_attribute_value(current + operand if match.group(2) == '+' else current - operand)
+    if source.startswith(':'):
+        return values[source]
+    return item[names.get(source, source)]
+
+class FakeDynamoDB:
+    """
+    Thread-safe in-memory DynamoDB low-level client
+    key_schema maps table name -> (hash key, range key or None); indexes maps
+    table name -> {index name: (hash key, range key or None)}; streams lists
+    the tables whose new items are recorded as stream INSERT records
+    """
+    def __init__(self, key_schema, indexes=None, latency=0.0, streams=()):
+        self.key_schema = key_schema
+        self.indexes = indexes or {}
+        self.latency = latency
+        self.tables = {name: {} for name in key_schema}
+        self.calls = {}
+        self._lock = threading.Lock()
+        self.streams = {name: deque() for name in streams}
+        self.stream_in_flight = 0
+        self._sequence_numbers = itertools.count(1)
+        self._stream_condition = threading.Condition()
+
+    def _call(self, operation):
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _key(self, table_name, item):
+        hash_key, range_key = self.key_schema[table_name]
+        return (item[hash_key]['S' if 'S' in item[hash_key] else 'N'],
+                item[range_key]['S' if 'S' in item[range_key] else 'N'] if range_key else None)
+
+    def _store(self, table_name, key, item):
+        """
+        Write item under key (caller holds the lock), recording a stream
+        INSERT record when the table is streamed and the key is new
+        """
+        table = self.tables[table_name]
+        created = key not in table
+        table[key] = dict(item)
+        if created and table_name in self.streams:
+            with self._stream_condition:
+                self.streams[table_name].append({
+                    'eventID': str(uuid.uuid4()),
+                    'eventName': 'INSERT',
+                    'eventSource': 'aws:dynamodb',
+                    'dynamodb': {
+                        'Keys': {name: item[name] for name in self.key_schema[table_name] if name},
+                        'NewImage': dict(item),
+                        'SequenceNumber': str(next(self._sequence_numbers)),
+                        'StreamViewType': 'NEW_IMAGE'
+                    }
+                })
+                self._stream_condition.notify_all()
+
+    def _check(self, current, kwargs):
+        expression = kwargs.get('ConditionExpression')
+        if expression is None:
+            return
+        condition = _Expression(expression, kwargs.get('ExpressionAttributeNames'),
+                                kwargs.get('ExpressionAttributeValues'))
+        if not condition.matches(current or {}):
+            extra = {}
+            if kwargs.get('ReturnValuesOnConditionCheckFailure') == 'ALL_OLD' and current:
+                extra['Item'] = dict(current)
+            raise FakeClientError('ConditionalCheckFailedException',
+                                  'The conditional request failed', **extra)
+
+    def put_item(self, TableName, Item, **kwargs):
+        self._call('put_item')
+        with self._lock:
+            key = self._key(TableName, Item)
+            self._check(self.tables[TableName].get(key), kwargs)
+            self._store(TableName, key, Item)
+        return {}
+
+    def get_item(self, TableName, Key, **kwargs):
+        self._call('get_item')
+        with self._lock:
+            item = self.tables[TableName].get(self._key(TableName, Key))
+        return {'Item': dict(item)} if item is not None else {}
+
+    def update_item(self, TableName, Key, UpdateExpression, **kwargs):
+        self._call('update_item')
+        with self._lock:
+            table = self.tables[TableName]
+            key = self._key(TableName, Key)
+            current = table.get(key)
+            self._check(current, kwargs)
+            item = dict(current or Key)
+            _apply_update(item, UpdateExpression, kwargs.get('ExpressionAttributeNames'),
+                          kwargs.get('ExpressionAttributeValues'))
+            table[key] = item
+        if kwargs.get('ReturnValues') == 'ALL_NEW':
+            return {'Attributes': dict(item)}
+        return {}
+
+    def delete_item(self, TableName, Key, **kwargs):
+        self._call('delete_item')
+        with self._lock:
+            table = self.tables[TableName]
+            key = self._key(TableName, Key)
+            self._check(table.get(key), kwargs)
+            table.pop(key, None)
+        return {}
+
+    def batch_write_item(self, RequestItems):
+        self._call('batch_write_item')
+        with self._lock:
+            for table_name, requests in RequestItems.items():
+                table = self.tables[table_name]
+                for request in requests:
+                    if 'PutRequest' in request:
+                        item = request['PutRequest']['Item']
+                        self._store(table_name, self._key(table_name, item), item)
+                    else:
+                        table.pop(self._key(table_name, request['DeleteRequest']['Key']), None)
+        return {'UnprocessedItems': {}}
+
+    def transact_write_items(self, TransactItems, **kwargs):
+        self._call('transact_write_items')
+        with self._lock:
+            reasons = []
+            for entry in TransactItems:
+                (operation, params), = entry.items()
+                table = self.tables[params['TableName']]
+                key = self._key(params['TableName'], params.get('Item') or params['Key'])
+                try:
+                    self._check(table.get(key), params)
+                    reasons.append({'Code': 'None'})
+                except FakeClientError:
+                    reasons.append({'Code': 'ConditionalCheckFailed'})
+            if any(reason['Code'] != 'None' for reason in reasons):
+                raise FakeClientError('TransactionCanceledException', 'Transaction cancelled',
+                                      CancellationReasons=reasons)
+            for entry in TransactItems:
+                (operation, params), = entry.items()
+                table = self.tables[params['TableName']]
+                key = self._key(params['TableName'], params.get('Item') or params['Key'])
+                if operation == 'Put':
+                    self._store(params['TableName'], key, params['Item'])
+                elif operation == 'Update':
+                    item = dict(table.get(key) or params['Key'])
+                    _apply_update(item, params['UpdateExpression'],
+                                  params.get('ExpressionAttributeNames'),
+                                  params.get('ExpressionAttributeValues'))
+                    table[key] = item
+                elif operation == 'Delete':
+                    table.pop(key, None)
+        return {}
+
+    def _page(self, items, kwargs, key_names):
+        if 'FilterExpression' in kwargs:
+            condition = _Expression(kwargs['FilterExpression'], kwargs.get('ExpressionAttributeNames'),
+                                    kwargs.get('ExpressionAttributeValues'))
+            items = [item for item in items if condition.matches(item)]
+        start = kwargs.get('ExclusiveStartKey')
+        if start is not None:
+            marker = tuple(from_attribute_value(start[name]) for name in key_names)
+            position = next((index for index, item in enumerate(items)
+                             if tuple(from_attribute_value(item[name]) for name in key_names) == marker), None)
+            items = items[position + 1:] if position is not None else []
+        limit = kwargs.get('Limit')
+        page = items[:limit] if limit else items
+        response = {'Items': [dict(item) for item in page], 'Count': len(page)}
+        if limit and len(items) > limit:
+            response['LastEvaluatedKey'] = {name: page[-1][name] for name in key_names if name in page[-1]}
+        return response
+
+    def query(self, TableName, KeyConditionExpression, **kwargs):
+        self._call('query')
+        index_name = kwargs.get('IndexName')
+        hash_key, range_key = (self.indexes[TableName][index_name] if index_name
+                               else self.key_schema[TableName])
+        condition = _Expression(KeyConditionExpression, kwargs.get('ExpressionAttributeNames'),
+                                kwargs.get('ExpressionAttributeValues'))
+        with self._lock:
+            items = [item for item in self.tables[TableName].values()
+                     if hash_key in item and (range_key is None or range_key in item)
+                     and condition.matches(item)]
+        if range_key:
+            items.sort(key=lambda item: from_attribute_value(item[range_key]),
+                       reverse=not kwargs.get('ScanIndexForward', True))
+        table_keys = [name for name in self.key_schema[TableName] if name]
+        key_names = list(dict.fromkeys([hash_key] + ([range_key] if range_key else []) + table_keys))
+        return self._page(items, kwargs, key_names)
+
+    def scan(self, TableName, **kwargs):
+        self._call('scan')
+        with self._lock:
+            items = list(self.tables[TableName].values())
+        segments = kwargs.get('TotalSegments')
+        if segments:
+            segment = kwargs['Segment']
+            items = [item for item in items
+                     if hash(self._key(TableName, item)) % segments == segment]
+        key_names = [name for name in self.key_schema[TableName] if name]
+        return self._page(items, kwargs, key_names)
+
+    def read_stream(self, table_name, max_records, wait_seconds, stop):
+        """
+        Take up to max_records stream records, waiting up to wait_seconds for
+        a full batch (the batching window)
+        """
+        deadline = time.monotonic() + wait_seconds
+        with self._stream_condition:
+            stream = self.streams[table_name]
+            while len(stream) < max_records and not stop.is_set():
+                remaining = deadline - time.monotonic() if stream else 0.05
+                if remaining <= 0:
+                    break
+                self._stream_condition.wait(remaining)
+            batch = [stream.popleft() for _ in range(min(max_records, len(stream)))]
+            self.stream_in_flight += len(batch)
+        return batch
+
+    def settle_stream(self, table_name, records, failed_sequence_numbers):
+        """
+        Finish a batch; like a stream event source mapping, retry from the
+        first failed record (it and every record after it go back in front)
+        """
+        failed_positions = [position for position, record in enumerate(records)
+                            if record['dynamodb']['SequenceNumber'] in failed_sequence_numbers]
+        with self._stream_condition:
+            if failed_positions:
+                self.streams[table_name].extendleft(reversed(records[failed_positions[0]:]))
+            self.stream_in_flight -= len(records)
+            self._stream_condition.notify_all()
+
+    def stream_idle(self):
+        with self._stream_condition:
+            return self.stream_in_flight == 0 and not any(self.streams.values())
+
+    def get_paginator(self, operation_name):
+        return _Paginator(getattr(self, operation_name))
+
+    def items(self, table_name):
+        """
+        Snapshot of a table as plain dicts (harness inspection)
+        """
+        with self._lock:
+            return [from_item(item) for item in self.tables[table_name].values()]
+
+class _Paginator:
+    def __init__(self, operation):
+        self.operation = operation
+
+    def paginate(self, **kwargs):
+        while True:
+            page = self.operation(**kwargs)
+            yield page
+            if 'LastEvaluatedKey' not in page:
+                return
+            kwargs = {**kwargs, 'ExclusiveStartKey': page['LastEvaluatedKey']}
+
+class _FakeTable:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def put_item(self, Item, **kwargs):
+        return self.client.put_item(TableName=self.name, Item=to_item(Item), **kwargs)
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return _FakeBatchWriter(self.client, self.name, overwrite_by_pkeys)
+
+class _FakeBatchWriter:
+    """
+    Table.batch_writer(): buffers puts into 25-item batch_write_item calls,
+    keeping only the last put per key when overwrite_by_pkeys is given
+    """
+    def __init__(self, client, table_name, overwrite_by_pkeys):
+        self.client = client
+        self.table_name = table_name
+        self.overwrite_by_pkeys = overwrite_by_pkeys
+        self._items = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        while self._items:
+            self._flush()
+        return False
+
+    def put_item(self, Item):
+        if self.overwrite_by_pkeys:
+            key = [Item[name] for name in self.overwrite_by_pkeys]
+            self._items = [item for item in self._items
+                           if [item[name] for name in self.overwrite_by_pkeys] != key]
+        self._items.append(Item)
+        if len(self._items) >= 25:
+            self._flush()
+
+    def _flush(self):
+        batch, self._items = self._items[:25], self._items[25:]
+        self.client.batch_write_item(RequestItems={
+            self.table_name: [{'PutRequest': {'Item': to_item(item)}} for item in batch]
+        })
+
+class FakeDynamoDBResource:
+    """
+    The slice of the boto3 DynamoDB resource the Lambdas use, backed by FakeDynamoDB
+    """
+    def __init__(self, client):
+        self.client = client
+
+    def Table(self, name):
+        return _FakeTable(self.client, name)
+
+    def batch_write_item(self, RequestItems):
+        converted = {}
+        for table_name, requests in RequestItems.items():
+            converted[table_name] = [
+                {'PutRequest': {'Item': to_item(request['PutRequest']['Item'])}}
+                if 'PutRequest' in request else
+                {'DeleteRequest': {'Key': to_item(request['DeleteRequest']['Key'])}}
+                for request in requests
+            ]
+        return self.client.batch_write_item(RequestItems=converted)
+
+class FakeSqs:
+    """
+    In-memory SQS queues keyed by URL
+    receive() / settle() stand in for a Lambda event source mapping: failed
+    messages are made visible again, or moved to the queue's DLQ once received
+    max_receive_count times
+    Messages sent with DelaySeconds become visible after DelaySeconds *
+    delay_scale seconds (scaled down so simulated backoff doesn't stall a run)
+    """
+    def __init__(self, latency=0.0, delay_scale=1.0):
+        self.latency = latency
+        self.delay_scale = delay_scale
+        self.queues = {}
+        self.redrive = {}
+        self.calls = {}
+        self.in_flight = 0
+        self.dropped = 0
+        self._ids = itertools.count()
+        self._condition = threading.Condition()
+
+    def create_queue(self, url, dlq_url=None, max_receive_count=3):
+        self.queues[url] = deque()
+        if dlq_url:
+            self.redrive[url] = (dlq_url, max_receive_count)
+        return url
+
+    def _call(self, operation):
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _enqueue(self, url, body, attributes, delay_seconds=0):
+        message = {
+            'MessageId': str(uuid.UUID(int=next(self._ids))),
+            'Body': body,
+            'MessageAttributes': attributes or {},
+            'ReceiveCount': 0,
+            'SentTimestamp': time.time()
+        }
+        if delay_seconds:
+            # Counted in flight until visible, so idle() waits for it
+            with self._condition:
+                self.in_flight += 1
+            timer = threading.Timer(delay_seconds * self.delay_scale, self._deliver_delayed, (url, message))
+            timer.daemon = True
+            timer.start()
+            return message['MessageId']
+        with self._condition:
+            self.queues[url].append(message)
+            self._condition.notify_all()
+        return message['MessageId']
+
+    def _deliver_delayed(self, url, message):
+        with self._condition:
+            self.in_flight -= 1
+            self.queues[url].append(message)
+            self._condition.notify_all()
+
+    def send_message(self, QueueUrl, MessageBody, MessageAttributes=None, DelaySeconds=0, **kwargs):
+        self._call('send_message')
+        return {'MessageId': self._enqueue(QueueUrl, MessageBody, MessageAttributes, DelaySeconds)}
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self._call('send_message_batch')
+        return {
+            'Successful': [
+                {'Id': entry['Id'],
+                 'MessageId': self._enqueue(QueueUrl, entry['MessageBody'], entry.get('MessageAttributes'),
+                                            entry.get('DelaySeconds', 0))}
+                for entry in Entries
+            ],
+            'Failed': []
+        }
+
+    def get_queue_attributes(self, QueueUrl, AttributeNames=None):
+        self._call('get_queue_attributes')
+        with self._condition:
+            depth = len(self.queues[QueueUrl])
+        return {'Attributes': {'ApproximateNumberOfMessages': str(depth)}}
+
+    def receive(self, url, max_messages, wait_seconds, stop):
+        """
+        Take up to max_messages, waiting up to wait_seconds for a full batch
+        (the batching window); returns SQS event records for a Lambda
+        """
+        deadline = time.monotonic() + wait_seconds
+        with self._condition:
+            queue = self.queues[url]
+            while len(queue) < max_messages and not stop.is_set():
+                remaining = deadline - time.monotonic() if queue else 0.05
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = [queue.popleft() for _ in range(min(max_messages, len(queue)))]
+            self.in_flight += len(batch)
+        for message in batch:
+            message['ReceiveCount'] += 1
+        return [self._record(url, message) for message in batch], batch
+
+    def settle(self, url, messages, failed_message_ids):
+        """
+        Delete processed messages; redeliver or dead-letter the failed ones
+        """
+        dlq_url, max_receive_count = self.redrive.get(url, (None, None))
+        with self._condition:
+            for message in messages:
+                if message['MessageId'] not in failed_message_ids:
+                    continue
+                if max_receive_count is not None and message['ReceiveCount'] >= max_receive_count:
+                    # Like SQS, the receive count carries over into the DLQ
+                    self.queues[dlq_url].append(message)
+                elif message['ReceiveCount'] >= 10:
+                    self.dropped += 1
+                else:
+                    self.queues[url].append(message)
+            self.in_flight -= len(messages)
+            self._condition.notify_all()
+
+    def idle(self):
+        with self._condition:
+            return self.in_flight == 0 and not any(self.queues.values())
+
+    def wake(self):
+        with self._condition:
+            self._condition.notify_all()
+
+    @staticmethod
+    def _record(url, message):
+        return {
+            'messageId': message['MessageId'],
+            'receiptHandle': message['MessageId'],
+            'body': message['Body'],
+            'attributes': {
+                'ApproximateReceiveCount': str(message['ReceiveCount']),
+                'SentTimestamp': str(int(message['SentTimestamp'] * 1000))
+            },
+            'messageAttributes': {
+                name: {'stringValue': attribute.get('StringValue'), 'dataType': attribute['DataType']}
+                for name, attribute in message['MessageAttributes'].items()
+            },
+            'eventSource': 'aws:sqs',
+            'eventSourceARN': url
+        }
+
+class FakeStepFunctions:
+    """
+    start_execution runs the workflow callable on an executor, like the real
+    service returning before the execution finishes; names must be unique
+    With rate_limit set, starts beyond rate_limit per second (one second of
+    burst) fail with ThrottlingException, like the StartExecution quota
+    """
+    def __init__(self, executor, workflow, latency=0.0, rate_limit=0):
+        self.executor = executor
+        self.workflow = workflow
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.pending = 0
+        self.calls = {}
+        self._names = set()
+        self._tokens = rate_limit
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def start_execution(self, stateMachineArn, name, input):
+        self.calls['start_execution'] = self.calls.get('start_execution', 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if self.rate_limit:
+                now = time.monotonic()
+                self._tokens = min(self.rate_limit, self._tokens + (now - self._updated) * self.rate_limit)
+                self._updated = now
+                if self._tokens < 1:
+                    self.calls['throttled'] = self.calls.get('throttled', 0) + 1
+                    raise FakeClientError('ThrottlingException', 'Rate exceeded')
+                self._tokens -= 1
+            if name in self._names:
+                raise FakeClientError('ExecutionAlreadyExists', f'Execution {name} already exists')
+            self._names.add(name)
+            self.pending += 1
+        self.executor.submit(self._run, input)
+        return {
+            'executionArn': f"{stateMachineArn.replace(':stateMachine:', ':execution:')}:{name}",
+            'startDate': time.time()
+        }
+
+    def _run(self, execution_input):
+        try:
+            self.workflow(execution_input)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def idle(self):
+        with self._lock:
+            return self.pending == 0
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+DOFS failed-order redrive
+
+Replays orders parked in the failed_orders table by dlq_processor back into
+their lanes' order queues (see dofs_core.redrive and dofs_core.lanes), rate
+limited and in batched sends.
+Candidates are filtered by failure_reason prefix and by age; --newer-than
+reads the failed-date-index day by day, otherwise the table is read with a
+parallel segmented Scan. Orders already redriven (and not failed since) and
+orders redriven --max-redrives times are skipped. Prints a JSON summary.
+
+Ages are durations like 90s, 15m, 6h or 2d.
+
+Usage: python scripts/redrive_failed_orders.py [--table dofs-failed-orders-dev]
+           [--queue-url https://sqs...] [--priority-queue-url https://sqs...]
+           [--reason PREFIX] [--older-than 15m]
+           [--newer-than 2d] [--max-redrives 3] [--include-redriven]
+           [--rate 50] [--segments 4] [--limit N] [--dry-run]
+Table and queues default to FAILED_ORDERS_TABLE_NAME / ORDER_QUEUE_URL /
+PRIORITY_ORDER_QUEUE_URL (without a priority queue every order goes to the
+order queue); requires boto3 and credentials for the target account
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'shared'))
+
+from dofs_core.redrive import (  # noqa: E402
+    MAX_REDRIVES, REDRIVE_RATE, REDRIVE_SCAN_SEGMENTS, RedriveCriteria,
+    redrive_failed_orders, select_failed_orders
+)
+
+DURATION_UNITS = {'s': 'seconds', 'm': 'minutes', 'h': 'hours', 'd': 'days'}
+
+def duration(value):
+    match = re.fullmatch(r'(\d+)([smhd])', value)
+    if not match:
+        raise argparse.ArgumentTypeError(f'invalid duration {value!r} (expected e.g. 90s, 15m, 6h, 2d)')
+    return timedelta(**{DURATION_UNITS[match.group(2)]: int(match.group(1))})
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--table', default=os.environ.get('FAILED_ORDERS_TABLE_NAME'))
+    parser.add_argument('--queue-url', default=os.environ.get('ORDER_QUEUE_URL'))
+    parser.add_argument('--priority-queue-url', default=os.environ.get('PRIORITY_ORDER_QUEUE_URL'),
+                        help='priority lane queue')
+    parser.add_argument('--reason', help='only failures whose failure_reason starts with this')
+    parser.add_argument('--older-than', type=duration, help='only failures at least this old')
+    parser.add_argument('--newer-than', type=duration, help='only failures at most this old (up to 92 days)')
+    parser.add_argument('--max-redrives', type=int, default=MAX_REDRIVES)
+    parser.add_argument('--include-redriven', action='store_true',
+                        help='also replay orders redriven before that have not failed since')
+    parser.add_argument('--rate', type=float, default=REDRIVE_RATE, help='messages per second')
+    parser.add_argument('--segments', type=int, default=REDRIVE_SCAN_SEGMENTS)
+    parser.add_argument('--limit', type=int)
+    parser.add_argument('--dry-run', action='store_true', help='count the matching orders only')
+    args = parser.parse_args()
+    if not args.table or (not args.queue_url and not args.dry_run):
+        parser.error('--table and --queue-url (or FAILED_ORDERS_TABLE_NAME / ORDER_QUEUE_URL) are required')
+    if args.rate <= 0 or args.segments < 1:
+        parser.error('--rate must be positive and --segments at least 1')
+
+    # dofs_core.lanes resolves each order's queue from the environment
+    if args.queue_url:
+        os.environ['ORDER_QUEUE_URL'] = args.queue_url
+    if args.priority_queue_url:
+        os.environ['PRIORITY_ORDER_QUEUE_URL'] = args.priority_queue_url
+
+    now = datetime.now(timezone.utc)
+    criteria = RedriveCriteria(
+        reason_prefix=args.reason,
+        failed_after=(now - args.newer_than).isoformat() if args.newer_than else None,
+        failed_before=(now - args.older_than).isoformat() if args.older_than else None,
+        max_redrives=args.max_redrives,
+        include_redriven=args.include_redriven
+    )
+
+    failed_orders = select_failed_orders(args.table, criteria, segments=args.segments)
+    try:
+        summary = redrive_failed_orders(args.table, failed_orders, rate=args.rate,
+                                        limit=args.limit, dry_run=args.dry_run)
+    finally:
+        failed_orders.close()
+
+    print(json.dumps({'event': 'redrive_completed', 'dry_run': args.dry_run, **summary}))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+DOFS intake buffer redrive
+
+Moves orders from the intake buffer DLQ back to the intake buffer queue,
+where the intake drainer starts their executions under the usual pacing.
+api_handler answered 202 ("buffered": true) for every one of these orders,
+so the DLQ is a holding area, not a final state: redrive it once the
+workflow is accepting executions again. The move is an SQS message move
+task (StartMessageMoveTask), paced at --rate messages per second; drained
+executions keep their reserved names, so an order whose execution was in
+fact started is not started twice.
+Prints the task handle as JSON; --status lists the DLQ's recent move tasks
+instead.
+
+Usage: python scripts/redrive_intake_buffer.py [--dlq-url https://sqs...]
+           [--queue-url https://sqs...] [--rate 10] [--status]
+Queues default to INTAKE_BUFFER_DLQ_URL / INTAKE_BUFFER_QUEUE_URL; requires
+boto3 and credentials for the target account
+"""
+import argparse
+import json
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'shared'))
+
+from dofs_core import get_client  # noqa: E402
+
+# Default move pace - the drainer's own StartExecution rate is the real limit
+INTAKE_REDRIVE_RATE = 10
+
+def queue_arn(sqs, queue_url):
+    return sqs.get_queue_attributes(QueueUrl=queue_url, AttributeNames=['QueueArn'])['Attributes']['QueueArn']
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--dlq-url', default=os.environ.get('INTAKE_BUFFER_DLQ_URL'))
+    parser.add_argument('--queue-url', default=os.environ.get('INTAKE_BUFFER_QUEUE_URL'))
+    parser.add_argument('--rate', type=int, default=INTAKE_REDRIVE_RATE, help='messages per second')
+    parser.add_argument('--status', action='store_true', help="list the DLQ's move tasks instead")
+    args = parser.parse_args()
+    if not args.dlq_url or (not args.queue_url and not args.status):
+        parser.error('--dlq-url and --queue-url (or INTAKE_BUFFER_DLQ_URL / INTAKE_BUFFER_QUEUE_URL) are required')
+    if args.rate < 1:
+        parser.error('--rate must be at least 1')
+
+    sqs = get_client('sqs')
+    dlq_arn = queue_arn(sqs, args.dlq_url)
+    if args.status:
+        tasks = sqs.list_message_move_tasks(SourceArn=dlq_arn).get('Results', [])
+        print(json.dumps({'event': 'intake_redrive_status', 'tasks': tasks}, default=str))
+        return
+
+    task = sqs.start_message_move_task(
+        SourceArn=dlq_arn,
+        DestinationArn=queue_arn(sqs, args.queue_url),
+        MaxNumberOfMessagesPerSecond=args.rate
+    )
+    print(json.dumps({'event': 'intake_redrive_started', 'task_handle': task['TaskHandle'],
+                      'source': args.dlq_url, 'destination': args.queue_url, 'rate': args.rate}))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+DOFS shared Lambda library - AWS clients, backpressure, configuration,
+structured logging, order schema, serialization, caching, idempotency,
+order message envelope, fulfillment providers, batched SQS enqueue, order
+queue priority lanes, order status transitions, write-sharded index keys, order queries, per-customer
+aggregates, failed-order redrive and EMF timing metrics
+Copied into every Lambda deployment package by buildspec.yml
+"""
+from dofs_core.aws import error_code, get_client, get_resource, get_table, use_stub
+from dofs_core.backpressure import AdaptiveThrottle, CircuitBreaker, Overloaded, TokenBucket
+from dofs_core.cache import TTLCache
+from dofs_core.config import require_env
+from dofs_core.customers import (
+    get_customer_summary, record_customer_fulfillments, record_customer_orders
+)
+from dofs_core.envelope import decode_order_message, encode_order_message, read_order_message
+from dofs_core.fulfillment import (
+    FulfillmentError, FulfillmentProvider, FulfillmentThrottled, SimulatedProvider,
+    get_fulfillment_provider, register_provider, use_fulfillment_provider
+)
+from dofs_core.idempotency import IdempotencyStore
+from dofs_core.lanes import ORDER_LANES, LaneSender, lane_queue_url, order_lane
+from dofs_core.log import bind_invocation, get_logger
+from dofs_core.metrics import flush_metrics, instrumented_handler, timed, use_metrics_sink
+from dofs_core.queries import (
+    InvalidPageToken, get_order, iter_failed_orders, iter_orders_by_status,
+    query_orders_by_status
+)
+from dofs_core.redrive import RedriveCriteria, redrive_failed_orders, select_failed_orders
+from dofs_core.schema import ORDER_SCHEMA, check_order, compile_schema
+from dofs_core.serialization import (
+    dumps, from_attribute_value, from_item, loads, to_attribute_value, to_item
+)
+from dofs_core.sharding import (
+    failed_date_bucket, scatter_gather_query, status_shard_key, status_shard_keys
+)
+from dofs_core.sqs import SqsBatchSender
+from dofs_core.status import (
+    ORDER_STATUSES, ORDER_TRANSITIONS, touch_orders, transition_order_status,
+    transition_order_statuses
+)
+
+__all__ = [
+    'get_client',
+    'get_resource',
+    'get_table',
+    'use_stub',
+    'error_code',
+    'AdaptiveThrottle',
+    'CircuitBreaker',
+    'Overloaded',
+    'TokenBucket',
+    'TTLCache',
+    'require_env',
+    'get_customer_summary',
+    'record_customer_fulfillments',
+    'record_customer_orders',
+    'decode_order_message',
+    'encode_order_message',
+    'read_order_message',
+    'FulfillmentError',
+    'FulfillmentProvider',
+    'FulfillmentThrottled',
+    'SimulatedProvider',
+    'get_fulfillment_provider',
+    'register_provider',
+    'use_fulfillment_provider',
+    'IdempotencyStore',
+    'ORDER_LANES',
+    'LaneSender',
+    'lane_queue_url',
+    'order_lane',
+    'bind_invocation',
+    'get_logger',
+    'flush_metrics',
+    'instrumented_handler',
+    'timed',
+    'use_metrics_sink',
+    'InvalidPageToken',
+    'get_order',
+    'iter_failed_orders',
+    'iter_orders_by_status',
+    'query_orders_by_status',
+    'RedriveCriteria',
+    'redrive_failed_orders',
+    'select_failed_orders',
+    'ORDER_SCHEMA',
+    'check_order',
+    'compile_schema',
+    'dumps',
+    'from_attribute_value',
+    'from_item',
+    'loads',
+    'to_attribute_value',
+    'to_item',
+    'failed_date_bucket',
+    'scatter_gather_query',
+    'status_shard_key',
+    'status_shard_keys',
+    'SqsBatchSender',
+    'ORDER_STATUSES',
+    'ORDER_TRANSITIONS',
+    'touch_orders',
+    'transition_order_status',
+    'transition_order_statuses',
+]
@@ -0,0 +1,126 @@
+"""
+Lazily constructed, per-container cached boto3 clients, resources and tables
+
+boto3 is only imported when the first client is requested, so a Lambda pays
+for it (and for each client) on the code path that needs it rather than at
+module import. Every client shares one tuned botocore Config: a connection
+pool sized for concurrent callers, short connect timeout, TCP keepalive and
+standard-mode retries. Every client (and each resource's client) is
+instrumented by dofs_core.metrics, so each API call is timed.
+
+use_stub() makes the accessors serve a stand-in object instead (in-memory
+fakes for local load tests and benchmarks); it is never called in Lambda.
+"""
+import os
+import threading
+
+from dofs_core.metrics import instrument_client
+
+MAX_POOL_CONNECTIONS = int(os.environ.get('DOFS_MAX_POOL_CONNECTIONS', '50'))
+CONNECT_TIMEOUT_SECONDS = float(os.environ.get('DOFS_CONNECT_TIMEOUT_SECONDS', '2'))
+READ_TIMEOUT_SECONDS = float(os.environ.get('DOFS_READ_TIMEOUT_SECONDS', '10'))
+MAX_RETRY_ATTEMPTS = int(os.environ.get('DOFS_MAX_RETRY_ATTEMPTS', '3'))
+
+# boto3 sessions are not thread-safe, so construction is serialised; lookups
+# of already-built objects stay lock-free
+_lock = threading.Lock()
+_session = None
+_clients = {}
+_resources = {}
+_tables = {}
+
+# Stand-ins registered with use_stub(), consulted before the caches
+_stub_clients = {}
+_stub_resources = {}
+
+def _get_session():
+    global _session
+    if _session is None:
+        import boto3
+        _session = boto3.session.Session()
+    return _session
+
+def _build_config(max_pool_connections):
+    from botocore.config import Config
+    return Config(
+        max_pool_connections=max_pool_connections,
+        connect_timeout=CONNECT_TIMEOUT_SECONDS,
+        read_timeout=READ_TIMEOUT_SECONDS,
+        retries={'max_attempts': MAX_RETRY_ATTEMPTS, 'mode': 'standard'},
+        tcp_keepalive=True
+    )
+
+def get_client(service_name, max_pool_connections=None):
+    """
+    Return the cached low-level client for service_name, building it on first use
+    """
+    if _stub_clients:
+        stub = _stub_clients.get(service_name)
+        if stub is not None:
+            return stub
+    key = (service_name, max_pool_connections or MAX_POOL_CONNECTIONS)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = instrument_client(
+                    _get_session().client(service_name, config=_build_config(key[1]))
+                )
+                _clients[key] = client
+    return client
+
+def get_resource(service_name):
+    """
+    Return the cached boto3 resource for service_name, building it on first use
+    """
+    if _stub_resources:
+        stub = _stub_resources.get(service_name)
+        if stub is not None:
+            return stub
+    resource = _resources.get(service_name)
+    if resource is None:
+        with _lock:
+            resource = _resources.get(service_name)
+            if resource is None:
+                resource = _get_session().resource(
+                    service_name, config=_build_config(MAX_POOL_CONNECTIONS)
+                )
+                instrument_client(resource.meta.client)
+                _resources[service_name] = resource
+    return resource
+
+def get_table(table_name):
+    """
+    Return the cached DynamoDB Table handle for table_name
+    """
+    if 'dynamodb' in _stub_resources:
+        return _stub_resources['dynamodb'].Table(table_name)
+    table = _tables.get(table_name)
+    if table is None:
+        table = get_resource('dynamodb').Table(table_name)
+        _tables[table_name] = table
+    return table
+
+def use_stub(service_name, client=None, resource=None):
+    """
+    Serve client (get_client) and/or resource (get_resource, get_table) for
+    service_name instead of boto3 objects; pass neither to remove the stand-ins
+    """
+    with _lock:
+        _stub_clients.pop(service_name, None)
+        _stub_resources.pop(service_name, None)
+        if client is not None:
+            _stub_clients[service_name] = client
+        if resource is not None:
+            _stub_resources[service_name] = resource
+
+def error_code(exc):
+    """
+    AWS error code of a botocore ClientError (e.g. 'ConditionalCheckFailedException'),
+    or None for any other exception
+    """
+    response = getattr(exc, 'response', None)
+    if isinstance(response, dict):
+        return response.get('Error', {}).get('Code')
+    return None
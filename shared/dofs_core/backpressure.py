@@ -0,0 +1,199 @@
+"""
+Client-side backpressure for throttled AWS APIs - token bucket, adaptive
+retry and circuit breaker
+
+AdaptiveThrottle guards one API (e.g. Step Functions StartExecution) for the
+container:
+- a token bucket paces calls at the current rate. Throttling halves the rate
+  (down to min_rate, at most once per decrease_interval_seconds so a burst
+  of concurrent rejections counts once) and every success adds back a
+  twentieth of max_rate (AIMD), so the container settles just under what
+  the service accepts
+- throttling and server errors are retried with full-jitter exponential
+  backoff while the caller's wait budget lasts (on top of botocore's own
+  retries)
+- after failure_threshold consecutive retryable failures the circuit opens:
+  calls fail fast for reset_seconds, then a single trial call is let through
+  (half-open) and its outcome closes or re-opens the circuit
+
+When capacity is the problem - no token within the wait budget, circuit
+open, retries exhausted - call() raises Overloaded, so the caller can divert
+the work to a buffer instead of failing it. Any other error is raised as is.
+"""
+import random
+import threading
+import time
+
+from dofs_core.aws import error_code
+
+# Error codes that mean "not now" rather than "never"
+RETRYABLE_ERROR_CODES = frozenset({
+    'ThrottlingException',
+    'Throttling',
+    'TooManyRequestsException',
+    'RequestLimitExceeded',
+    'ServiceUnavailable',
+    'InternalServerError',
+    'InternalFailure',
+})
+
+class Overloaded(Exception):
+    """
+    The call was not made, or was given up, for lack of capacity
+    """
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: rate tokens per second, holding at most burst
+    """
+    def __init__(self, rate, burst, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout=0.0):
+        """
+        Take one token, waiting up to timeout seconds for it
+        Returns False if none became available in time
+        """
+        deadline = self.clock() + timeout
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            self.sleep(wait)
+
+    def set_rate(self, rate):
+        """
+        Change the refill rate (tokens already earned are kept)
+        """
+        with self._lock:
+            self._refill(self.clock())
+            self.rate = rate
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker with a single half-open trial call
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_seconds=10.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Whether a call may go ahead now (claims the trial call when half-open)
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() >= self._opened_at + self.reset_seconds:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = self.clock()
+
+class AdaptiveThrottle:
+    """
+    Token bucket + adaptive retry + circuit breaker around one API
+    """
+    def __init__(self, max_rate, burst=None, min_rate=1.0, max_attempts=4,
+                 base_delay_seconds=0.05, max_delay_seconds=1.0,
+                 failure_threshold=5, reset_seconds=10.0, decrease_interval_seconds=0.5,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.max_attempts = max_attempts
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.decrease_interval_seconds = decrease_interval_seconds
+        self.clock = clock
+        self.sleep = sleep
+        self.bucket = TokenBucket(max_rate, burst or max_rate, clock=clock, sleep=sleep)
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds, clock=clock)
+        self._last_decrease = None
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    def call(self, fn, *args, wait_seconds=0.0, **kwargs):
+        """
+        Call fn(*args, **kwargs) under the throttle, spending at most
+        wait_seconds on waiting for tokens and backing off
+        Raises Overloaded when out of capacity; other errors are raised as is
+        """
+        deadline = self.clock() + wait_seconds
+        last_error = None
+        for attempt in range(1, self.max_attempts + 1):
+            # Token first: a half-open trial is only claimed when it will be made
+            if not self.bucket.acquire(max(0.0, deadline - self.clock())):
+                raise Overloaded(f'No capacity within {wait_seconds}s (rate {self.rate:.1f}/s)') from last_error
+            if not self.breaker.allow():
+                raise Overloaded('Circuit open') from last_error
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if error_code(e) not in RETRYABLE_ERROR_CODES:
+                    # The service answered - it is up, the request was just refused
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                self._decrease_rate()
+                last_error = e
+                delay = random.uniform(0, min(self.max_delay_seconds, self.base_delay_seconds * 2 ** (attempt - 1)))
+                if attempt == self.max_attempts or self.clock() + delay > deadline:
+                    break
+                self.sleep(delay)
+                continue
+            self.breaker.record_success()
+            self._increase_rate()
+            return result
+        raise Overloaded(f'Gave up after {attempt} attempts: {last_error}') from last_error
+
+    def _decrease_rate(self):
+        with self._lock:
+            now = self.clock()
+            if self._last_decrease is not None and now - self._last_decrease < self.decrease_interval_seconds:
+                return
+            self._last_decrease = now
+            self.bucket.set_rate(max(self.min_rate, self.bucket.rate / 2))
+
+    def _increase_rate(self):
+        if self.bucket.rate < self.max_rate:
+            with self._lock:
+                self.bucket.set_rate(min(self.max_rate, self.bucket.rate + self.max_rate / 20))
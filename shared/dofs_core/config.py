@@ -0,0 +1,13 @@
+"""
+Environment configuration helpers shared by the DOFS Lambdas
+"""
+import os
+
+def require_env(name):
+    """
+    Return a required environment variable, raising ValueError if it is not set
+    """
+    value = os.environ.get(name)
+    if not value:
+        raise ValueError(f'{name} environment variable not set')
+    return value
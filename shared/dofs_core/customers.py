@@ -0,0 +1,128 @@
+"""
+Per-customer order aggregates, maintained incrementally
+
+The customer summaries table holds one item per customer: order_count and
+total_amount of the orders stored, fulfilled_count and fulfilled_amount of
+the orders fulfilled, the first and last order and the last fulfillment.
+Writers never read the item - each applies its counts with one update_item
+ADD, which DynamoDB applies atomically, so concurrent Lambdas never lose an
+increment. Orders are grouped by customer first: a bulk request of 500
+orders for one account is one write to its item, not 500.
+
+The last order is a separate conditional write that only moves
+last_order_at forward, so a writer that loses the race to a newer order
+leaves the newer one in place.
+
+An order is counted once as long as callers only pass orders whose own
+conditional write they just won (a new order_id, a FULFILLED transition that
+was written). A summary write that fails after that is not retried, leaving
+the summary short by those orders.
+
+Reading a summary is one GetItem, however many orders the customer has.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from dofs_core.aws import error_code, get_client
+from dofs_core.serialization import from_item, to_item
+
+CUSTOMER_SUMMARY_CONCURRENCY = int(os.environ.get('CUSTOMER_SUMMARY_CONCURRENCY', '10'))
+
+def record_customer_orders(table_name, orders, max_workers=CUSTOMER_SUMMARY_CONCURRENCY):
+    """
+    Add newly stored orders to their customers' summaries: order_count,
+    total_amount, first_order_at, and the last order (last_order_id /
+    last_order_at, only replaced by a newer order)
+    Returns {customer_id: True | exception}
+    """
+    def update(customer_id, group):
+        client = get_client('dynamodb')
+        key = to_item({'customer_id': customer_id})
+        client.update_item(
+            TableName=table_name,
+            Key=key,
+            UpdateExpression=(
+                'ADD order_count :count, total_amount :amount'
+                ' SET first_order_at = if_not_exists(first_order_at, :first_order_at)'
+            ),
+            ExpressionAttributeValues=to_item({
+                ':count': len(group),
+                ':amount': _total(group),
+                ':first_order_at': min(order['created_at'] for order in group)
+            })
+        )
+
+        last_order = max(group, key=lambda order: order['created_at'])
+        try:
+            client.update_item(
+                TableName=table_name,
+                Key=key,
+                UpdateExpression='SET last_order_id = :last_order_id, last_order_at = :last_order_at',
+                ConditionExpression='attribute_not_exists(last_order_at) OR last_order_at < :last_order_at',
+                ExpressionAttributeValues=to_item({
+                    ':last_order_id': last_order['order_id'],
+                    ':last_order_at': last_order['created_at']
+                })
+            )
+        except Exception as e:
+            # A newer order is already recorded as the last one
+            if error_code(e) != 'ConditionalCheckFailedException':
+                raise
+
+    return _update_customers(orders, update, max_workers)
+
+def record_customer_fulfillments(table_name, orders, fulfilled_at, max_workers=CUSTOMER_SUMMARY_CONCURRENCY):
+    """
+    Add newly fulfilled orders to their customers' summaries: fulfilled_count,
+    fulfilled_amount and last_fulfilled_at
+    Returns {customer_id: True | exception}
+    """
+    def update(customer_id, group):
+        get_client('dynamodb').update_item(
+            TableName=table_name,
+            Key=to_item({'customer_id': customer_id}),
+            UpdateExpression='ADD fulfilled_count :count, fulfilled_amount :amount SET last_fulfilled_at = :at',
+            ExpressionAttributeValues=to_item({
+                ':count': len(group),
+                ':amount': _total(group),
+                ':at': fulfilled_at
+            })
+        )
+
+    return _update_customers(orders, update, max_workers)
+
+def get_customer_summary(table_name, customer_id):
+    """
+    Return the customer's summary (plain dict), or None if no order of the
+    customer has been recorded
+    """
+    response = get_client('dynamodb').get_item(
+        TableName=table_name,
+        Key=to_item({'customer_id': customer_id})
+    )
+    item = response.get('Item')
+    return from_item(item) if item is not None else None
+
+def _total(orders):
+    # Summed as Decimal - float amounts would drift over thousands of ADDs
+    return sum((Decimal(str(order.get('total_amount', 0))) for order in orders), Decimal(0))
+
+def _update_customers(orders, update, max_workers):
+    groups = {}
+    for order in orders:
+        if order.get('customer_id'):
+            groups.setdefault(order['customer_id'], []).append(order)
+
+    def apply(item):
+        customer_id, group = item
+        try:
+            update(customer_id, group)
+            return customer_id, True
+        except Exception as e:
+            return customer_id, e
+
+    if max_workers > 1 and len(groups) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(groups))) as executor:
+            return dict(executor.map(apply, groups.items()))
+    return dict(apply(item) for item in groups.items())
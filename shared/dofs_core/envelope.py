@@ -0,0 +1,139 @@
+"""
+Versioned order queue message envelope - compact, compressed or claim-check
+
+Order messages used to carry the order as verbose JSON without its items,
+with order_id and customer_id repeated in MessageAttributes. A version 1
+body is a JSON object with "v": 1 and no message attributes, in one of three
+forms:
+  inline   the order under short keys (ORDER_FIELDS), items as
+           [product_id, quantity, price] triples - all fulfillment needs
+  "z"      the inline fields as base64 zlib-compressed JSON, used when the
+           inline body is over ORDER_MESSAGE_COMPRESS_BYTES and compressing
+           makes it smaller
+  "ref"    claim check: only the order ID, when the body would still be over
+           ORDER_MESSAGE_CLAIM_CHECK_BYTES. The order is already stored in
+           the orders table, so that is the claim-check store and the
+           consumer fetches it with one consistent GetItem
+redrive_count travels as "r" (inside the compressed fields for "z"). Bodies
+without "v" are legacy messages and decode as they are.
+"""
+import base64
+import os
+import zlib
+
+from dofs_core.aws import get_client
+from dofs_core.serialization import dumps, from_item, loads, to_item
+
+ENVELOPE_VERSION = 1
+
+ORDER_MESSAGE_COMPRESS_BYTES = int(os.environ.get('ORDER_MESSAGE_COMPRESS_BYTES', '1024'))
+ORDER_MESSAGE_CLAIM_CHECK_BYTES = int(os.environ.get('ORDER_MESSAGE_CLAIM_CHECK_BYTES', '65536'))
+
+# Order field -> envelope key
+ORDER_FIELDS = {
+    'order_id': 'i',
+    'customer_id': 'c',
+    'total_amount': 't',
+    'created_at': 'a',
+    'items': 'l',
+    'shipping_address': 'h',
+    'shipping_method': 'm',
+}
+ITEM_FIELDS = ('product_id', 'quantity', 'price')
+
+_COMPACT = (',', ':')
+
+def encode_order_message(order, redrive_count=0):
+    """
+    Version 1 message body for an order (a stored order record, or an order
+    decoded from an earlier message)
+    """
+    if order.get('claim_check'):
+        return _claim_check_body(order['order_id'], redrive_count)
+
+    fields = {}
+    for field, key in ORDER_FIELDS.items():
+        value = order.get(field)
+        if value is None or value == {}:
+            continue
+        if field == 'items':
+            value = [_encode_item(item) for item in value]
+        fields[key] = value
+    if redrive_count:
+        fields['r'] = redrive_count
+
+    body = dumps({'v': ENVELOPE_VERSION, **fields}, separators=_COMPACT)
+    if len(body) > ORDER_MESSAGE_COMPRESS_BYTES:
+        compressed = zlib.compress(dumps(fields, separators=_COMPACT).encode('utf-8'))
+        compressed_body = dumps({'v': ENVELOPE_VERSION, 'z': base64.b64encode(compressed).decode('ascii')},
+                                separators=_COMPACT)
+        if len(compressed_body) < len(body):
+            body = compressed_body
+    if len(body.encode('utf-8')) > ORDER_MESSAGE_CLAIM_CHECK_BYTES:
+        return _claim_check_body(order['order_id'], redrive_count)
+    return body
+
+def _claim_check_body(order_id, redrive_count):
+    envelope = {'v': ENVELOPE_VERSION, 'ref': order_id}
+    if redrive_count:
+        envelope['r'] = redrive_count
+    return dumps(envelope, separators=_COMPACT)
+
+def _encode_item(item):
+    if len(item) == len(ITEM_FIELDS) and all(field in item for field in ITEM_FIELDS):
+        return [item[field] for field in ITEM_FIELDS]
+    return item
+
+def decode_order_message(body):
+    """
+    Order (plain dict, numbers as Decimal) carried by an order queue message
+    A claim-check message decodes to order_id and claim_check=True only (see
+    read_order_message); redrive_count is set when the order was redriven
+    Raises ValueError for malformed bodies and unknown versions
+    """
+    message = loads(body)
+    if not isinstance(message, dict):
+        raise ValueError('Order message is not a JSON object')
+    version = message.get('v')
+    if version is None:
+        return message
+    if version != ENVELOPE_VERSION:
+        raise ValueError(f'Unsupported order message version: {version}')
+
+    if 'z' in message:
+        message = loads(zlib.decompress(base64.b64decode(message['z'])))
+
+    if 'ref' in message:
+        order = {'order_id': message['ref'], 'claim_check': True}
+    else:
+        order = {field: message[key] for field, key in ORDER_FIELDS.items() if key in message}
+        if 'items' in order:
+            order['items'] = [
+                dict(zip(ITEM_FIELDS, item)) if isinstance(item, list) else item
+                for item in order['items']
+            ]
+    if message.get('r'):
+        order['redrive_count'] = message['r']
+    return order
+
+def read_order_message(body, table_name):
+    """
+    decode_order_message, fetching claim-checked orders from the orders table
+    Raises LookupError if a claim-checked order is not stored
+    """
+    order = decode_order_message(body)
+    if not order.get('claim_check'):
+        return order
+
+    response = get_client('dynamodb').get_item(
+        TableName=table_name,
+        Key=to_item({'order_id': order['order_id']}),
+        ConsistentRead=True
+    )
+    if 'Item' not in response:
+        raise LookupError(f"Claim-checked order {order['order_id']} is not stored")
+    stored = from_item(response['Item'])
+    claimed = {field: stored[field] for field in ORDER_FIELDS if field in stored}
+    if 'redrive_count' in order:
+        claimed['redrive_count'] = order['redrive_count']
+    return claimed
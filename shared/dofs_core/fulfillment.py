@@ -0,0 +1,161 @@
+"""
+Fulfillment providers - the downstream system fulfill_order hands orders to
+
+A provider has one method, fulfill(order), which returns a fulfillment
+reference or raises FulfillmentError (FulfillmentThrottled when the provider
+pushed back and the order should simply be retried later). fulfill_order
+uses get_fulfillment_provider(), chosen by FULFILLMENT_PROVIDER:
+  simulated          SimulatedProvider configured from FULFILLMENT_SIM_* (default)
+  <module>:<factory> any importable callable returning a provider
+register_provider() adds named providers; use_fulfillment_provider() swaps
+in an instance (benchmarks, load tests).
+
+SimulatedProvider stands in for a real backend when testing the pipeline:
+- latency drawn from a distribution spec (milliseconds):
+    fixed:MS  uniform:LOW:HIGH  exponential:MEAN  lognormal:MEDIAN:SIGMA
+- error_rate, the fraction of orders that fail (0.3 matches the original
+  70% success simulation)
+- throttle_rate, calls per second it accepts (per container); calls beyond
+  it are rejected with FulfillmentThrottled without waiting
+"""
+import importlib
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+
+from dofs_core.backpressure import TokenBucket
+
+FULFILLMENT_PROVIDER = os.environ.get('FULFILLMENT_PROVIDER', 'simulated')
+FULFILLMENT_SIM_LATENCY = os.environ.get('FULFILLMENT_SIM_LATENCY', 'fixed:0')
+FULFILLMENT_SIM_ERROR_RATE = float(os.environ.get('FULFILLMENT_SIM_ERROR_RATE', '0.3'))
+FULFILLMENT_SIM_THROTTLE_RATE = float(os.environ.get('FULFILLMENT_SIM_THROTTLE_RATE', '0'))
+
+class FulfillmentError(Exception):
+    """
+    The provider could not fulfill the order
+    """
+
+class FulfillmentThrottled(FulfillmentError):
+    """
+    The provider rejected the call for lack of capacity - retry later
+    """
+
+class FulfillmentProvider(ABC):
+    """
+    Interface of a fulfillment backend - subclasses implement fulfill()
+    """
+    name = 'provider'
+
+    @abstractmethod
+    def fulfill(self, order):
+        """
+        Fulfill one order (plain dict from the order message)
+        Returns a fulfillment reference; raises FulfillmentError
+        """
+
+def parse_latency(spec):
+    """
+    Sampler (no arguments -> seconds) for a latency distribution spec
+    """
+    kind, _, arguments = spec.partition(':')
+    try:
+        values = [float(value) for value in arguments.split(':')] if arguments else []
+    except ValueError:
+        values = []
+
+    if kind == 'fixed' and len(values) == 1:
+        seconds = values[0] / 1000
+        return lambda: seconds
+    if kind == 'uniform' and len(values) == 2:
+        low, high = values[0] / 1000, values[1] / 1000
+        return lambda: random.uniform(low, high)
+    if kind == 'exponential' and len(values) == 1 and values[0] > 0:
+        rate = 1000 / values[0]
+        return lambda: random.expovariate(rate)
+    if kind == 'lognormal' and len(values) == 2 and values[0] > 0:
+        mu, sigma = math.log(values[0] / 1000), values[1]
+        return lambda: random.lognormvariate(mu, sigma)
+    raise ValueError(f'Invalid latency spec: {spec!r} '
+                     '(fixed:MS, uniform:LOW:HIGH, exponential:MEAN, lognormal:MEDIAN:SIGMA)')
+
+class SimulatedProvider(FulfillmentProvider):
+    """
+    Simulated backend with configurable latency, error rate and throttling
+    """
+    name = 'simulated'
+
+    def __init__(self, latency='fixed:0', error_rate=0.3, throttle_rate=0.0, sleep=time.sleep):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.sleep = sleep
+        self._sample_latency = parse_latency(latency)
+        self._bucket = TokenBucket(throttle_rate, max(1.0, throttle_rate)) if throttle_rate > 0 else None
+        self.calls = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def fulfill(self, order):
+        with self._lock:
+            self.calls += 1
+        if self._bucket is not None and not self._bucket.acquire():
+            with self._lock:
+                self.throttled += 1
+            raise FulfillmentThrottled(f"Simulated provider throttled order {order.get('order_id')}")
+
+        self.sleep(self._sample_latency())
+        if random.random() < self.error_rate:
+            raise FulfillmentError(
+                f"Fulfillment failed for order {order.get('order_id')} "
+                f'(simulated {self.error_rate:.0%} failure rate)'
+            )
+        return f'sim-{uuid.uuid4()}'
+
+def _simulated_from_env():
+    return SimulatedProvider(
+        latency=FULFILLMENT_SIM_LATENCY,
+        error_rate=FULFILLMENT_SIM_ERROR_RATE,
+        throttle_rate=FULFILLMENT_SIM_THROTTLE_RATE
+    )
+
+_factories = {'simulated': _simulated_from_env}
+_provider = None
+_provider_lock = threading.Lock()
+
+def register_provider(name, factory):
+    """
+    Make factory() selectable as FULFILLMENT_PROVIDER=name
+    """
+    _factories[name] = factory
+
+def get_fulfillment_provider():
+    """
+    The container's provider, built on first use from FULFILLMENT_PROVIDER
+    """
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = _build_provider(FULFILLMENT_PROVIDER)
+    return _provider
+
+def _build_provider(name):
+    factory = _factories.get(name)
+    if factory is None:
+        module_name, _, attribute = name.partition(':')
+        if not attribute:
+            raise ValueError(f'Unknown fulfillment provider: {name!r}')
+        factory = getattr(importlib.import_module(module_name), attribute)
+    return factory()
+
+def use_fulfillment_provider(provider):
+    """
+    Serve provider from get_fulfillment_provider() (None rebuilds from config)
+    """
+    global _provider
+    with _provider_lock:
+        _provider = provider
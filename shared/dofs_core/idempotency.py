@@ -0,0 +1,126 @@
+"""
+Idempotency keys backed by a conditional-write DynamoDB table
+
+A request carrying an Idempotency-Key first claims the key with a conditional
+put (IN_PROGRESS). Only the claimant does the work; it then records the
+response (COMPLETED) so every repeat of the request gets that response back,
+or releases the claim when the work failed so the client can retry. Completed
+records are also kept in a per-container TTLCache, so a replay on a warm
+container costs no DynamoDB call. Records expire through the table's TTL
+attribute (expires_at).
+"""
+import os
+import time
+
+from dofs_core.aws import error_code, get_client
+from dofs_core.cache import TTLCache
+from dofs_core.serialization import dumps, from_item, loads, to_item
+
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '86400'))
+IDEMPOTENCY_CACHE_SIZE = int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', '1024'))
+IDEMPOTENCY_CACHE_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_CACHE_TTL_SECONDS', '300'))
+
+# A claim older than this is treated as abandoned (its Lambda timed out or
+# crashed) and may be taken over; must exceed the Lambda timeout
+IN_PROGRESS_TIMEOUT_SECONDS = 60
+
+STATUS_IN_PROGRESS = 'IN_PROGRESS'
+STATUS_COMPLETED = 'COMPLETED'
+
+# Completed records, shared by every store in the container
+_completed = TTLCache(IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_CACHE_TTL_SECONDS)
+
+class IdempotencyStore:
+    """
+    Claim / complete / release idempotency keys in table_name
+    Records: idempotency_key, status, fingerprint, response (JSON), expires_at
+    """
+    def __init__(self, table_name, ttl_seconds=IDEMPOTENCY_TTL_SECONDS, cache=None, client=None):
+        self.table_name = table_name
+        self.ttl_seconds = ttl_seconds
+        self.cache = _completed if cache is None else cache
+        self.client = client or get_client('dynamodb')
+
+    def claim(self, key, fingerprint):
+        """
+        Try to claim key for a request whose body hashes to fingerprint
+        Returns None when claimed (caller does the work), otherwise the existing
+        record: {'status', 'fingerprint', 'response'}
+        """
+        cached = self.cache.get((self.table_name, key))
+        if cached is not None:
+            return cached
+
+        now = int(time.time())
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item=to_item({
+                    'idempotency_key': key,
+                    'status': STATUS_IN_PROGRESS,
+                    'fingerprint': fingerprint,
+                    'claimed_until': now + IN_PROGRESS_TIMEOUT_SECONDS,
+                    'expires_at': now + self.ttl_seconds
+                }),
+                ConditionExpression=(
+                    'attribute_not_exists(idempotency_key) OR expires_at < :now'
+                    ' OR (#status = :in_progress AND claimed_until < :now)'
+                ),
+                ExpressionAttributeNames={'#status': 'status'},
+                ExpressionAttributeValues=to_item({':now': now, ':in_progress': STATUS_IN_PROGRESS})
+            )
+            return None
+        except Exception as e:
+            if error_code(e) != 'ConditionalCheckFailedException':
+                raise
+
+        response = self.client.get_item(
+            TableName=self.table_name,
+            Key=to_item({'idempotency_key': key}),
+            ConsistentRead=True
+        )
+        if 'Item' not in response:
+            # Released between our put and get - claim it again
+            return self.claim(key, fingerprint)
+        return self._remember(key, from_item(response['Item']))
+
+    def complete(self, key, fingerprint, result):
+        """
+        Record the result of the claimed request so repeats replay it
+        """
+        record = {
+            'idempotency_key': key,
+            'status': STATUS_COMPLETED,
+            'fingerprint': fingerprint,
+            'response': dumps(result),
+            'expires_at': int(time.time()) + self.ttl_seconds
+        }
+        self.client.put_item(TableName=self.table_name, Item=to_item(record))
+        self._remember(key, record)
+
+    def release(self, key):
+        """
+        Drop an in-progress claim after the work failed, so a retry can run it
+        """
+        try:
+            self.client.delete_item(
+                TableName=self.table_name,
+                Key=to_item({'idempotency_key': key}),
+                ConditionExpression='#status = :in_progress',
+                ExpressionAttributeNames={'#status': 'status'},
+                ExpressionAttributeValues=to_item({':in_progress': STATUS_IN_PROGRESS})
+            )
+        except Exception as e:
+            if error_code(e) != 'ConditionalCheckFailedException':
+                raise
+
+    def _remember(self, key, item):
+        record = {
+            'status': item.get('status'),
+            'fingerprint': item.get('fingerprint'),
+            'response': loads(item['response']) if item.get('response') else None
+        }
+        if record['status'] == STATUS_COMPLETED:
+            self.cache.set((self.table_name, key), record,
+                           ttl_seconds=int(item.get('expires_at', 0)) - time.time())
+        return record
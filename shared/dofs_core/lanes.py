@@ -0,0 +1,100 @@
+"""
+Priority lanes - which order queue a stored order is sent to
+
+Orders go to one of two queues, each with its own fulfillment event source
+mapping (batch size, batching window, maximum concurrency), so a flood of
+bulk orders queues up behind itself rather than in front of urgent ones:
+  priority   shipping_method in PRIORITY_SHIPPING_METHODS (expedited,
+             overnight), or total_amount at least PRIORITY_AMOUNT_THRESHOLD
+             (0 = the amount never makes an order priority)
+  standard   everything else
+Lanes map to queues through the environment: standard is ORDER_QUEUE_URL,
+priority is PRIORITY_ORDER_QUEUE_URL - when that is unset, both lanes share
+ORDER_QUEUE_URL (a single lane, as before lanes existed).
+"""
+import os
+from decimal import Decimal
+
+from dofs_core.config import require_env
+from dofs_core.sqs import SqsBatchSender
+
+PRIORITY = 'priority'
+STANDARD = 'standard'
+ORDER_LANES = (PRIORITY, STANDARD)
+
+PRIORITY_AMOUNT_THRESHOLD = Decimal(os.environ.get('PRIORITY_AMOUNT_THRESHOLD', '500'))
+PRIORITY_SHIPPING_METHODS = frozenset(
+    method for method in os.environ.get('PRIORITY_SHIPPING_METHODS', 'expedited,overnight').split(',') if method
+)
+
+def order_lane(order):
+    """
+    Lane of an order (a stored order record or a decoded order message)
+    """
+    if order.get('shipping_method') in PRIORITY_SHIPPING_METHODS:
+        return PRIORITY
+    amount = order.get('total_amount')
+    if PRIORITY_AMOUNT_THRESHOLD and amount is not None and Decimal(str(amount)) >= PRIORITY_AMOUNT_THRESHOLD:
+        return PRIORITY
+    return STANDARD
+
+def lane_queue_url(lane):
+    """
+    Queue URL for a lane (see module docstring)
+    """
+    if lane == PRIORITY:
+        url = os.environ.get('PRIORITY_ORDER_QUEUE_URL')
+        if url:
+            return url
+    return require_env('ORDER_QUEUE_URL')
+
+class LaneSender:
+    """
+    SqsBatchSender per lane queue: messages are added with their lane and
+    batched per queue
+    message_ids, failures and batch_calls cover all lanes, like a single
+    SqsBatchSender's; entry ids must be unique across lanes (generated ids are)
+    Not thread-safe - use one sender per thread
+    """
+    def __init__(self):
+        self.senders = {}
+        self._next_id = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.flush()
+        return False
+
+    def add(self, message_body, lane, entry_id=None, message_attributes=None, delay_seconds=None):
+        """
+        Queue one message for lane's queue (see SqsBatchSender.add)
+        Returns the entry id used to look up the result
+        """
+        if entry_id is None:
+            entry_id = f'm{self._next_id}'
+            self._next_id += 1
+        queue_url = lane_queue_url(lane)
+        sender = self.senders.get(queue_url)
+        if sender is None:
+            sender = self.senders[queue_url] = SqsBatchSender(queue_url)
+        return sender.add(message_body, message_attributes, entry_id=entry_id, delay_seconds=delay_seconds)
+
+    def flush(self):
+        for sender in self.senders.values():
+            sender.flush()
+
+    @property
+    def message_ids(self):
+        return {entry_id: message_id for sender in self.senders.values()
+                for entry_id, message_id in sender.message_ids.items()}
+
+    @property
+    def failures(self):
+        return {entry_id: error for sender in self.senders.values()
+                for entry_id, error in sender.failures.items()}
+
+    @property
+    def batch_calls(self):
+        return sum(sender.batch_calls for sender in self.senders.values())
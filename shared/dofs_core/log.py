@@ -0,0 +1,185 @@
+"""
+Structured, sampled logging shared by the DOFS Lambdas
+
+Handlers log events through get_logger():
+    logger.info('order_fulfilled', order_id=order_id, fulfillment_id=reference)
+Each emitted event is one JSON line: event, the fields, and the invocation's
+request_id. Log volume is controlled in three ways:
+- levels below LOG_LEVEL (default INFO) return after one isEnabledFor check,
+  and an emitted event is only serialized when a logging handler formats it
+- DEBUG and INFO events (the success path) are sampled per invocation: an
+  invocation logs them with probability LOG_SAMPLE_RATE (default 1, all of
+  them); otherwise they are only counted
+- WARNING and ERROR events are always logged
+
+@instrumented_handler (dofs_core.metrics) brackets each invocation with
+begin_invocation() / end_invocation(), which logs one invocation_summary
+line whether the invocation was sampled or not: duration, outcome, the
+number of times each event occurred, and any fields added with
+logger.annotate(). The invocation is tracked per thread; work handed to a
+thread pool keeps logging into it when wrapped with bind_invocation().
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', '1'))
+
+_local = threading.local()
+
+class Invocation:
+    """
+    Per-invocation logging state: sampling decision, event counts and
+    summary annotations
+    """
+    def __init__(self, function_name, request_id, sampled):
+        self.function_name = function_name
+        self.request_id = request_id
+        self.sampled = sampled
+        self.start = time.perf_counter()
+        self.events = Counter()
+        self.warnings = 0
+        self.errors = 0
+        self.annotations = {}
+        self._lock = threading.Lock()
+
+    def count(self, event, level):
+        with self._lock:
+            self.events[event] += 1
+            if level >= logging.ERROR:
+                self.errors += 1
+            elif level >= logging.WARNING:
+                self.warnings += 1
+
+    def annotate(self, fields):
+        with self._lock:
+            self.annotations.update(fields)
+
+class _Event:
+    """
+    Log message serialized to JSON only when a handler formats the record
+    """
+    __slots__ = ('fields',)
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def __str__(self):
+        return json.dumps(self.fields, default=str)
+
+class EventLogger:
+    """
+    Structured event logger over a stdlib logger (see module docstring)
+    """
+    def __init__(self, logger):
+        self.logger = logger
+
+    def debug(self, event, /, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event, /, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event, /, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event, /, **fields):
+        self._log(logging.ERROR, event, fields)
+
+    def annotate(self, **fields):
+        """
+        Add fields to the current invocation's summary line
+        """
+        invocation = current_invocation()
+        if invocation is not None:
+            invocation.annotate(fields)
+
+    def _log(self, level, event, fields):
+        invocation = current_invocation()
+        if invocation is not None:
+            invocation.count(event, level)
+            if level < logging.WARNING and not invocation.sampled:
+                return
+        if not self.logger.isEnabledFor(level):
+            return
+        message = {'event': event, **fields}
+        if invocation is not None:
+            message['request_id'] = invocation.request_id
+        self.logger.log(level, _Event(message))
+
+def get_logger():
+    """
+    Return the EventLogger over the root logger configured for Lambda
+    (LOG_LEVEL, default INFO)
+    """
+    logger = logging.getLogger()
+    logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO'))
+    return EventLogger(logger)
+
+def current_invocation():
+    return getattr(_local, 'invocation', None)
+
+def begin_invocation(function_name, request_id, sample_rate=None):
+    """
+    Start tracking an invocation on this thread, deciding whether its
+    success-path events are logged
+    """
+    rate = LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+    invocation = Invocation(function_name, request_id, rate >= 1 or random.random() < rate)
+    _local.invocation = invocation
+    return invocation
+
+def end_invocation(outcome='success'):
+    """
+    Log the current invocation's summary line and stop tracking it
+    Logged at ERROR when the handler raised, WARNING when it logged warnings
+    or errors, INFO otherwise
+    """
+    invocation = current_invocation()
+    if invocation is None:
+        return
+    _local.invocation = None
+
+    if outcome != 'success':
+        level = logging.ERROR
+    elif invocation.errors or invocation.warnings:
+        level = logging.WARNING
+    else:
+        level = logging.INFO
+    logger = logging.getLogger()
+    if not logger.isEnabledFor(level):
+        return
+    logger.log(level, _Event({
+        'event': 'invocation_summary',
+        'function': invocation.function_name,
+        'outcome': outcome,
+        'duration_ms': round((time.perf_counter() - invocation.start) * 1000, 3),
+        'sampled': invocation.sampled,
+        **invocation.annotations,
+        'events': dict(invocation.events),
+        'warnings': invocation.warnings,
+        'errors': invocation.errors,
+        'request_id': invocation.request_id
+    }))
+
+def bind_invocation(fn):
+    """
+    Wrap fn so that, called on another thread (e.g. in a thread pool), it
+    logs into the calling thread's current invocation
+    """
+    invocation = current_invocation()
+
+    @wraps(fn)
+    def bound(*args, **kwargs):
+        previous = current_invocation()
+        _local.invocation = invocation
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.invocation = previous
+    return bound
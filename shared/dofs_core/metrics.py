@@ -0,0 +1,160 @@
+"""
+Per-invocation timing metrics in CloudWatch Embedded Metric Format (EMF)
+
+timed(stage) times a handler phase; every boto3 client built by dofs_core.aws
+is instrumented so each AWS API call is timed as '<service>.<Operation>'.
+Samples are buffered in memory and @instrumented_handler flushes them once per
+invocation: one EMF log line per (stage, outcome), with dimensions function,
+stage and outcome and a 'latency' metric holding up to 100 values. CloudWatch
+extracts the metrics from the log lines, so no PutMetricData calls are made.
+
+Outcome is 'success', 'error' (exception), the AWS error code for failed API
+calls (e.g. 'ConditionalCheckFailedException'), or whatever the block sets on
+the timer (e.g. 'skipped').
+"""
+import json
+import os
+import sys
+import threading
+import time
+from functools import wraps
+
+from dofs_core.log import begin_invocation, end_invocation
+
+METRICS_NAMESPACE = os.environ.get('DOFS_METRICS_NAMESPACE', 'DOFS')
+METRICS_ENABLED = os.environ.get('DOFS_METRICS_ENABLED', 'true').lower() != 'false'
+
+# EMF accepts at most 100 values per metric in one document
+MAX_VALUES_PER_DOCUMENT = 100
+
+# A Lambda container runs one invocation at a time, so one buffer serves it;
+# the lock covers worker threads recording from thread pools
+_lock = threading.Lock()
+_samples = {}
+_function_name = os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'local')
+_sink = None
+
+def record_metric(stage, milliseconds, outcome='success'):
+    """
+    Buffer one latency sample for stage
+    """
+    if not METRICS_ENABLED:
+        return
+    with _lock:
+        samples = _samples.get((stage, outcome))
+        if samples is None:
+            _samples[(stage, outcome)] = [milliseconds]
+        else:
+            samples.append(milliseconds)
+
+class timed:
+    """
+    Context manager timing the enclosed block as stage
+    An exception records outcome 'error'; set .outcome inside the block to
+    record something else (e.g. 'skipped')
+    """
+    __slots__ = ('stage', 'outcome', '_start')
+
+    def __init__(self, stage, outcome='success'):
+        self.stage = stage
+        self.outcome = outcome
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None:
+            self.outcome = 'error'
+        record_metric(self.stage, (time.perf_counter() - self._start) * 1000, self.outcome)
+        return False
+
+def flush_metrics():
+    """
+    Write buffered samples as EMF log lines and clear the buffer
+    """
+    with _lock:
+        if not _samples:
+            return
+        samples = dict(_samples)
+        _samples.clear()
+
+    write = _sink or _write_stdout
+    timestamp = int(time.time() * 1000)
+    for (stage, outcome), values in samples.items():
+        for start in range(0, len(values), MAX_VALUES_PER_DOCUMENT):
+            write(json.dumps({
+                '_aws': {
+                    'Timestamp': timestamp,
+                    'CloudWatchMetrics': [{
+                        'Namespace': METRICS_NAMESPACE,
+                        'Dimensions': [['function', 'stage', 'outcome']],
+                        'Metrics': [{'Name': 'latency', 'Unit': 'Milliseconds'}]
+                    }]
+                },
+                'function': _function_name,
+                'stage': stage,
+                'outcome': outcome,
+                'latency': [round(value, 3) for value in values[start:start + MAX_VALUES_PER_DOCUMENT]]
+            }))
+
+def _write_stdout(line):
+    # EMF lines must reach CloudWatch Logs as bare JSON, not through the
+    # Lambda logging formatter (which prefixes level and request ID)
+    sys.stdout.write(line + '\n')
+
+def use_metrics_sink(sink):
+    """
+    Send EMF lines to sink(line) instead of stdout (None restores stdout)
+    """
+    global _sink
+    _sink = sink
+
+def instrumented_handler(handler):
+    """
+    Decorate a lambda_handler: time the whole invocation as stage 'handler',
+    then flush the invocation's metrics and log its summary line when it
+    returns or raises
+    """
+    @wraps(handler)
+    def wrapper(event, context):
+        global _function_name
+        _function_name = getattr(context, 'function_name', _function_name)
+        begin_invocation(_function_name, getattr(context, 'aws_request_id', None))
+        outcome = 'error'
+        try:
+            with timed('handler'):
+                response = handler(event, context)
+            outcome = 'success'
+            return response
+        finally:
+            flush_metrics()
+            end_invocation(outcome)
+    return wrapper
+
+def _before_call(model, context, **kwargs):
+    context['dofs_metrics'] = (f'{model.service_model.service_name}.{model.name}', time.perf_counter())
+
+def _after_call(http_response, parsed, context, **kwargs):
+    stage, start = context.pop('dofs_metrics', (None, None))
+    if stage is None:
+        return
+    outcome = 'success'
+    if http_response.status_code >= 300:
+        outcome = parsed.get('Error', {}).get('Code') or 'error'
+    record_metric(stage, (time.perf_counter() - start) * 1000, outcome)
+
+def _after_call_error(context, **kwargs):
+    stage, start = context.pop('dofs_metrics', (None, None))
+    if stage is not None:
+        record_metric(stage, (time.perf_counter() - start) * 1000, 'error')
+
+def instrument_client(client):
+    """
+    Time every API call made with a botocore client (before-call / after-call events)
+    """
+    events = client.meta.events
+    events.register('before-call', _before_call, unique_id='dofs-metrics-before-call')
+    events.register('after-call', _after_call, unique_id='dofs-metrics-after-call')
+    events.register('after-call-error', _after_call_error, unique_id='dofs-metrics-after-call-error')
+    return client
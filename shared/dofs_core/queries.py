@@ -0,0 +1,159 @@
+"""
+Order read path - single-order lookups and status listings for the API
+
+get_order() reads through a per-container TTL / LRU cache. FULFILLED is the
+only status an order never leaves, so fulfilled orders stay cached for the
+full TTL while orders still in flight are cached for a couple of seconds,
+enough to absorb clients polling in a tight loop without hiding a status
+change for long. Missing orders are not cached (Step Functions may not have
+stored the order yet).
+
+Status listings scatter-gather the status-shard-index GSI (see
+dofs_core.sharding): each page queries every shard of the status in parallel
+and merges them oldest first, so no caller ever loads a whole status into
+memory. The per-shard cursors go back to the client as an opaque next_token.
+Pages are cached briefly too, keyed by the token that produced them.
+"""
+import base64
+import binascii
+import json
+import os
+
+from dofs_core.aws import get_client
+from dofs_core.cache import TTLCache
+from dofs_core.serialization import from_item, to_item
+from dofs_core.sharding import (
+    EXHAUSTED, FAILED_DATE_INDEX_NAME, STATUS_SHARD_INDEX_NAME, failed_date_buckets,
+    scatter_gather_query, status_shard_keys
+)
+from dofs_core.status import FULFILLED
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+ORDER_CACHE_SIZE = int(os.environ.get('ORDER_CACHE_SIZE', '2048'))
+ORDER_CACHE_TTL_SECONDS = int(os.environ.get('ORDER_CACHE_TTL_SECONDS', '300'))
+ORDER_CACHE_ACTIVE_TTL_SECONDS = int(os.environ.get('ORDER_CACHE_ACTIVE_TTL_SECONDS', '2'))
+ORDER_PAGE_CACHE_SIZE = int(os.environ.get('ORDER_PAGE_CACHE_SIZE', '256'))
+ORDER_PAGE_CACHE_TTL_SECONDS = int(os.environ.get('ORDER_PAGE_CACHE_TTL_SECONDS', '2'))
+
+# (table_name, order_id) -> order
+_orders = TTLCache(ORDER_CACHE_SIZE, ORDER_CACHE_TTL_SECONDS)
+# (table_name, status, limit, next_token) -> (orders, next_token)
+_pages = TTLCache(ORDER_PAGE_CACHE_SIZE, ORDER_PAGE_CACHE_TTL_SECONDS)
+
+class InvalidPageToken(ValueError):
+    """
+    next_token that was not issued for this status listing
+    """
+
+def get_order(table_name, order_id):
+    """
+    Return the stored order (plain dict), or None if there is no such order
+    Cached results are shared - callers must not modify them
+    """
+    key = (table_name, order_id)
+    order = _orders.get(key)
+    if order is not None:
+        return order
+
+    response = get_client('dynamodb').get_item(
+        TableName=table_name,
+        Key=to_item({'order_id': order_id})
+    )
+    item = response.get('Item')
+    if item is None:
+        return None
+
+    order = from_item(item)
+    order.pop('status_shard', None)
+    ttl_seconds = ORDER_CACHE_TTL_SECONDS if order.get('status') == FULFILLED else ORDER_CACHE_ACTIVE_TTL_SECONDS
+    _orders.set(key, order, ttl_seconds=ttl_seconds)
+    return order
+
+def query_orders_by_status(table_name, status, limit=DEFAULT_PAGE_SIZE, next_token=None):
+    """
+    One page (at most limit orders, oldest first) of the orders with status
+    Returns (orders, next_token) - next_token is None on the last page
+    Raises InvalidPageToken for a next_token not issued for this status
+    """
+    cache_key = (table_name, status, limit, next_token)
+    page = _pages.get(cache_key)
+    if page is None:
+        cursors = decode_page_token(next_token, status) if next_token else None
+        orders, cursors = _query_page(table_name, status, limit, cursors)
+        page = (orders, encode_page_token(cursors))
+        _pages.set(cache_key, page)
+    return page
+
+def iter_orders_by_status(table_name, status, page_size=DEFAULT_PAGE_SIZE, created_between=None):
+    """
+    Yield the orders with status page by page (oldest first), uncached
+    created_between (low, high) limits created_at to an ISO timestamp range
+    """
+    cursors = None
+    while True:
+        orders, cursors = _query_page(table_name, status, page_size, cursors, created_between)
+        if orders:
+            yield orders
+        if all(cursor == EXHAUSTED for cursor in cursors):
+            return
+
+def iter_failed_orders(table_name, since, until, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Yield the failed orders with failed_at between two ISO timestamps page by
+    page (oldest first), reading every day in the range in parallel
+    """
+    buckets = failed_date_buckets(since, until)
+    cursors = None
+    while True:
+        failed_orders, cursors = scatter_gather_query(
+            table_name, FAILED_DATE_INDEX_NAME, 'order_id', 'failed_date', buckets,
+            'failed_at', page_size, cursors=cursors, sort_range=(since, until)
+        )
+        if failed_orders:
+            yield failed_orders
+        if all(cursor == EXHAUSTED for cursor in cursors):
+            return
+
+def _query_page(table_name, status, limit, cursors, created_between=None):
+    orders, cursors = scatter_gather_query(
+        table_name, STATUS_SHARD_INDEX_NAME, 'order_id', 'status_shard', status_shard_keys(status),
+        'created_at', limit, cursors=cursors, sort_range=created_between
+    )
+    for order in orders:
+        order.pop('status_shard', None)
+    return orders, cursors
+
+def encode_page_token(cursors):
+    """
+    Opaque URL-safe token for per-shard cursors (None once every shard is read)
+    """
+    if all(cursor == EXHAUSTED for cursor in cursors):
+        return None
+    raw = json.dumps(cursors, separators=(',', ':'), sort_keys=True)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_page_token(token, status):
+    """
+    Per-shard cursors for a token from encode_page_token
+    Every cursor must be a status-shard-index key of its own shard of status,
+    so a forged or stale token is rejected here rather than by DynamoDB
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        cursors = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidPageToken('Malformed next_token')
+
+    shard_keys = status_shard_keys(status)
+    if not isinstance(cursors, list) or len(cursors) != len(shard_keys):
+        raise InvalidPageToken('next_token does not belong to this listing')
+    for cursor, shard_key in zip(cursors, shard_keys):
+        if cursor is None or cursor == EXHAUSTED:
+            continue
+        if (not isinstance(cursor, dict) or set(cursor) != {'order_id', 'status_shard', 'created_at'}
+                or cursor['status_shard'] != shard_key
+                or not all(isinstance(value, str) for value in cursor.values())):
+            raise InvalidPageToken('next_token does not belong to this listing')
+    return cursors
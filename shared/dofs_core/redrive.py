@@ -0,0 +1,248 @@
+"""
+DLQ redrive - replay stored failed orders into the order queue
+
+dlq_processor parks orders that exhausted their SQS receives in the
+failed_orders table. Once the cause is fixed they can be sent back:
+- select_failed_orders() finds the candidates. A bounded failed_at range is
+  read through the failed-date-index (one query per day, in parallel);
+  anything else is a parallel segmented Scan, with the criteria pushed into
+  the FilterExpression. Segments are read by worker threads into a small
+  bounded queue, so the table is streamed, never loaded whole.
+- redrive_failed_orders() sends each order's original message back to its
+  lane's order queue (dofs_core.lanes) in SendMessageBatch calls, paced by
+  a token bucket at rate messages per second so a large replay cannot swamp
+  fulfillment.
+
+The replayed message carries redrive_count, which dlq_processor copies into
+the record if the order fails again; orders redriven max_redrives times are
+left alone. After a send the record is marked with redriven_at, on condition
+that failed_at is unchanged - a record rewritten by a newer failure in the
+meantime stays eligible. Replay is at-least-once: a run stopped between send
+and mark sends those orders again next time, which fulfillment tolerates
+(status transitions are idempotent).
+"""
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from dofs_core.aws import error_code, get_client
+from dofs_core.backpressure import TokenBucket
+from dofs_core.envelope import encode_order_message
+from dofs_core.lanes import LaneSender, order_lane
+from dofs_core.queries import iter_failed_orders
+from dofs_core.serialization import from_item, to_item
+from dofs_core.sqs import MAX_BATCH_ENTRIES
+
+REDRIVE_RATE = float(os.environ.get('REDRIVE_RATE', '50'))
+REDRIVE_SCAN_SEGMENTS = int(os.environ.get('REDRIVE_SCAN_SEGMENTS', '4'))
+MAX_REDRIVES = int(os.environ.get('MAX_REDRIVES', '3'))
+
+SCAN_PAGE_SIZE = 100
+
+# Seconds a scan worker waits for room in the page queue before re-checking
+# whether the consumer has stopped
+_PUT_POLL_SECONDS = 0.1
+_SEGMENT_DONE = object()
+
+class RedriveCriteria:
+    """
+    Which failed orders to redrive: failure_reason prefix, failed_at range
+    (ISO timestamps, inclusive), redrive limit, and whether orders already
+    redriven (and not failed since) are included
+    """
+    def __init__(self, reason_prefix=None, failed_after=None, failed_before=None,
+                 max_redrives=MAX_REDRIVES, include_redriven=False):
+        self.reason_prefix = reason_prefix
+        self.failed_after = failed_after
+        self.failed_before = failed_before
+        self.max_redrives = max_redrives
+        self.include_redriven = include_redriven
+
+    def matches(self, failed_order):
+        if self.reason_prefix and not str(failed_order.get('failure_reason', '')).startswith(self.reason_prefix):
+            return False
+        failed_at = failed_order.get('failed_at', '')
+        if self.failed_after and failed_at < self.failed_after:
+            return False
+        if self.failed_before and failed_at > self.failed_before:
+            return False
+        if not self.include_redriven and 'redriven_at' in failed_order:
+            return False
+        return failed_order.get('redrive_count', 0) < self.max_redrives
+
+    def filter_expression(self):
+        """
+        The same criteria as a Scan FilterExpression
+        Returns (expression, attribute values as plain dict)
+        """
+        conditions = ['(attribute_not_exists(redrive_count) OR redrive_count < :max_redrives)']
+        values = {':max_redrives': self.max_redrives}
+        if self.reason_prefix:
+            conditions.append('begins_with(failure_reason, :reason_prefix)')
+            values[':reason_prefix'] = self.reason_prefix
+        if self.failed_after:
+            conditions.append('failed_at >= :failed_after')
+            values[':failed_after'] = self.failed_after
+        if self.failed_before:
+            conditions.append('failed_at <= :failed_before')
+            values[':failed_before'] = self.failed_before
+        if not self.include_redriven:
+            conditions.append('attribute_not_exists(redriven_at)')
+        return ' AND '.join(conditions), values
+
+def select_failed_orders(table_name, criteria, segments=REDRIVE_SCAN_SEGMENTS):
+    """
+    Yield the failed orders matching criteria (plain dicts)
+    Uses the failed-date-index when failed_after bounds the range, otherwise
+    a segmented Scan over segments worker threads
+    """
+    if criteria.failed_after:
+        until = criteria.failed_before or datetime.now(timezone.utc).isoformat()
+        for page in iter_failed_orders(table_name, criteria.failed_after, until):
+            for failed_order in page:
+                if criteria.matches(failed_order):
+                    yield failed_order
+        return
+
+    expression, values = criteria.filter_expression()
+    for page in scan_segments(table_name, segments, FilterExpression=expression,
+                              ExpressionAttributeValues=to_item(values)):
+        for item in page:
+            yield from_item(item)
+
+def scan_segments(table_name, segments, page_size=SCAN_PAGE_SIZE, **scan_kwargs):
+    """
+    Parallel Scan of table_name in segments, yielding pages of raw items as
+    the workers produce them (in no particular order)
+    Workers stop early when the consumer closes the generator
+    """
+    pages = queue.Queue(maxsize=segments * 2)
+    stop = threading.Event()
+
+    def put(entry):
+        while not stop.is_set():
+            try:
+                pages.put(entry, timeout=_PUT_POLL_SECONDS)
+                return
+            except queue.Full:
+                continue
+
+    def scan_segment(segment):
+        request = {
+            'TableName': table_name,
+            'Segment': segment,
+            'TotalSegments': segments,
+            'Limit': page_size,
+            **scan_kwargs
+        }
+        try:
+            while not stop.is_set():
+                response = get_client('dynamodb').scan(**request)
+                if response.get('Items'):
+                    put(response['Items'])
+                last_key = response.get('LastEvaluatedKey')
+                if not last_key:
+                    break
+                request['ExclusiveStartKey'] = last_key
+        except Exception as e:
+            put(e)
+        finally:
+            put(_SEGMENT_DONE)
+
+    executor = ThreadPoolExecutor(max_workers=segments)
+    try:
+        for segment in range(segments):
+            executor.submit(scan_segment, segment)
+        remaining = segments
+        while remaining:
+            entry = pages.get()
+            if entry is _SEGMENT_DONE:
+                remaining -= 1
+            elif isinstance(entry, Exception):
+                raise entry
+            else:
+                yield entry
+    finally:
+        stop.set()
+        executor.shutdown(wait=True)
+
+def build_redrive_message(failed_order):
+    """
+    SQS message body replaying a failed order's original message, with
+    redrive_count advanced
+    """
+    return encode_order_message(failed_order['original_message'],
+                                redrive_count=failed_order.get('redrive_count', 0) + 1)
+
+def redrive_failed_orders(table_name, failed_orders, rate=REDRIVE_RATE, limit=None, dry_run=False):
+    """
+    Send failed_orders (e.g. from select_failed_orders) to their lanes' order
+    queues at no more than rate messages per second, at most limit of them,
+    and mark each sent record as redriven
+    Returns counts: selected, redriven, send_failed and superseded (record
+    rewritten by a newer failure before it could be marked); a dry run only
+    counts selected
+    """
+    summary = {'selected': 0, 'redriven': 0, 'send_failed': 0, 'superseded': 0}
+    bucket = TokenBucket(rate, max(1, min(rate, MAX_BATCH_ENTRIES)))
+    sender = LaneSender()
+
+    with ThreadPoolExecutor(max_workers=MAX_BATCH_ENTRIES) as executor:
+        batch = []
+        for failed_order in failed_orders:
+            if limit is not None and summary['selected'] >= limit:
+                break
+            summary['selected'] += 1
+            if dry_run:
+                continue
+
+            bucket.acquire(timeout=float('inf'))
+            batch.append(failed_order)
+            if len(batch) == MAX_BATCH_ENTRIES:
+                _redrive_batch(table_name, sender, executor, batch, summary)
+                batch = []
+        if batch:
+            _redrive_batch(table_name, sender, executor, batch, summary)
+
+    return summary
+
+def _redrive_batch(table_name, sender, executor, batch, summary):
+    entry_ids = [
+        sender.add(build_redrive_message(failed_order), order_lane(failed_order['original_message']))
+        for failed_order in batch
+    ]
+    sender.flush()
+
+    redriven_at = datetime.now(timezone.utc).isoformat()
+    sent = [failed_order for entry_id, failed_order in zip(entry_ids, batch) if entry_id not in sender.failures]
+    summary['send_failed'] += len(batch) - len(sent)
+    for marked in executor.map(lambda failed_order: mark_redriven(table_name, failed_order, redriven_at), sent):
+        summary['redriven'] += 1
+        if not marked:
+            summary['superseded'] += 1
+
+def mark_redriven(table_name, failed_order, redriven_at):
+    """
+    Record a redrive on the failed order's record, unless a newer failure has
+    replaced the record since it was read
+    Returns False when the record was replaced
+    """
+    try:
+        get_client('dynamodb').update_item(
+            TableName=table_name,
+            Key=to_item({'order_id': failed_order['order_id']}),
+            UpdateExpression='SET redriven_at = :redriven_at ADD redrive_count :one',
+            ConditionExpression='failed_at = :failed_at',
+            ExpressionAttributeValues=to_item({
+                ':redriven_at': redriven_at,
+                ':one': 1,
+                ':failed_at': failed_order['failed_at']
+            })
+        )
+        return True
+    except Exception as e:
+        if error_code(e) != 'ConditionalCheckFailedException':
+            raise
+        return False
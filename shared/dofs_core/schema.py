@@ -0,0 +1,446 @@
+"""
+Declarative order schema and the validator built from it
+
+A schema maps field names to rule dicts:
+    type                'string' | 'number' | 'list' | 'dict'
+    required            field must be present and non-empty
+    max_length          maximum string length
+    gt / ge             exclusive / inclusive lower bound for numbers
+    le                  inclusive upper bound for numbers
+    max_decimal_places  maximum digits after the decimal point for numbers
+    min_items/max_items list length bounds
+    fields              schema applied to each entry of a list of objects
+    sum_of              (list_field, factor_a, factor_b) - value must equal the sum
+                        of factor_a * factor_b over list_field, rounded to
+                        factor_b's decimal places; the sum is accumulated while
+                        that list is validated, so entries are visited once
+    message             error text used instead of the generated one
+
+Each field's rules are read into a _Field once, when the validator is built;
+validating an order is a plain walk over those fields. Numbers with
+max_decimal_places are carried as integers of 10**-places, so the sum check
+is exact without converting every price to Decimal. NaN and Infinity fail
+validation like any other bad number.
+
+Almost every order is valid, so the validator first runs _fast_valid: flat
+checks built from the same rules that only answer "valid or not", with one
+dedicated loop for an order's items (product_id, int quantity, price). Only
+an order it does not pass - invalid, or outside the straight path such as
+fractional quantities - is walked field by field to collect the errors.
+"""
+import math
+from decimal import Decimal, ROUND_HALF_UP
+
+MAX_ORDER_ITEMS = 1000
+
+ORDER_SCHEMA = {
+    'customer_id': {'type': 'string', 'required': True, 'max_length': 128},
+    'items': {
+        'type': 'list',
+        'required': True,
+        'min_items': 1,
+        'max_items': MAX_ORDER_ITEMS,
+        'message': 'Items must be a non-empty array',
+        'fields': {
+            'product_id': {'type': 'string', 'required': True, 'max_length': 128},
+            'quantity': {
+                'type': 'number',
+                'required': True,
+                'gt': 0,
+                'le': 1000000,
+                'message': 'quantity must be positive number'
+            },
+            'price': {
+                'type': 'number',
+                'required': True,
+                'ge': 0,
+                'le': 1000000000,
+                'max_decimal_places': 2,
+                'message': 'price must be non-negative number'
+            }
+        }
+    },
+    'total_amount': {
+        'type': 'number',
+        'required': True,
+        'gt': 0,
+        'le': 1000000000000,
+        'max_decimal_places': 2,
+        'sum_of': ('items', 'quantity', 'price'),
+        'message': 'total_amount must be positive number'
+    },
+    'shipping_address': {'type': 'dict'},
+    'shipping_method': {'type': 'string', 'max_length': 32}
+}
+
+class _Field:
+    """
+    One field's rules, read from the schema once
+    check() reports problems through append(_where(index) + text) and returns None
+    when the value is absent or invalid; otherwise the value - for numbers
+    with max_decimal_places, the exact value * 10**places as an int
+    """
+    def __init__(self, name, rules, missing):
+        self.name = name
+        self.type = rules.get('type')
+        self.required = rules.get('required', False)
+        self.missing = missing
+        self.message = rules.get('message')
+        self.max_length = rules.get('max_length')
+        self.gt = rules.get('gt')
+        self.ge = rules.get('ge')
+        self.le = rules.get('le')
+        self.places = rules.get('max_decimal_places')
+        self.scale = 10 ** self.places if self.places is not None else None
+        self.min_items = rules.get('min_items', 0)
+        self.max_items = rules.get('max_items')
+
+    def check(self, value, append, index=None):
+        if value is None or value == '' or (value.__class__ in (list, dict) and not value):
+            if self.required:
+                append(_where(index) + self.missing)
+            return None
+        if self.type == 'number':
+            return self._check_number(value, append, index)
+        if self.type == 'string':
+            if not isinstance(value, str):
+                append(_where(index) + (self.message or f'{self.name} must be a string'))
+                return None
+            if self.max_length is not None and len(value) > self.max_length:
+                append(_where(index) + f'{self.name} must be at most {self.max_length} characters')
+                return None
+            return value
+        if self.type == 'dict' and not isinstance(value, dict):
+            append(_where(index) + (self.message or f'{self.name} must be an object'))
+            return None
+        if self.type == 'list':
+            if not isinstance(value, list) or len(value) < self.min_items:
+                append(_where(index) + (self.message or f'{self.name} must be an array'))
+                return None
+            if self.max_items is not None and len(value) > self.max_items:
+                append(_where(index) + f'{self.name} must contain at most {self.max_items} entries')
+                return None
+        return value
+
+    def _check_number(self, value, append, index):
+        value_class = value.__class__
+        if not ((value_class is int or value_class is float or value_class is Decimal)
+                and (value_class is int or (math.isfinite(value) if value_class is float else value.is_finite()))):
+            # bool, strings and NaN / Infinity
+            append(_where(index) + (self.message or f'{self.name} must be a number'))
+            return None
+        if (self.gt is not None and value <= self.gt) or (self.ge is not None and value < self.ge):
+            append(_where(index) + (self.message or f'{self.name} is out of range'))
+            return None
+        if self.le is not None and value > self.le:
+            append(_where(index) + f'{self.name} must be at most {self.le}')
+            return None
+        if self.scale is None:
+            return value
+        if value_class is int:
+            return value * self.scale
+        if value_class is float:
+            raw = value * self.scale
+            scaled = round(raw)
+            if abs(raw - scaled) <= _SCALE_TOLERANCE:
+                return scaled
+        elif value.as_tuple().exponent >= -self.places or value.normalize().as_tuple().exponent >= -self.places:
+            return int(value * self.scale)
+        append(_where(index) + f'{self.name} must have at most {self.places} decimal places')
+        return None
+
+def _where(index):
+    return '' if index is None else f'Item {index}: '
+
+# Largest distance from an integer that a float's value * 10**places may have
+# (float noise) for it to count as having at most max_decimal_places digits
+_SCALE_TOLERANCE = 1e-6
+
+def _factor(value):
+    """
+    Quantity factor that can be summed exactly with scaled integers
+    """
+    return Decimal(repr(value)) if value.__class__ is float else value
+
+def _settle(total):
+    """
+    Round a scaled Decimal sum (fractional quantities) to the nearest scaled integer
+    """
+    if total.__class__ is int:
+        return total
+    return int(total.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def _check_entries(fields, entries, append, factor_a, factor_b):
+    """
+    Validate every entry of a list of objects in one pass
+    Returns the scaled sum of factor_a * factor_b when both are given and
+    every entry is valid, otherwise None
+    """
+    total = 0 if factor_a else None
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            append(f'Item {index}: must be an object')
+            total = None
+            continue
+        a = b = None
+        for field in fields:
+            value = field.check(entry.get(field.name), append, index)
+            if field.name == factor_a:
+                a = value
+            elif field.name == factor_b:
+                b = value
+        if total is not None:
+            if a is None or b is None:
+                total = None
+            else:
+                total += a * b if a.__class__ is int else _factor(a) * b
+    return total
+
+def compile_schema(schema, fields=None):
+    """
+    Build validate(data) -> list of errors for schema (optionally restricted to fields)
+    """
+    selected = []
+    sum_sources = {
+        rules['sum_of'][0]: rules['sum_of'][1:]
+        for name, rules in schema.items() if 'sum_of' in rules and (fields is None or name in fields)
+    }
+    for name, rules in schema.items():
+        if fields is not None and name not in fields:
+            continue
+        entries = None
+        if 'fields' in rules:
+            entries = [_Field(field, field_rules, f'missing {field}') for field, field_rules in rules['fields'].items()]
+        summed = None
+        if 'sum_of' in rules:
+            source, factor_a, factor_b = rules['sum_of']
+            summed = (source, factor_a, factor_b, schema[source]['fields'][factor_b].get('max_decimal_places', 0))
+        selected.append((_Field(name, rules, f'Missing required field: {name}'), entries,
+                         sum_sources.get(name, (None, None)), summed))
+
+    plan = _fast_plan(schema, selected)
+
+    def validate(data):
+        if not isinstance(data, dict):
+            return ['Order must be a JSON object']
+        if plan is not None and _fast_valid(data, plan):
+            return []
+        errors = []
+        append = errors.append
+        sums = {}
+        for field, entries, factors, summed in selected:
+            value = field.check(data.get(field.name), append)
+            if value is None:
+                continue
+            if entries is not None:
+                sums[field.name] = _check_entries(entries, value, append, *factors)
+            elif summed is not None and sums.get(summed[0]) is not None:
+                source, factor_a, factor_b, places = summed
+                expected = _settle(sums[source])
+                if value != expected:
+                    append(f'{field.name} {data[field.name]} does not match sum of {factor_a} x {factor_b}'
+                           f' ({Decimal(expected).scaleb(-places)})')
+        return errors
+
+    return validate
+
+# Kinds of the fields _fast_valid checks
+_STRING, _NUMBER, _DICT, _LIST = range(4)
+
+def _fast_spec(name, rules):
+    """
+    (name, required, kind, params) for _fast_valid, or None when the field
+    needs the general walk: strings, bounded numbers, dicts and lists only
+    """
+    required = rules.get('required', False)
+    kind = rules.get('type')
+    if kind == 'string':
+        return name, required, _STRING, rules.get('max_length')
+    if kind == 'number':
+        low = rules['gt'] if 'gt' in rules else rules.get('ge')
+        if low is None or 'le' not in rules:
+            # Without both bounds the range check would not also rule out NaN / Infinity
+            return None
+        places = rules.get('max_decimal_places')
+        return name, required, _NUMBER, (low, 'gt' not in rules, rules['le'], places,
+                                         10 ** places if places is not None else None)
+    if kind == 'dict':
+        return name, required, _DICT, None
+    if kind == 'list':
+        return name, required, _LIST, (rules.get('min_items', 0), rules.get('max_items'))
+    return None
+
+def _fast_plan(schema, selected):
+    """
+    Flat checks for _fast_valid, or None when some selected field needs the
+    general walk (a list of objects may only hold strings and numbers, and a
+    sum_of must follow its list)
+    """
+    plan = []
+    seen = set()
+    for field, entries, factors, summed in selected:
+        spec = _fast_spec(field.name, schema[field.name])
+        if spec is None:
+            return None
+        entry_specs = None
+        if entries is not None:
+            entry_specs = [_fast_spec(entry.name, schema[field.name]['fields'][entry.name]) for entry in entries]
+            if any(entry_spec is None or entry_spec[2] not in (_STRING, _NUMBER) for entry_spec in entry_specs):
+                return None
+        if summed is not None and summed[0] not in seen:
+            return None
+        seen.add(field.name)
+        check_entries = _entries_checker(entry_specs, *factors) if entry_specs is not None else None
+        plan.append((spec, check_entries, summed[0] if summed is not None else None))
+    return plan
+
+def _entries_checker(entry_specs, factor_a, factor_b):
+    """
+    check(entries) -> scaled sum of factor_a * factor_b (0 without factors),
+    or None when an entry fails the straight-path checks
+    Entries of required strings plus the two factors - an order's items - get
+    a dedicated loop; any other shape goes through _fast_entries
+    """
+    strings = tuple((name, params) for name, required, kind, params in entry_specs
+                    if kind is _STRING and required)
+    numbers = {name: params for name, required, kind, params in entry_specs if kind is _NUMBER and required}
+    if (factor_a is None or len(strings) + len(numbers) != len(entry_specs) or set(numbers) != {factor_a, factor_b}
+            or numbers[factor_a][4] is not None or numbers[factor_b][4] is None):
+        return lambda entries: _fast_entries(entries, entry_specs, factor_a, factor_b)
+
+    a_low, a_inclusive, a_high = numbers[factor_a][:3]
+    b_params = numbers[factor_b]
+    b_low, b_inclusive, b_high, _, b_scale = b_params
+    tolerance = _SCALE_TOLERANCE
+    fast_round = round
+    fast_number = _fast_number
+
+    def check(entries):
+        total = 0
+        for entry in entries:
+            if entry.__class__ is not dict:
+                return None
+            for name, max_length in strings:
+                value = entry.get(name)
+                if value.__class__ is not str or not value or (max_length is not None and len(value) > max_length):
+                    return None
+            a = entry.get(factor_a)
+            # int only - fractional quantities are summed exactly by the general walk
+            if a.__class__ is not int or not ((a_low <= a) if a_inclusive else (a_low < a)) or a > a_high:
+                return None
+            b = entry.get(factor_b)
+            if b.__class__ is float:
+                # NaN fails both comparisons and Infinity the bound
+                if not ((b_low <= b) if b_inclusive else (b_low < b)) or b > b_high:
+                    return None
+                raw = b * b_scale
+                scaled = fast_round(raw)
+                if not -tolerance <= raw - scaled <= tolerance:
+                    return None
+            else:
+                scaled = fast_number(b, b_params) if b is not None else None
+                if scaled is None:
+                    return None
+            total += a * scaled
+        return total
+
+    return check
+
+def _fast_number(value, params):
+    """
+    value, scaled to an int when params carry a scale, if it is an in-range
+    number with at most the allowed decimal places; otherwise None
+    """
+    low, inclusive, high, places, scale = params
+    value_class = value.__class__
+    if value_class is int or value_class is float:
+        # NaN fails both comparisons and Infinity the bound
+        if not ((low <= value) if inclusive else (low < value)) or value > high:
+            return None
+    elif value_class is Decimal:
+        if not value.is_finite() or not ((low <= value) if inclusive else (low < value)) or value > high:
+            return None
+    else:
+        return None
+    if scale is None:
+        return value
+    if value_class is int:
+        return value * scale
+    if value_class is float:
+        raw = value * scale
+        scaled = round(raw)
+        return scaled if abs(raw - scaled) <= _SCALE_TOLERANCE else None
+    return int(value * scale) if value.as_tuple().exponent >= -places else None
+
+def _fast_valid(data, plan):
+    """
+    Whether data is valid, checked on the straight path only: True means the
+    general walk would find no error; False means it has to run to say what
+    is wrong (or to handle what this path does not - fractional quantities,
+    trailing-zero Decimals, str subclasses)
+    """
+    sums = {}
+    for (name, required, kind, params), check_entries, summed in plan:
+        value = data.get(name)
+        if value is None or value == '':
+            if required:
+                return False
+            continue
+        if kind is _NUMBER:
+            value = _fast_number(value, params)
+            if value is None or (summed is not None and value != sums.get(summed)):
+                return False
+        elif kind is _STRING:
+            if value.__class__ is not str or (params is not None and len(value) > params):
+                return False
+        elif kind is _DICT:
+            if value.__class__ is not dict or (required and not value):
+                return False
+        else:
+            min_items, max_items = params
+            if value.__class__ is not list or len(value) < max(min_items, 1 if required else 0) \
+                    or (max_items is not None and len(value) > max_items):
+                return False
+            if check_entries is not None:
+                total = check_entries(value)
+                if total is None:
+                    return False
+                sums[name] = total
+    return True
+
+def _fast_entries(entries, entry_specs, factor_a, factor_b):
+    """
+    Scaled sum of factor_a * factor_b over entries (0 without factors) if
+    every entry passes the straight-path checks; otherwise None
+    """
+    total = 0
+    for entry in entries:
+        if entry.__class__ is not dict:
+            return None
+        a = b = None
+        for name, required, kind, params in entry_specs:
+            value = entry.get(name)
+            if value is None or value == '':
+                if required:
+                    return None
+                continue
+            if kind is _STRING:
+                if value.__class__ is not str or (params is not None and len(value) > params):
+                    return None
+                continue
+            value = _fast_number(value, params)
+            if value is None:
+                return None
+            if name == factor_a:
+                a = value
+            elif name == factor_b:
+                b = value
+        if factor_a is not None:
+            if a.__class__ is not int or b is None:
+                # Fractional quantities are summed exactly by the general walk
+                return None
+            total += a * b
+    return total
+
+# Built once per container and shared by validator and api_handler
+check_order = compile_schema(ORDER_SCHEMA)
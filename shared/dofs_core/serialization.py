@@ -0,0 +1,89 @@
+"""
+JSON and DynamoDB serialization shared by the DOFS Lambdas
+
+loads() parses JSON numbers with a fractional part straight to Decimal, so
+orders never need a float-to-Decimal walk before DynamoDB. to_item() turns a
+plain dict (str / int / float / Decimal / bool / None / dict / list) into a
+low-level DynamoDB attribute map in a single walk, replacing both the old
+convert_floats_to_decimal pass and boto3's TypeSerializer pass; from_item()
+is its inverse. dumps() writes Decimal values back out as JSON numbers.
+"""
+import json
+import math
+from decimal import Decimal
+
+def loads(text):
+    """
+    Parse JSON text, returning non-integer numbers as Decimal
+    """
+    return json.loads(text, parse_float=Decimal)
+
+def _encode_decimal(value):
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+def dumps(obj, separators=None):
+    """
+    Serialize obj to JSON, writing Decimal values as numbers
+    """
+    return json.dumps(obj, separators=separators, default=_encode_decimal)
+
+def to_attribute_value(value):
+    """
+    Convert one Python value to a DynamoDB AttributeValue
+    """
+    value_class = value.__class__
+    if value_class is str:
+        return {'S': value}
+    if value_class is int or value_class is Decimal:
+        if value_class is Decimal and not value.is_finite():
+            raise ValueError(f'DynamoDB does not support number {value}')
+        return {'N': str(value)}
+    if value_class is float:
+        if not math.isfinite(value):
+            raise ValueError(f'DynamoDB does not support number {value}')
+        return {'N': repr(value)}
+    if value_class is bool:
+        return {'BOOL': value}
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, dict):
+        return {'M': {key: to_attribute_value(item) for key, item in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {'L': [to_attribute_value(item) for item in value]}
+    if isinstance(value, str):
+        return {'S': str(value)}
+    raise TypeError(f'Unsupported type for DynamoDB attribute: {type(value).__name__}')
+
+def to_item(mapping):
+    """
+    Convert a dict to a low-level DynamoDB item (attribute map)
+    """
+    return {key: to_attribute_value(value) for key, value in mapping.items()}
+
+def from_attribute_value(attribute):
+    """
+    Convert one DynamoDB AttributeValue back to a Python value
+    Numbers come back as int when integral, otherwise Decimal
+    """
+    (kind, value), = attribute.items()
+    if kind == 'S':
+        return value
+    if kind == 'N':
+        return int(value) if value.lstrip('-').isdigit() else Decimal(value)
+    if kind == 'BOOL':
+        return value
+    if kind == 'NULL':
+        return None
+    if kind == 'M':
+        return {key: from_attribute_value(item) for key, item in value.items()}
+    if kind == 'L':
+        return [from_attribute_value(item) for item in value]
+    raise TypeError(f'Unsupported DynamoDB attribute type: {kind}')
+
+def from_item(item):
+    """
+    Convert a low-level DynamoDB item (attribute map) to a dict
+    """
+    return {key: from_attribute_value(value) for key, value in item.items()}
@@ -0,0 +1,135 @@
+"""
+Write-sharded GSI keys and the scatter-gather query that reads them back
+
+Almost every order is PENDING or FULFILLED, so a GSI keyed on status alone
+puts nearly all index writes on two partitions. Orders carry
+status_shard = '<status>#<shard>' instead, the shard being a stable hash of
+the order ID, which spreads each status over ORDER_STATUS_SHARDS partitions.
+Failed orders are keyed the other way round: failed_date (the UTC day) groups
+them into one partition per day, with failed_at as the sort key, so a time
+range is a handful of BETWEEN queries rather than a table scan.
+
+scatter_gather_query() reads such a key set back: one Query per partition
+value, run in parallel, with the pages merged in sort-key order. Each call
+returns at most limit items and a cursor per partition, so callers page
+through all partitions together without loading any of them whole.
+
+The shard count is shared by every writer and reader; raising it is safe
+(new shards are empty until written), lowering it hides orders in the
+dropped shards.
+"""
+import heapq
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from dofs_core.aws import get_client
+from dofs_core.serialization import from_attribute_value, from_item, to_item
+
+STATUS_SHARD_COUNT = int(os.environ.get('ORDER_STATUS_SHARDS', '10'))
+SCATTER_GATHER_CONCURRENCY = int(os.environ.get('SCATTER_GATHER_CONCURRENCY', '10'))
+
+# Widest failed_at range one scatter-gather may cover (one query per day)
+MAX_FAILED_DATE_BUCKETS = 92
+
+STATUS_SHARD_INDEX_NAME = 'status-shard-index'
+FAILED_DATE_INDEX_NAME = 'failed-date-index'
+
+# Cursor of a partition with nothing left to read
+EXHAUSTED = 'done'
+
+def status_shard_key(status, order_id):
+    """
+    status_shard attribute of an order - '<status>#<shard>'
+    """
+    return f"{status}#{zlib.crc32(order_id.encode('utf-8')) % STATUS_SHARD_COUNT}"
+
+def status_shard_keys(status):
+    """
+    Every status_shard value of status, in shard order
+    """
+    return [f'{status}#{shard}' for shard in range(STATUS_SHARD_COUNT)]
+
+def failed_date_bucket(failed_at):
+    """
+    failed_date attribute of a failed order - the UTC day of its ISO failed_at
+    """
+    return failed_at[:10]
+
+def failed_date_buckets(since, until):
+    """
+    Every failed_date value between two ISO timestamps (inclusive)
+    """
+    first = date.fromisoformat(failed_date_bucket(since))
+    last = date.fromisoformat(failed_date_bucket(until))
+    if not 0 <= (last - first).days < MAX_FAILED_DATE_BUCKETS:
+        raise ValueError(f'failed_at range must cover 1 to {MAX_FAILED_DATE_BUCKETS} days')
+    return [(first + timedelta(days=offset)).isoformat() for offset in range((last - first).days + 1)]
+
+def scatter_gather_query(table_name, index_name, table_key, partition_key, partition_values,
+                         sort_key, limit, cursors=None, sort_range=None, scan_forward=True,
+                         max_workers=SCATTER_GATHER_CONCURRENCY):
+    """
+    Query partition_key = value for every value in partition_values in parallel
+    and merge the results in sort_key order (descending if not scan_forward)
+    cursors holds one entry per value: None (start), the item key to continue
+    after, or EXHAUSTED; sort_range (low, high) limits sort_key with BETWEEN
+    Returns (items, cursors) - at most limit plain-dict items and the cursors
+    for the next call, all EXHAUSTED once every partition has been read
+    """
+    cursors = list(cursors) if cursors is not None else [None] * len(partition_values)
+    key_names = list(dict.fromkeys((table_key, partition_key, sort_key)))
+
+    def query(position):
+        request = {
+            'TableName': table_name,
+            'IndexName': index_name,
+            'KeyConditionExpression': '#pk = :pk',
+            'ExpressionAttributeNames': {'#pk': partition_key},
+            'ExpressionAttributeValues': {':pk': partition_values[position]},
+            'ScanIndexForward': scan_forward,
+            'Limit': limit
+        }
+        if sort_range is not None:
+            request['KeyConditionExpression'] += ' AND #sk BETWEEN :low AND :high'
+            request['ExpressionAttributeNames']['#sk'] = sort_key
+            request['ExpressionAttributeValues'].update({':low': sort_range[0], ':high': sort_range[1]})
+        request['ExpressionAttributeValues'] = to_item(request['ExpressionAttributeValues'])
+        if cursors[position] is not None:
+            request['ExclusiveStartKey'] = to_item(cursors[position])
+        return position, get_client('dynamodb').query(**request)
+
+    active = [position for position, cursor in enumerate(cursors) if cursor != EXHAUSTED]
+    if max_workers > 1 and len(active) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(active))) as executor:
+            responses = dict(executor.map(query, active))
+    else:
+        responses = dict(query(position) for position in active)
+
+    # Each partition's page is already in sort-key order; merge them lazily
+    # and take the first limit items
+    streams = [
+        [(from_attribute_value(item[sort_key]), position, offset, item)
+         for offset, item in enumerate(responses[position].get('Items', []))]
+        for position in active
+    ]
+    merged = heapq.merge(*streams, reverse=not scan_forward)
+    taken = [entry for entry, _ in zip(merged, range(limit))]
+
+    taken_counts = {}
+    last_taken = {}
+    for _, position, offset, item in taken:
+        taken_counts[position] = taken_counts.get(position, 0) + 1
+        last_taken[position] = item
+
+    for position in active:
+        response = responses[position]
+        if taken_counts.get(position, 0) == len(response.get('Items', [])):
+            # Everything this page returned was used - continue after the page
+            last_key = response.get('LastEvaluatedKey')
+            cursors[position] = from_item(last_key) if last_key else EXHAUSTED
+        elif position in last_taken:
+            cursors[position] = {name: from_attribute_value(last_taken[position][name]) for name in key_names}
+
+    return [from_item(item) for _, _, _, item in taken], cursors
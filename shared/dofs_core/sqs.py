@@ -0,0 +1,134 @@
+"""
+Batched SQS enqueue with SendMessageBatch
+
+SqsBatchSender buffers messages for one queue and sends them 10 at a time
+(or fewer, when the next message would push the request past 256 KB). Entries
+that a batch call reports as failed, or every entry when the whole call
+fails, are retried one by one with send_message; entries failed through the
+sender's own fault (e.g. invalid attributes) are not retried.
+"""
+import random
+import time
+
+from dofs_core.aws import get_client
+
+MAX_BATCH_ENTRIES = 10
+MAX_BATCH_BYTES = 256 * 1024
+MAX_SEND_ATTEMPTS = 3
+SEND_BASE_BACKOFF_SECONDS = 0.05
+
+def message_size(message_body, message_attributes=None):
+    """
+    Size of a message as counted against the SQS payload limit
+    """
+    size = len(message_body.encode('utf-8'))
+    for name, attribute in (message_attributes or {}).items():
+        size += len(name.encode('utf-8')) + len(attribute['DataType'].encode('utf-8'))
+        if 'StringValue' in attribute:
+            size += len(attribute['StringValue'].encode('utf-8'))
+        else:
+            size += len(attribute.get('BinaryValue', b''))
+    return size
+
+class SqsBatchSender:
+    """
+    Buffer messages for queue_url and send them with SendMessageBatch
+    After flush(): message_ids maps entry id -> MessageId for delivered messages,
+    failures maps entry id -> error for messages that could not be sent
+    Not thread-safe - use one sender per thread
+    """
+    def __init__(self, queue_url, client=None, max_attempts=MAX_SEND_ATTEMPTS):
+        self.queue_url = queue_url
+        self.client = client or get_client('sqs')
+        self.max_attempts = max_attempts
+        self.message_ids = {}
+        self.failures = {}
+        self.batch_calls = 0
+        self._entries = []
+        self._bytes = 0
+        self._next_id = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.flush()
+        return False
+
+    def add(self, message_body, message_attributes=None, entry_id=None, delay_seconds=None):
+        """
+        Queue one message (delivered after delay_seconds, up to 900, when given),
+        sending the current batch first if it is full
+        Returns the entry id used to look up the result
+        """
+        if entry_id is None:
+            entry_id = f'm{self._next_id}'
+            self._next_id += 1
+        size = message_size(message_body, message_attributes)
+        if size > MAX_BATCH_BYTES:
+            raise ValueError(f'SQS message {entry_id} is {size} bytes, over the {MAX_BATCH_BYTES} byte limit')
+
+        if len(self._entries) == MAX_BATCH_ENTRIES or self._bytes + size > MAX_BATCH_BYTES:
+            self.flush()
+
+        entry = {'Id': entry_id, 'MessageBody': message_body}
+        if message_attributes:
+            entry['MessageAttributes'] = message_attributes
+        if delay_seconds:
+            entry['DelaySeconds'] = delay_seconds
+        self._entries.append(entry)
+        self._bytes += size
+        return entry_id
+
+    def flush(self):
+        """
+        Send buffered messages, retrying failed entries individually
+        """
+        if not self._entries:
+            return
+        entries, self._entries, self._bytes = self._entries, [], 0
+
+        self.batch_calls += 1
+        try:
+            response = self.client.send_message_batch(QueueUrl=self.queue_url, Entries=entries)
+        except Exception as e:
+            retry = [(entry, str(e)) for entry in entries]
+        else:
+            for successful in response.get('Successful', []):
+                self.message_ids[successful['Id']] = successful['MessageId']
+            entries_by_id = {entry['Id']: entry for entry in entries}
+            retry = []
+            for failed in response.get('Failed', []):
+                error = failed.get('Message') or failed.get('Code', 'SendMessageBatch entry failed')
+                if failed.get('SenderFault'):
+                    self.failures[failed['Id']] = error
+                else:
+                    retry.append((entries_by_id[failed['Id']], error))
+
+        if retry:
+            self._send_individually(retry)
+
+    def _send_individually(self, retry):
+        """
+        Retry failed entries one by one with send_message, backing off (full
+        jitter) once per round rather than per entry
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            time.sleep(random.uniform(0, SEND_BASE_BACKOFF_SECONDS * (2 ** (attempt - 1))))
+            still_failed = []
+            for entry, error in retry:
+                kwargs = {'QueueUrl': self.queue_url, 'MessageBody': entry['MessageBody']}
+                if 'MessageAttributes' in entry:
+                    kwargs['MessageAttributes'] = entry['MessageAttributes']
+                if 'DelaySeconds' in entry:
+                    kwargs['DelaySeconds'] = entry['DelaySeconds']
+                try:
+                    response = self.client.send_message(**kwargs)
+                    self.message_ids[entry['Id']] = response['MessageId']
+                except Exception as e:
+                    still_failed.append((entry, str(e)))
+            retry = still_failed
+            if not retry:
+                return
+        for entry, error in retry:
+            self.failures[entry['Id']] = error
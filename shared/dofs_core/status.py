@@ -0,0 +1,147 @@
+"""
+Order status state machine enforced with DynamoDB condition expressions
+
+Orders only move forward: PENDING -> FAILED -> FULFILLED, or PENDING ->
+FULFILLED. Each transition is a single conditional update_item that lists the
+statuses the order may be coming from, so an illegal transition (FULFILLED back
+to FAILED) and a repeat of one that already happened (FAILED again on the next
+SQS retry) are both rejected by DynamoDB and skipped rather than written.
+Missing orders fail the condition too, instead of being created as
+status-only items.
+
+The write also moves the order's status_shard (see dofs_core.sharding), so
+the order leaves the old status's index shard and joins the new one.
+
+touch_orders stamps updated_at on orders that are still in flight without
+changing their status, so the reconciler (which only re-enqueues orders not
+updated for RECONCILE_MIN_AGE_SECONDS) leaves them to the queue.
+
+Each container remembers the last status it saw per order. Because statuses
+only move forward, the real status is at least that far along, so a
+transition that is not legal from the remembered status is skipped without
+any DynamoDB call.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from dofs_core.aws import error_code, get_client
+from dofs_core.cache import TTLCache
+from dofs_core.serialization import to_item
+from dofs_core.sharding import status_shard_key
+
+PENDING = 'PENDING'
+FAILED = 'FAILED'
+FULFILLED = 'FULFILLED'
+
+ORDER_STATUSES = (PENDING, FAILED, FULFILLED)
+
+# Target status -> statuses it may be reached from
+ORDER_TRANSITIONS = {
+    FAILED: (PENDING,),
+    FULFILLED: (PENDING, FAILED),
+}
+
+# Position of each status along the forward-only lifecycle
+_STATUS_ORDER = {PENDING: 0, FAILED: 1, FULFILLED: 2}
+
+STATUS_CACHE_SIZE = int(os.environ.get('ORDER_STATUS_CACHE_SIZE', '4096'))
+STATUS_CACHE_TTL_SECONDS = int(os.environ.get('ORDER_STATUS_CACHE_TTL_SECONDS', '900'))
+STATUS_UPDATE_CONCURRENCY = int(os.environ.get('ORDER_STATUS_UPDATE_CONCURRENCY', '10'))
+
+# order_id -> last status this container wrote or read back
+_known_status = TTLCache(STATUS_CACHE_SIZE, STATUS_CACHE_TTL_SECONDS)
+
+def transition_order_status(table_name, order_id, status):
+    """
+    Move one order to status if that is a legal transition from its current status
+    Returns True when written, False when skipped (the order was already there,
+    further along, or missing); other errors are raised
+    """
+    sources = ORDER_TRANSITIONS.get(status)
+    if sources is None:
+        raise ValueError(f'Unknown target order status: {status}')
+
+    known = _known_status.get(order_id)
+    if known is not None and known not in sources:
+        return False
+
+    placeholders = [f':from{index}' for index in range(len(sources))]
+    values = {placeholder: source for placeholder, source in zip(placeholders, sources)}
+    values[':status'] = status
+    values[':status_shard'] = status_shard_key(status, order_id)
+    values[':updated_at'] = datetime.now(timezone.utc).isoformat()
+
+    try:
+        get_client('dynamodb').update_item(
+            TableName=table_name,
+            Key=to_item({'order_id': order_id}),
+            UpdateExpression='SET #status = :status, status_shard = :status_shard, updated_at = :updated_at',
+            ConditionExpression=f'#status IN ({", ".join(placeholders)})',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues=to_item(values),
+            ReturnValuesOnConditionCheckFailure='ALL_OLD'
+        )
+    except Exception as e:
+        if error_code(e) != 'ConditionalCheckFailedException':
+            raise
+        current = e.response.get('Item', {}).get('status', {}).get('S')
+        if current is not None:
+            _known_status.set(order_id, current)
+        return False
+
+    _known_status.set(order_id, status)
+    return True
+
+def transition_order_statuses(table_name, transitions, max_workers=STATUS_UPDATE_CONCURRENCY):
+    """
+    Apply many transitions - an iterable of (order_id, status) - concurrently
+    Duplicates of an order collapse to the furthest status (one write per order)
+    Returns {order_id: True (written) | False (skipped) | exception}
+    """
+    targets = {}
+    for order_id, status in transitions:
+        current = targets.get(order_id)
+        if current is None or _STATUS_ORDER[status] > _STATUS_ORDER[current]:
+            targets[order_id] = status
+
+    def apply(item):
+        order_id, status = item
+        try:
+            return order_id, transition_order_status(table_name, order_id, status)
+        except Exception as e:
+            return order_id, e
+
+    if max_workers > 1 and len(targets) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(targets))) as executor:
+            return dict(executor.map(apply, targets.items()))
+    return dict(apply(item) for item in targets.items())
+
+def touch_orders(table_name, order_ids, max_workers=STATUS_UPDATE_CONCURRENCY):
+    """
+    Set updated_at to now on orders that are not FULFILLED, concurrently
+    Returns {order_id: True (written) | False (skipped: FULFILLED or missing) | exception}
+    """
+    values = to_item({':fulfilled': FULFILLED, ':updated_at': datetime.now(timezone.utc).isoformat()})
+
+    def touch(order_id):
+        try:
+            get_client('dynamodb').update_item(
+                TableName=table_name,
+                Key=to_item({'order_id': order_id}),
+                UpdateExpression='SET updated_at = :updated_at',
+                ConditionExpression='attribute_exists(order_id) AND #status <> :fulfilled',
+                ExpressionAttributeNames={'#status': 'status'},
+                ExpressionAttributeValues=values
+            )
+            return order_id, True
+        except Exception as e:
+            if error_code(e) == 'ConditionalCheckFailedException':
+                return order_id, False
+            return order_id, e
+
+    order_ids = list(dict.fromkeys(order_ids))
+    if max_workers > 1 and len(order_ids) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(order_ids))) as executor:
+            return dict(executor.map(touch, order_ids))
+    return dict(touch(order_id) for order_id in order_ids)
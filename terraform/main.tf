@@ -32,6 +32,10 @@ module "sqs" {
   environment         = var.environment
   max_receive_count   = var.max_receive_count
   dlq_alarm_threshold = var.dlq_alarm_threshold
+
+  # The order queues' event source mappings require a visibility timeout of
+  # at least the fulfillment Lambda's timeout
+  order_queue_visibility_timeout_seconds = var.fulfillment_timeout_seconds
 }
 
 # Compute Module (combines lambdas and stepfunctions to resolve circular dependency)
@@ -44,9 +48,30 @@ module "compute" {
   orders_table_arn          = module.dynamodb.orders_table_arn
   failed_orders_table_name  = module.dynamodb.failed_orders_table_name
   failed_orders_table_arn   = module.dynamodb.failed_orders_table_arn
+  idempotency_table_name    = module.dynamodb.idempotency_table_name
+  idempotency_table_arn     = module.dynamodb.idempotency_table_arn
+  customer_summaries_table_name = module.dynamodb.customer_summaries_table_name
+  customer_summaries_table_arn  = module.dynamodb.customer_summaries_table_arn
+  order_outbox_table_name   = module.dynamodb.order_outbox_table_name
+  order_outbox_table_arn    = module.dynamodb.order_outbox_table_arn
+  order_outbox_stream_arn   = module.dynamodb.order_outbox_stream_arn
   order_queue_url           = module.sqs.order_queue_url
   order_queue_arn           = module.sqs.order_queue_arn
+  priority_order_queue_url  = module.sqs.priority_order_queue_url
+  priority_order_queue_arn  = module.sqs.priority_order_queue_arn
+  outbox_relay_dlq_arn      = module.sqs.outbox_relay_dlq_arn
   order_dlq_arn             = module.sqs.order_dlq_arn
+  intake_buffer_queue_url   = module.sqs.intake_buffer_queue_url
+  intake_buffer_queue_arn   = module.sqs.intake_buffer_queue_arn
+  order_pipeline_mode       = var.order_pipeline_mode
+  order_enqueue_mode        = var.order_enqueue_mode
+  priority_amount_threshold = var.priority_amount_threshold
+  fulfillment_timeout_seconds = var.fulfillment_timeout_seconds
+
+  # Longest an in-flight order goes without an updated_at stamp - one throttle
+  # requeue delay (SQS maximum, 900 s) plus the order queue's retry cycle - and
+  # a 300 s margin, so the reconciler never re-sends an order still in flight
+  reconcile_min_age_seconds = 900 + var.fulfillment_timeout_seconds * var.max_receive_count + 300
   
   depends_on = [module.dynamodb, module.sqs]
 }
@@ -120,13 +120,264 @@ resource "aws_api_gateway_integration_response" "post_order_integration_response
   depends_on = [aws_api_gateway_integration.lambda_integration]
 }
 
+# API Gateway Resource for /order/{order_id}
+resource "aws_api_gateway_resource" "order_id_resource" {
+  rest_api_id = aws_api_gateway_rest_api.dofs_api.id
+  parent_id   = aws_api_gateway_resource.order_resource.id
+  path_part   = "{order_id}"
+}
+
+# API Gateway Method for GET /order/{order_id}
+resource "aws_api_gateway_method" "get_order" {
+  rest_api_id   = aws_api_gateway_rest_api.dofs_api.id
+  resource_id   = aws_api_gateway_resource.order_id_resource.id
+  http_method   = "GET"
+  authorization = "NONE"
+
+  request_parameters = {
+    "method.request.path.order_id" = true
+  }
+}
+
+# API Gateway Integration for GET /order/{order_id}
+resource "aws_api_gateway_integration" "get_order_lambda_integration" {
+  rest_api_id = aws_api_gateway_rest_api.dofs_api.id
+  resource_id = aws_api_gateway_resource.order_id_resource.id
+  http_method = aws_api_gateway_method.get_order.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = var.api_handler_lambda_invoke_arn
+}
+
+# API Gateway Method Response for GET /order/{order_id}
+resource "aws_api_gateway_method_response" "get_order_response" {
+  rest_api_id = aws_api_gateway_rest_api.dofs_api.id
+  resource_id = aws_api_gateway_resource.order_id_resource.id
+  http_method = aws_api_gateway_method.get_order.http_method
+  status_code = "200"
+
+  response_models = {
+    "application/json" = "Empty"
+  }
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Origin" = true
+  }
+}
+
+# API Gateway Integration Response for GET /order/{order_id}
+resource "aws_api_gateway_integration_response" "get_order_integration_response" {
+  rest_api_id = aws_api_gateway_rest_api.dofs_api.id
+  resource_id = aws_api_gateway_resource.order_id_resource.id
+  http_method = aws_api_gateway_method.get_order.http_method
+  status_code = aws_api_gateway_method_response.get_order_response.status_code
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Origin" = "'*'"
+  }
+
+  depends_on = [aws_api_gateway_integration.get_order_lambda_integration]
+}
+
+# API Gateway Resource for /orders (bulk intake)
+resource "aws_api_gateway_resource" "orders_resource" {
+  rest_api_id = aws_api_gateway_rest_api.dofs_api.id
+  parent_id   = aws_api_gateway_rest_api.dofs_api.root_resource_id
+  path_part   = "orders"
+}
+
+# API Gateway Method for POST /orders
+resource "aws_api_gateway_method" "post_orders" {
+  rest_api_id   = aws_api_gateway_rest_api.dofs_api.id
+  resource_id   = aws_api_gateway_resource.orders_resource.id
+  http_method   = "POST"
+  authorization = "NONE"
+}
+
+# API Gateway Integration for POST /orders
+resource "aws_api_gateway_integration" "bulk_orders_lambda_integration" {
+  rest_api_id = aws_api_gateway_rest_api.dofs_api.id
+  resource_id = aws_api_gateway_resource.orders_resource.id
+  http_method = aws_api_gateway_method.post_orders.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = var.api_handler_lambda_invoke_arn
+}
+
+# API Gateway Method Response for POST /orders
+resource "aws_api_gateway_method_response" "post_orders_response" {
+  rest_api_id = aws_api_gateway_rest_api.dofs_api.id
+  resource_id = aws_api_gateway_resource.orders_resource.id
+  http_method = aws_api_gateway_method.post_orders.http_method
+  status_code = "200"
+
+  response_models = {
+    "application/json" = "Empty"
+  }
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Origin" = true
+  }
+}
+
+# API Gateway Integration Response for POST /orders
+resource "aws_api_gateway_integration_response" "post_orders_integration_response" {
+  rest_api_id = aws_api_gateway_rest_api.dofs_api.id
+  resource_id = aws_api_gateway_resource.orders_resource.id
+  http_method = aws_api_gateway_method.post_orders.http_method
+  status_code = aws_api_gateway_method_response.post_orders_response.status_code
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Origin" = "'*'"
+  }
+
+  depends_on = [aws_api_gateway_integration.bulk_orders_lambda_integration]
+}
+
+# API Gateway Method for GET /orders?status=...
+resource "aws_api_gateway_method" "get_orders" {
+  rest_api_id   = aws_api_gateway_rest_api.dofs_api.id
+  resource_id   = aws_api_gateway_resource.orders_resource.id
+  http_method   = "GET"
+  authorization = "NONE"
+
+  request_parameters = {
+    "method.request.querystring.status"     = true
+    "method.request.querystring.limit"      = false
+    "method.request.querystring.next_token" = false
+  }
+}
+
+# API Gateway Integration for GET /orders
+resource "aws_api_gateway_integration" "get_orders_lambda_integration" {
+  rest_api_id = aws_api_gateway_rest_api.dofs_api.id
+  resource_id = aws_api_gateway_resource.orders_resource.id
+  http_method = aws_api_gateway_method.get_orders.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = var.api_handler_lambda_invoke_arn
+}
+
+# API Gateway Method Response for GET /orders
+resource "aws_api_gateway_method_response" "get_orders_response" {
+  rest_api_id = aws_api_gateway_rest_api.dofs_api.id
+  resource_id = aws_api_gateway_resource.orders_resource.id
+  http_method = aws_api_gateway_method.get_orders.http_method
+  status_code = "200"
+
+  response_models = {
+    "application/json" = "Empty"
+  }
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Origin" = true
+  }
+}
+
+# API Gateway Integration Response for GET /orders
+resource "aws_api_gateway_integration_response" "get_orders_integration_response" {
+  rest_api_id = aws_api_gateway_rest_api.dofs_api.id
+  resource_id = aws_api_gateway_resource.orders_resource.id
+  http_method = aws_api_gateway_method.get_orders.http_method
+  status_code = aws_api_gateway_method_response.get_orders_response.status_code
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Origin" = "'*'"
+  }
+
+  depends_on = [aws_api_gateway_integration.get_orders_lambda_integration]
+}
+
+# API Gateway Resources for /customers/{customer_id}/summary
+resource "aws_api_gateway_resource" "customers_resource" {
+  rest_api_id = aws_api_gateway_rest_api.dofs_api.id
+  parent_id   = aws_api_gateway_rest_api.dofs_api.root_resource_id
+  path_part   = "customers"
+}
+
+resource "aws_api_gateway_resource" "customer_id_resource" {
+  rest_api_id = aws_api_gateway_rest_api.dofs_api.id
+  parent_id   = aws_api_gateway_resource.customers_resource.id
+  path_part   = "{customer_id}"
+}
+
+resource "aws_api_gateway_resource" "customer_summary_resource" {
+  rest_api_id = aws_api_gateway_rest_api.dofs_api.id
+  parent_id   = aws_api_gateway_resource.customer_id_resource.id
+  path_part   = "summary"
+}
+
+# API Gateway Method for GET /customers/{customer_id}/summary
+resource "aws_api_gateway_method" "get_customer_summary" {
+  rest_api_id   = aws_api_gateway_rest_api.dofs_api.id
+  resource_id   = aws_api_gateway_resource.customer_summary_resource.id
+  http_method   = "GET"
+  authorization = "NONE"
+
+  request_parameters = {
+    "method.request.path.customer_id" = true
+  }
+}
+
+# API Gateway Integration for GET /customers/{customer_id}/summary
+resource "aws_api_gateway_integration" "get_customer_summary_lambda_integration" {
+  rest_api_id = aws_api_gateway_rest_api.dofs_api.id
+  resource_id = aws_api_gateway_resource.customer_summary_resource.id
+  http_method = aws_api_gateway_method.get_customer_summary.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = var.api_handler_lambda_invoke_arn
+}
+
+# API Gateway Method Response for GET /customers/{customer_id}/summary
+resource "aws_api_gateway_method_response" "get_customer_summary_response" {
+  rest_api_id = aws_api_gateway_rest_api.dofs_api.id
+  resource_id = aws_api_gateway_resource.customer_summary_resource.id
+  http_method = aws_api_gateway_method.get_customer_summary.http_method
+  status_code = "200"
+
+  response_models = {
+    "application/json" = "Empty"
+  }
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Origin" = true
+  }
+}
+
+# API Gateway Integration Response for GET /customers/{customer_id}/summary
+resource "aws_api_gateway_integration_response" "get_customer_summary_integration_response" {
+  rest_api_id = aws_api_gateway_rest_api.dofs_api.id
+  resource_id = aws_api_gateway_resource.customer_summary_resource.id
+  http_method = aws_api_gateway_method.get_customer_summary.http_method
+  status_code = aws_api_gateway_method_response.get_customer_summary_response.status_code
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Origin" = "'*'"
+  }
+
+  depends_on = [aws_api_gateway_integration.get_customer_summary_lambda_integration]
+}
+
 # API Gateway Deployment
 resource "aws_api_gateway_deployment" "dofs_api_deployment" {
   depends_on = [
     aws_api_gateway_integration.health_lambda_integration,
     aws_api_gateway_integration_response.get_health_integration_response,
     aws_api_gateway_integration.lambda_integration,
-    aws_api_gateway_integration_response.post_order_integration_response
+    aws_api_gateway_integration_response.post_order_integration_response,
+    aws_api_gateway_integration.bulk_orders_lambda_integration,
+    aws_api_gateway_integration_response.post_orders_integration_response,
+    aws_api_gateway_integration.get_order_lambda_integration,
+    aws_api_gateway_integration_response.get_order_integration_response,
+    aws_api_gateway_integration.get_orders_lambda_integration,
+    aws_api_gateway_integration_response.get_orders_integration_response,
+    aws_api_gateway_integration.get_customer_summary_lambda_integration,
+    aws_api_gateway_integration_response.get_customer_summary_integration_response
   ]
 
   rest_api_id = aws_api_gateway_rest_api.dofs_api.id
@@ -43,12 +43,16 @@ resource "aws_iam_role_policy" "lambda_policy" {
           "dynamodb:PutItem",
           "dynamodb:UpdateItem",
           "dynamodb:DeleteItem",
+          "dynamodb:BatchWriteItem",
           "dynamodb:Query",
           "dynamodb:Scan"
         ]
         Resource = [
           var.orders_table_arn,
           var.failed_orders_table_arn,
+          var.idempotency_table_arn,
+          var.order_outbox_table_arn,
+          var.customer_summaries_table_arn,
           "${var.orders_table_arn}/*",
           "${var.failed_orders_table_arn}/*"
         ]
@@ -63,8 +67,21 @@ resource "aws_iam_role_policy" "lambda_policy" {
         ]
         Resource = [
           var.order_queue_arn,
-          var.order_dlq_arn
+          var.priority_order_queue_arn,
+          var.order_dlq_arn,
+          var.intake_buffer_queue_arn,
+          var.outbox_relay_dlq_arn
         ]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:GetRecords",
+          "dynamodb:GetShardIterator",
+          "dynamodb:DescribeStream",
+          "dynamodb:ListStreams"
+        ]
+        Resource = var.order_outbox_stream_arn
       }
     ]
   })
@@ -96,6 +113,21 @@ resource "aws_cloudwatch_log_group" "dlq_processor_logs" {
   retention_in_days = 14
 }
 
+resource "aws_cloudwatch_log_group" "intake_drainer_logs" {
+  name              = "/aws/lambda/${var.project_name}-intake-drainer-${var.environment}"
+  retention_in_days = 14
+}
+
+resource "aws_cloudwatch_log_group" "reconciler_logs" {
+  name              = "/aws/lambda/${var.project_name}-reconciler-${var.environment}"
+  retention_in_days = 14
+}
+
+resource "aws_cloudwatch_log_group" "outbox_relay_logs" {
+  name              = "/aws/lambda/${var.project_name}-outbox-relay-${var.environment}"
+  retention_in_days = 14
+}
+
 # Lambda Functions (Created First)
 
 # Validator Lambda
@@ -110,7 +142,8 @@ resource "aws_lambda_function" "validator" {
 
   environment {
     variables = {
-      ENVIRONMENT = var.environment
+      LOG_SAMPLE_RATE = var.log_sample_rate
+      ENVIRONMENT     = var.environment
     }
   }
 
@@ -138,9 +171,15 @@ resource "aws_lambda_function" "order_storage" {
 
   environment {
     variables = {
-      ORDERS_TABLE_NAME = var.orders_table_name
-      ORDER_QUEUE_URL   = var.order_queue_url
-      ENVIRONMENT       = var.environment
+      ORDERS_TABLE_NAME             = var.orders_table_name
+      ORDER_QUEUE_URL               = var.order_queue_url
+      PRIORITY_ORDER_QUEUE_URL      = var.priority_order_queue_url
+      PRIORITY_AMOUNT_THRESHOLD     = var.priority_amount_threshold
+      ORDER_ENQUEUE_MODE            = var.order_enqueue_mode
+      ORDER_OUTBOX_TABLE_NAME       = var.order_outbox_table_name
+      CUSTOMER_SUMMARIES_TABLE_NAME = var.customer_summaries_table_name
+      LOG_SAMPLE_RATE               = var.log_sample_rate
+      ENVIRONMENT                   = var.environment
     }
   }
 
@@ -246,7 +285,12 @@ resource "aws_sfn_state_machine" "order_processing" {
       StoreOrder = {
         Type     = "Task"
         Resource = aws_lambda_function.order_storage.arn
-        End      = true
+        # The execution id gives orders without an order_id a stable one across retries
+        Parameters = {
+          "order.$"        = "$.order"
+          "execution_id.$" = "$$.Execution.Id"
+        }
+        End = true
         Retry = [
           {
             ErrorEquals     = ["Lambda.ServiceException", "Lambda.AWSLambdaException", "Lambda.SdkClientException"]
@@ -319,8 +363,20 @@ resource "aws_lambda_function" "api_handler" {
 
   environment {
     variables = {
-      STEP_FUNCTION_ARN = aws_sfn_state_machine.order_processing.arn
-      ENVIRONMENT      = var.environment
+      STEP_FUNCTION_ARN             = aws_sfn_state_machine.order_processing.arn
+      ORDER_PIPELINE_MODE           = var.order_pipeline_mode
+      ORDERS_TABLE_NAME             = var.orders_table_name
+      ORDER_QUEUE_URL               = var.order_queue_url
+      PRIORITY_ORDER_QUEUE_URL      = var.priority_order_queue_url
+      PRIORITY_AMOUNT_THRESHOLD     = var.priority_amount_threshold
+      ORDER_ENQUEUE_MODE            = var.order_enqueue_mode
+      ORDER_OUTBOX_TABLE_NAME       = var.order_outbox_table_name
+      CUSTOMER_SUMMARIES_TABLE_NAME = var.customer_summaries_table_name
+      IDEMPOTENCY_TABLE_NAME        = var.idempotency_table_name
+      INTAKE_BUFFER_QUEUE_URL       = var.intake_buffer_queue_url
+      START_EXECUTION_RATE          = var.start_execution_rate
+      LOG_SAMPLE_RATE               = var.log_sample_rate
+      ENVIRONMENT                   = var.environment
     }
   }
 
@@ -345,14 +401,21 @@ resource "aws_lambda_function" "fulfillment" {
   role            = aws_iam_role.lambda_execution_role.arn
   handler         = "fulfill_order.lambda_handler"
   runtime         = "python3.9"
-  timeout         = 300
+  timeout         = var.fulfillment_timeout_seconds
   source_code_hash = filebase64sha256("${path.module}/../../../lambdas/fulfill_order/fulfill_order.zip")
 
   environment {
     variables = {
-      ORDERS_TABLE_NAME        = var.orders_table_name
-      FAILED_ORDERS_TABLE_NAME = var.failed_orders_table_name
-      ENVIRONMENT              = var.environment
+      ORDERS_TABLE_NAME             = var.orders_table_name
+      FAILED_ORDERS_TABLE_NAME      = var.failed_orders_table_name
+      CUSTOMER_SUMMARIES_TABLE_NAME = var.customer_summaries_table_name
+      ORDER_QUEUE_URL               = var.order_queue_url
+      PRIORITY_ORDER_QUEUE_URL      = var.priority_order_queue_url
+      PRIORITY_AMOUNT_THRESHOLD     = var.priority_amount_threshold
+      FULFILLMENT_CONCURRENCY       = var.fulfillment_concurrency
+      FULFILLMENT_PROVIDER          = var.fulfillment_provider
+      LOG_SAMPLE_RATE               = var.log_sample_rate
+      ENVIRONMENT                   = var.environment
     }
   }
 
@@ -380,8 +443,10 @@ resource "aws_lambda_function" "dlq_processor" {
 
   environment {
     variables = {
-      FAILED_ORDERS_TABLE_NAME = var.failed_orders_table_name
-      ENVIRONMENT              = var.environment
+      FAILED_ORDERS_TABLE_NAME  = var.failed_orders_table_name
+      PRIORITY_AMOUNT_THRESHOLD = var.priority_amount_threshold
+      LOG_SAMPLE_RATE           = var.log_sample_rate
+      ENVIRONMENT               = var.environment
     }
   }
 
@@ -397,20 +462,213 @@ resource "aws_lambda_function" "dlq_processor" {
   }
 }
 
-# SQS Event Source Mapping for Fulfillment Lambda
+# Intake Drainer Lambda - starts buffered orders' executions at a sustainable rate
+resource "aws_lambda_function" "intake_drainer" {
+  filename         = "${path.module}/../../../lambdas/intake_drainer/intake_drainer.zip"
+  function_name    = "${var.project_name}-intake-drainer-${var.environment}"
+  role            = aws_iam_role.lambda_execution_role.arn
+  handler         = "intake_drainer.lambda_handler"
+  runtime         = "python3.9"
+  timeout         = 60
+  source_code_hash = filebase64sha256("${path.module}/../../../lambdas/intake_drainer/intake_drainer.zip")
+
+  environment {
+    variables = {
+      STEP_FUNCTION_ARN          = aws_sfn_state_machine.order_processing.arn
+      DRAIN_START_EXECUTION_RATE = var.drain_start_execution_rate
+      LOG_SAMPLE_RATE            = var.log_sample_rate
+      ENVIRONMENT                = var.environment
+    }
+  }
+
+  depends_on = [
+    aws_iam_role_policy.lambda_policy,
+    aws_iam_role_policy.api_handler_stepfunction_policy,
+    aws_cloudwatch_log_group.intake_drainer_logs,
+    aws_sfn_state_machine.order_processing
+  ]
+
+  tags = {
+    Name        = "${var.project_name}-intake-drainer-${var.environment}"
+    Environment = var.environment
+    Project     = var.project_name
+  }
+}
+
+# Reconciler Lambda - re-enqueues orders stuck in PENDING / FAILED
+resource "aws_lambda_function" "reconciler" {
+  filename         = "${path.module}/../../../lambdas/reconciler/reconciler.zip"
+  function_name    = "${var.project_name}-reconciler-${var.environment}"
+  role            = aws_iam_role.lambda_execution_role.arn
+  handler         = "reconciler.lambda_handler"
+  runtime         = "python3.9"
+  timeout         = 300
+  source_code_hash = filebase64sha256("${path.module}/../../../lambdas/reconciler/reconciler.zip")
+
+  environment {
+    variables = {
+      ORDERS_TABLE_NAME         = var.orders_table_name
+      ORDER_QUEUE_URL           = var.order_queue_url
+      PRIORITY_ORDER_QUEUE_URL  = var.priority_order_queue_url
+      PRIORITY_AMOUNT_THRESHOLD = var.priority_amount_threshold
+      RECONCILE_MIN_AGE_SECONDS = var.reconcile_min_age_seconds
+      RECONCILE_MAX_ORDERS      = var.reconcile_max_orders
+      LOG_SAMPLE_RATE           = var.log_sample_rate
+      ENVIRONMENT               = var.environment
+    }
+  }
+
+  depends_on = [
+    aws_iam_role_policy.lambda_policy,
+    aws_cloudwatch_log_group.reconciler_logs
+  ]
+
+  tags = {
+    Name        = "${var.project_name}-reconciler-${var.environment}"
+    Environment = var.environment
+    Project     = var.project_name
+  }
+}
+
+# Outbox Relay Lambda - sends order outbox entries to their lanes' order queues
+resource "aws_lambda_function" "outbox_relay" {
+  filename         = "${path.module}/../../../lambdas/outbox_relay/outbox_relay.zip"
+  function_name    = "${var.project_name}-outbox-relay-${var.environment}"
+  role            = aws_iam_role.lambda_execution_role.arn
+  handler         = "outbox_relay.lambda_handler"
+  runtime         = "python3.9"
+  timeout         = 60
+  source_code_hash = filebase64sha256("${path.module}/../../../lambdas/outbox_relay/outbox_relay.zip")
+
+  environment {
+    variables = {
+      ORDER_QUEUE_URL          = var.order_queue_url
+      PRIORITY_ORDER_QUEUE_URL = var.priority_order_queue_url
+      LOG_SAMPLE_RATE          = var.log_sample_rate
+      ENVIRONMENT              = var.environment
+    }
+  }
+
+  depends_on = [
+    aws_iam_role_policy.lambda_policy,
+    aws_cloudwatch_log_group.outbox_relay_logs
+  ]
+
+  tags = {
+    Name        = "${var.project_name}-outbox-relay-${var.environment}"
+    Environment = var.environment
+    Project     = var.project_name
+  }
+}
+
+# Schedule for the Reconciler Lambda
+resource "aws_cloudwatch_event_rule" "reconciler_schedule" {
+  name                = "${var.project_name}-reconciler-${var.environment}"
+  description         = "Re-enqueue orders stuck in PENDING or FAILED"
+  schedule_expression = var.reconcile_schedule
+}
+
+resource "aws_cloudwatch_event_target" "reconciler" {
+  rule = aws_cloudwatch_event_rule.reconciler_schedule.name
+  arn  = aws_lambda_function.reconciler.arn
+}
+
+resource "aws_lambda_permission" "reconciler_schedule" {
+  statement_id  = "AllowEventBridgeInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.reconciler.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.reconciler_schedule.arn
+}
+
+# SQS Event Source Mapping for Fulfillment Lambda - standard lane (bulk orders)
 resource "aws_lambda_event_source_mapping" "sqs_trigger" {
-  event_source_arn = var.order_queue_arn
-  function_name    = aws_lambda_function.fulfillment.arn
-  batch_size       = 1
+  event_source_arn                   = var.order_queue_arn
+  function_name                      = aws_lambda_function.fulfillment.arn
+  batch_size                         = var.fulfillment_batch_size
+  maximum_batching_window_in_seconds = var.fulfillment_batching_window_seconds
+  function_response_types            = ["ReportBatchItemFailures"]
+
+  dynamic "scaling_config" {
+    for_each = var.fulfillment_max_concurrency == null ? [] : [var.fulfillment_max_concurrency]
+    content {
+      maximum_concurrency = scaling_config.value
+    }
+  }
   
   depends_on = [aws_lambda_function.fulfillment]
 }
 
+# SQS Event Source Mapping for Fulfillment Lambda - priority lane: small
+# batches with no batching window, and concurrency of its own so a backlog
+# in the order queue never holds it up
+resource "aws_lambda_event_source_mapping" "priority_sqs_trigger" {
+  event_source_arn                   = var.priority_order_queue_arn
+  function_name                      = aws_lambda_function.fulfillment.arn
+  batch_size                         = var.priority_fulfillment_batch_size
+  maximum_batching_window_in_seconds = var.priority_fulfillment_batching_window_seconds
+  function_response_types            = ["ReportBatchItemFailures"]
+
+  scaling_config {
+    maximum_concurrency = var.priority_fulfillment_max_concurrency
+  }
+
+  depends_on = [aws_lambda_function.fulfillment]
+}
+
 # SQS Event Source Mapping for DLQ Processor Lambda
 resource "aws_lambda_event_source_mapping" "dlq_trigger" {
-  event_source_arn = var.order_dlq_arn
-  function_name    = aws_lambda_function.dlq_processor.arn
-  batch_size       = 1
+  event_source_arn                   = var.order_dlq_arn
+  function_name                      = aws_lambda_function.dlq_processor.arn
+  batch_size                         = var.dlq_batch_size
+  maximum_batching_window_in_seconds = var.dlq_batching_window_seconds
+  function_response_types            = ["ReportBatchItemFailures"]
   
   depends_on = [aws_lambda_function.dlq_processor]
 }
+
+# SQS Event Source Mapping for Intake Drainer Lambda - maximum concurrency
+# times DRAIN_START_EXECUTION_RATE is the drain rate into the workflow
+resource "aws_lambda_event_source_mapping" "intake_buffer_trigger" {
+  event_source_arn        = var.intake_buffer_queue_arn
+  function_name           = aws_lambda_function.intake_drainer.arn
+  batch_size              = var.intake_drainer_batch_size
+  function_response_types = ["ReportBatchItemFailures"]
+
+  scaling_config {
+    maximum_concurrency = var.intake_drainer_max_concurrency
+  }
+
+  depends_on = [aws_lambda_function.intake_drainer]
+}
+
+# DynamoDB Stream Event Source Mapping for Outbox Relay Lambda - new outbox
+# entries only (TTL deletions are filtered out). Retries are bounded by count
+# and record age, failing batches are bisected to isolate a poison entry, and
+# batches given up on go to the outbox relay DLQ - so one bad entry can't
+# hold up its shard until stream retention runs out
+resource "aws_lambda_event_source_mapping" "outbox_stream_trigger" {
+  event_source_arn                   = var.order_outbox_stream_arn
+  function_name                      = aws_lambda_function.outbox_relay.arn
+  starting_position                  = "TRIM_HORIZON"
+  batch_size                         = var.outbox_relay_batch_size
+  maximum_batching_window_in_seconds = var.outbox_relay_batching_window_seconds
+  function_response_types            = ["ReportBatchItemFailures"]
+  maximum_retry_attempts             = var.outbox_relay_maximum_retry_attempts
+  maximum_record_age_in_seconds      = var.outbox_relay_maximum_record_age_seconds
+  bisect_batch_on_function_error     = true
+
+  destination_config {
+    on_failure {
+      destination_arn = var.outbox_relay_dlq_arn
+    }
+  }
+
+  filter_criteria {
+    filter {
+      pattern = jsonencode({ eventName = ["INSERT"] })
+    }
+  }
+
+  depends_on = [aws_lambda_function.outbox_relay]
+}
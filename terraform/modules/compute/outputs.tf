@@ -69,3 +69,23 @@ output "step_function_role_arn" {
   description = "ARN of the Step Function execution role"
   value       = aws_iam_role.step_function_role.arn
 }
+
+output "intake_drainer_function_name" {
+  description = "Name of the intake drainer Lambda function"
+  value       = aws_lambda_function.intake_drainer.function_name
+}
+
+output "intake_drainer_function_arn" {
+  description = "ARN of the intake drainer Lambda function"
+  value       = aws_lambda_function.intake_drainer.arn
+}
+
+output "reconciler_function_name" {
+  description = "Name of the reconciler Lambda function"
+  value       = aws_lambda_function.reconciler.function_name
+}
+
+output "outbox_relay_function_name" {
+  description = "Name of the outbox relay Lambda function"
+  value       = aws_lambda_function.outbox_relay.function_name
+}
@@ -30,6 +30,41 @@ variable "failed_orders_table_arn" {
   type        = string
 }
 
+variable "idempotency_table_name" {
+  description = "Name of the idempotency keys DynamoDB table"
+  type        = string
+}
+
+variable "idempotency_table_arn" {
+  description = "ARN of the idempotency keys DynamoDB table"
+  type        = string
+}
+
+variable "customer_summaries_table_name" {
+  description = "Name of the customer summaries DynamoDB table"
+  type        = string
+}
+
+variable "customer_summaries_table_arn" {
+  description = "ARN of the customer summaries DynamoDB table"
+  type        = string
+}
+
+variable "order_outbox_table_name" {
+  description = "Name of the order outbox DynamoDB table"
+  type        = string
+}
+
+variable "order_outbox_table_arn" {
+  description = "ARN of the order outbox DynamoDB table"
+  type        = string
+}
+
+variable "order_outbox_stream_arn" {
+  description = "Stream ARN of the order outbox DynamoDB table"
+  type        = string
+}
+
 variable "order_queue_url" {
   description = "URL of the order SQS queue"
   type        = string
@@ -40,7 +75,198 @@ variable "order_queue_arn" {
   type        = string
 }
 
+variable "priority_order_queue_url" {
+  description = "URL of the priority order SQS queue"
+  type        = string
+}
+
+variable "priority_order_queue_arn" {
+  description = "ARN of the priority order SQS queue"
+  type        = string
+}
+
 variable "order_dlq_arn" {
   description = "ARN of the order DLQ"
   type        = string
 }
+
+variable "intake_buffer_queue_url" {
+  description = "URL of the intake buffer SQS queue"
+  type        = string
+}
+
+variable "intake_buffer_queue_arn" {
+  description = "ARN of the intake buffer SQS queue"
+  type        = string
+}
+
+variable "fulfillment_batch_size" {
+  description = "Maximum number of SQS records delivered to the fulfillment Lambda per invocation"
+  type        = number
+  default     = 10
+}
+
+variable "fulfillment_batching_window_seconds" {
+  description = "Maximum time to gather records before invoking the fulfillment Lambda"
+  type        = number
+  default     = 1
+}
+
+variable "fulfillment_max_concurrency" {
+  description = "Maximum concurrent fulfillment invocations for the order queue (2-1000, null = unbounded); bounds bulk orders so the priority lane keeps headroom"
+  type        = number
+  default     = null
+}
+
+variable "priority_fulfillment_batch_size" {
+  description = "Maximum number of priority queue records per fulfillment invocation"
+  type        = number
+  default     = 1
+}
+
+variable "priority_fulfillment_batching_window_seconds" {
+  description = "Maximum time to gather priority queue records before invoking the fulfillment Lambda"
+  type        = number
+  default     = 0
+}
+
+variable "priority_fulfillment_max_concurrency" {
+  description = "Maximum concurrent fulfillment invocations for the priority queue (2-1000)"
+  type        = number
+  default     = 10
+}
+
+variable "priority_amount_threshold" {
+  description = "total_amount from which an order goes to the priority queue (0 = by shipping_method only)"
+  type        = number
+  default     = 500
+}
+
+variable "dlq_batch_size" {
+  description = "Maximum number of DLQ records delivered to the DLQ processor Lambda per invocation"
+  type        = number
+  default     = 25
+}
+
+variable "dlq_batching_window_seconds" {
+  description = "Maximum time to gather DLQ records before invoking the DLQ processor Lambda"
+  type        = number
+  default     = 5
+}
+
+variable "order_pipeline_mode" {
+  description = "How api_handler processes orders: stepfunctions (workflow) or direct (in-process validation and storage)"
+  type        = string
+  default     = "stepfunctions"
+
+  validation {
+    condition     = contains(["stepfunctions", "direct"], var.order_pipeline_mode)
+    error_message = "order_pipeline_mode must be stepfunctions or direct."
+  }
+}
+
+variable "order_enqueue_mode" {
+  description = "How stored orders reach the order queue: send (SendMessage after the write) or outbox (written with the order, sent by the outbox relay)"
+  type        = string
+  default     = "send"
+
+  validation {
+    condition     = contains(["send", "outbox"], var.order_enqueue_mode)
+    error_message = "order_enqueue_mode must be send or outbox."
+  }
+}
+
+variable "outbox_relay_batch_size" {
+  description = "Maximum outbox stream records per outbox relay invocation"
+  type        = number
+  default     = 100
+}
+
+variable "outbox_relay_batching_window_seconds" {
+  description = "Seconds the outbox stream event source mapping waits to fill a batch"
+  type        = number
+  default     = 1
+}
+
+variable "outbox_relay_maximum_retry_attempts" {
+  description = "Retries of a failing outbox stream batch before it goes to the outbox relay DLQ"
+  type        = number
+  default     = 10
+}
+
+variable "outbox_relay_maximum_record_age_seconds" {
+  description = "Age after which outbox stream records go to the outbox relay DLQ unprocessed (60-604800)"
+  type        = number
+  default     = 3600
+}
+
+variable "outbox_relay_dlq_arn" {
+  description = "ARN of the outbox relay DLQ (outbox stream mapping on-failure destination)"
+  type        = string
+}
+
+variable "fulfillment_concurrency" {
+  description = "Records of an SQS batch the fulfillment Lambda processes concurrently (1 = sequential)"
+  type        = number
+  default     = 10
+}
+
+variable "fulfillment_provider" {
+  description = "Fulfillment backend: simulated, or <module>:<factory> packaged with the fulfillment Lambda"
+  type        = string
+  default     = "simulated"
+}
+
+variable "log_sample_rate" {
+  description = "Fraction of Lambda invocations whose INFO events are logged (warnings, errors and the per-invocation summary always are)"
+  type        = number
+  default     = 1
+}
+
+variable "reconcile_schedule" {
+  description = "EventBridge schedule expression for the reconciler Lambda"
+  type        = string
+  default     = "rate(5 minutes)"
+}
+
+variable "reconcile_min_age_seconds" {
+  description = "Time without an update after which a PENDING or FAILED order is re-enqueued by the reconciler; must exceed the longest throttle requeue delay (900 s) plus the order queue's retry cycle (visibility timeout x max receive count)"
+  type        = number
+  default     = 2100
+}
+
+variable "fulfillment_timeout_seconds" {
+  description = "Fulfillment Lambda timeout; the order queues' visibility timeout is set from it"
+  type        = number
+  default     = 300
+}
+
+variable "reconcile_max_orders" {
+  description = "Orders the reconciler re-enqueues per run at most"
+  type        = number
+  default     = 1000
+}
+
+variable "start_execution_rate" {
+  description = "StartExecution calls per second per api_handler container before orders are buffered (halved on throttling, recovers gradually)"
+  type        = number
+  default     = 25
+}
+
+variable "drain_start_execution_rate" {
+  description = "StartExecution calls per second per intake drainer container"
+  type        = number
+  default     = 10
+}
+
+variable "intake_drainer_batch_size" {
+  description = "Maximum number of buffered orders delivered to the intake drainer Lambda per invocation"
+  type        = number
+  default     = 10
+}
+
+variable "intake_drainer_max_concurrency" {
+  description = "Maximum concurrent intake drainer invocations (2-1000); with drain_start_execution_rate this sets the drain rate"
+  type        = number
+  default     = 2
+}
@@ -12,13 +12,37 @@ resource "aws_dynamodb_table" "orders" {
   }
 
   attribute {
-    name = "status"
+    name = "status_shard"
     type = "S"
   }
 
+  attribute {
+    name = "created_at"
+    type = "S"
+  }
+
+  attribute {
+    name = "customer_id"
+    type = "S"
+  }
+
+  # Write-sharded status index: status_shard is "<status>#<shard>" (shard =
+  # hash of order_id), so PENDING / FULFILLED writes spread over
+  # ORDER_STATUS_SHARDS partitions; readers scatter-gather all shards.
+  # Orders stored before it have no status_shard until
+  # scripts/backfill_index_keys.py has run
   global_secondary_index {
-    name            = "status-index"
-    hash_key        = "status"
+    name            = "status-shard-index"
+    hash_key        = "status_shard"
+    range_key       = "created_at"
+    projection_type = "ALL"
+  }
+
+  # Every order of a customer, oldest first - one Query instead of a scan
+  global_secondary_index {
+    name            = "customer-created-index"
+    hash_key        = "customer_id"
+    range_key       = "created_at"
     projection_type = "ALL"
   }
 
@@ -40,14 +64,22 @@ resource "aws_dynamodb_table" "failed_orders" {
     type = "S"
   }
 
+  attribute {
+    name = "failed_date"
+    type = "S"
+  }
+
   attribute {
     name = "failed_at"
     type = "S"
   }
 
+  # Failed orders bucketed by UTC day, sorted by failure time - a time range
+  # is one BETWEEN query per day
   global_secondary_index {
-    name            = "failed-at-index"
-    hash_key        = "failed_at"
+    name            = "failed-date-index"
+    hash_key        = "failed_date"
+    range_key       = "failed_at"
     projection_type = "ALL"
   }
 
@@ -57,3 +89,71 @@ resource "aws_dynamodb_table" "failed_orders" {
     Project     = var.project_name
   }
 }
+
+# Idempotency Keys Table (Idempotency-Key header on POST /order and /orders)
+resource "aws_dynamodb_table" "idempotency_keys" {
+  name           = "${var.project_name}-idempotency-keys-${var.environment}"
+  billing_mode   = "PAY_PER_REQUEST"
+  hash_key       = "idempotency_key"
+
+  attribute {
+    name = "idempotency_key"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = {
+    Name        = "${var.project_name}-idempotency-keys-${var.environment}"
+    Environment = var.environment
+    Project     = var.project_name
+  }
+}
+
+# Customer Summaries Table - one incrementally maintained aggregate per
+# customer (GET /customers/{customer_id}/summary)
+resource "aws_dynamodb_table" "customer_summaries" {
+  name           = "${var.project_name}-customer-summaries-${var.environment}"
+  billing_mode   = "PAY_PER_REQUEST"
+  hash_key       = "customer_id"
+
+  attribute {
+    name = "customer_id"
+    type = "S"
+  }
+
+  tags = {
+    Name        = "${var.project_name}-customer-summaries-${var.environment}"
+    Environment = var.environment
+    Project     = var.project_name
+  }
+}
+
+# Order Outbox Table (ORDER_ENQUEUE_MODE=outbox) - each entry is written with
+# its order in one transaction; the stream feeds the outbox relay Lambda
+resource "aws_dynamodb_table" "order_outbox" {
+  name             = "${var.project_name}-order-outbox-${var.environment}"
+  billing_mode     = "PAY_PER_REQUEST"
+  hash_key         = "order_id"
+  stream_enabled   = true
+  stream_view_type = "NEW_IMAGE"
+
+  attribute {
+    name = "order_id"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = {
+    Name        = "${var.project_name}-order-outbox-${var.environment}"
+    Environment = var.environment
+    Project     = var.project_name
+  }
+}
@@ -17,3 +17,38 @@ output "failed_orders_table_arn" {
   description = "ARN of the failed orders DynamoDB table"
   value       = aws_dynamodb_table.failed_orders.arn
 }
+
+output "idempotency_table_name" {
+  description = "Name of the idempotency keys DynamoDB table"
+  value       = aws_dynamodb_table.idempotency_keys.name
+}
+
+output "idempotency_table_arn" {
+  description = "ARN of the idempotency keys DynamoDB table"
+  value       = aws_dynamodb_table.idempotency_keys.arn
+}
+
+output "customer_summaries_table_name" {
+  description = "Name of the customer summaries DynamoDB table"
+  value       = aws_dynamodb_table.customer_summaries.name
+}
+
+output "customer_summaries_table_arn" {
+  description = "ARN of the customer summaries DynamoDB table"
+  value       = aws_dynamodb_table.customer_summaries.arn
+}
+
+output "order_outbox_table_name" {
+  description = "Name of the order outbox DynamoDB table"
+  value       = aws_dynamodb_table.order_outbox.name
+}
+
+output "order_outbox_table_arn" {
+  description = "ARN of the order outbox DynamoDB table"
+  value       = aws_dynamodb_table.order_outbox.arn
+}
+
+output "order_outbox_stream_arn" {
+  description = "Stream ARN of the order outbox DynamoDB table"
+  value       = aws_dynamodb_table.order_outbox.stream_arn
+}
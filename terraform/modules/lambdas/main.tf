@@ -42,6 +42,7 @@ resource "aws_iam_role_policy" "lambda_policy" {
           "dynamodb:PutItem",
           "dynamodb:UpdateItem",
           "dynamodb:DeleteItem",
+          "dynamodb:BatchWriteItem",
           "dynamodb:Query",
           "dynamodb:Scan"
         ]
@@ -227,18 +228,22 @@ resource "aws_lambda_function" "fulfillment" {
 
 # SQS Event Source Mapping for Fulfillment Lambda
 resource "aws_lambda_event_source_mapping" "sqs_trigger" {
-  event_source_arn = var.order_queue_arn
-  function_name    = aws_lambda_function.fulfillment.arn
-  batch_size       = 1
-  enabled          = true
+  event_source_arn                   = var.order_queue_arn
+  function_name                      = aws_lambda_function.fulfillment.arn
+  batch_size                         = var.fulfillment_batch_size
+  maximum_batching_window_in_seconds = var.fulfillment_batching_window_seconds
+  function_response_types            = ["ReportBatchItemFailures"]
+  enabled                            = true
 }
 
 # SQS Event Source Mapping for DLQ Processor Lambda
 resource "aws_lambda_event_source_mapping" "dlq_trigger" {
-  event_source_arn = var.order_dlq_arn
-  function_name    = aws_lambda_function.dlq_processor.arn
-  batch_size       = 1
-  enabled          = true
+  event_source_arn                   = var.order_dlq_arn
+  function_name                      = aws_lambda_function.dlq_processor.arn
+  batch_size                         = var.dlq_batch_size
+  maximum_batching_window_in_seconds = var.dlq_batching_window_seconds
+  function_response_types            = ["ReportBatchItemFailures"]
+  enabled                            = true
 }
 
 # CloudWatch Log Groups
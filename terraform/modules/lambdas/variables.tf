@@ -55,3 +55,27 @@ variable "dlq_alert_sns_topic_arn" {
   type        = string
   default     = ""
 }
+
+variable "fulfillment_batch_size" {
+  description = "Maximum number of SQS records delivered to the fulfillment Lambda per invocation"
+  type        = number
+  default     = 10
+}
+
+variable "fulfillment_batching_window_seconds" {
+  description = "Maximum time to gather records before invoking the fulfillment Lambda"
+  type        = number
+  default     = 1
+}
+
+variable "dlq_batch_size" {
+  description = "Maximum number of DLQ records delivered to the DLQ processor Lambda per invocation"
+  type        = number
+  default     = 25
+}
+
+variable "dlq_batching_window_seconds" {
+  description = "Maximum time to gather DLQ records before invoking the DLQ processor Lambda"
+  type        = number
+  default     = 5
+}
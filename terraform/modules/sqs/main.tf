@@ -18,7 +18,7 @@ resource "aws_sqs_queue" "order_queue" {
   max_message_size          = 262144
   message_retention_seconds = 1209600
   receive_wait_time_seconds = 0
-  visibility_timeout_seconds = 30
+  visibility_timeout_seconds = var.order_queue_visibility_timeout_seconds
 
   redrive_policy = jsonencode({
     deadLetterTargetArn = aws_sqs_queue.order_dlq.arn
@@ -32,6 +32,78 @@ resource "aws_sqs_queue" "order_queue" {
   }
 }
 
+# Priority Order Queue - expedited and high-value orders (dofs_core.lanes),
+# fulfilled through their own event source mapping so bulk orders in the main
+# queue never delay them; shares the main queue's DLQ
+resource "aws_sqs_queue" "priority_order_queue" {
+  name                      = "${var.project_name}-priority-order-queue-${var.environment}"
+  delay_seconds             = 0
+  max_message_size          = 262144
+  message_retention_seconds = 1209600
+  receive_wait_time_seconds = 0
+  visibility_timeout_seconds = var.order_queue_visibility_timeout_seconds
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.order_dlq.arn
+    maxReceiveCount     = var.max_receive_count
+  })
+
+  tags = {
+    Name        = "${var.project_name}-priority-order-queue-${var.environment}"
+    Environment = var.environment
+    Project     = var.project_name
+  }
+}
+
+# Intake Buffer Dead Letter Queue - buffered orders the drainer could not
+# start; api_handler already answered 202, so scripts/redrive_intake_buffer.py
+# moves them back to the intake buffer
+resource "aws_sqs_queue" "intake_buffer_dlq" {
+  name                      = "${var.project_name}-intake-buffer-dlq-${var.environment}"
+  message_retention_seconds = 1209600
+
+  tags = {
+    Name        = "${var.project_name}-intake-buffer-dlq-${var.environment}"
+    Environment = var.environment
+    Project     = var.project_name
+  }
+}
+
+# Intake Buffer Queue - orders api_handler could not start under backpressure,
+# drained into the workflow by the intake drainer Lambda
+resource "aws_sqs_queue" "intake_buffer_queue" {
+  name                      = "${var.project_name}-intake-buffer-${var.environment}"
+  delay_seconds             = 0
+  max_message_size          = 262144
+  message_retention_seconds = 1209600
+  receive_wait_time_seconds = 0
+  visibility_timeout_seconds = var.intake_buffer_visibility_timeout_seconds
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.intake_buffer_dlq.arn
+    maxReceiveCount     = var.intake_buffer_max_receive_count
+  })
+
+  tags = {
+    Name        = "${var.project_name}-intake-buffer-${var.environment}"
+    Environment = var.environment
+    Project     = var.project_name
+  }
+}
+
+# Outbox Relay DLQ - on-failure destination of the outbox stream mapping:
+# details of stream batches the relay gave up on (shard and sequence range)
+resource "aws_sqs_queue" "outbox_relay_dlq" {
+  name                      = "${var.project_name}-outbox-relay-dlq-${var.environment}"
+  message_retention_seconds = 1209600
+
+  tags = {
+    Name        = "${var.project_name}-outbox-relay-dlq-${var.environment}"
+    Environment = var.environment
+    Project     = var.project_name
+  }
+}
+
 # CloudWatch Alarm for DLQ depth
 resource "aws_cloudwatch_metric_alarm" "dlq_alarm" {
   alarm_name          = "${var.project_name}-dlq-depth-${var.environment}"
@@ -55,3 +127,53 @@ resource "aws_cloudwatch_metric_alarm" "dlq_alarm" {
     Project     = var.project_name
   }
 }
+
+# CloudWatch Alarm for the outbox relay DLQ - any message means outbox
+# entries were skipped; their orders stay PENDING until the reconciler runs
+resource "aws_cloudwatch_metric_alarm" "outbox_relay_dlq_alarm" {
+  alarm_name          = "${var.project_name}-outbox-relay-dlq-depth-${var.environment}"
+  comparison_operator = "GreaterThanThreshold"
+  evaluation_periods  = "1"
+  metric_name         = "ApproximateNumberOfMessagesVisible"
+  namespace           = "AWS/SQS"
+  period              = "60"
+  statistic           = "Maximum"
+  threshold           = 0
+  alarm_description   = "Outbox stream batches the relay gave up on"
+  alarm_actions       = var.sns_topic_arn != "" ? [var.sns_topic_arn] : []
+
+  dimensions = {
+    QueueName = aws_sqs_queue.outbox_relay_dlq.name
+  }
+
+  tags = {
+    Name        = "${var.project_name}-outbox-relay-dlq-alarm-${var.environment}"
+    Environment = var.environment
+    Project     = var.project_name
+  }
+}
+
+# CloudWatch Alarm for the intake buffer DLQ - any message is an accepted
+# order that has no workflow execution yet
+resource "aws_cloudwatch_metric_alarm" "intake_buffer_dlq_alarm" {
+  alarm_name          = "${var.project_name}-intake-buffer-dlq-depth-${var.environment}"
+  comparison_operator = "GreaterThanThreshold"
+  evaluation_periods  = "1"
+  metric_name         = "ApproximateNumberOfMessagesVisible"
+  namespace           = "AWS/SQS"
+  period              = "60"
+  statistic           = "Maximum"
+  threshold           = 0
+  alarm_description   = "Buffered orders the intake drainer could not start"
+  alarm_actions       = var.sns_topic_arn != "" ? [var.sns_topic_arn] : []
+
+  dimensions = {
+    QueueName = aws_sqs_queue.intake_buffer_dlq.name
+  }
+
+  tags = {
+    Name        = "${var.project_name}-intake-buffer-dlq-alarm-${var.environment}"
+    Environment = var.environment
+    Project     = var.project_name
+  }
+}
@@ -13,6 +13,16 @@ output "order_queue_name" {
   value       = aws_sqs_queue.order_queue.name
 }
 
+output "priority_order_queue_url" {
+  description = "URL of the priority order SQS queue"
+  value       = aws_sqs_queue.priority_order_queue.url
+}
+
+output "priority_order_queue_arn" {
+  description = "ARN of the priority order SQS queue"
+  value       = aws_sqs_queue.priority_order_queue.arn
+}
+
 output "order_dlq_url" {
   description = "URL of the order DLQ"
   value       = aws_sqs_queue.order_dlq.url
@@ -27,3 +37,33 @@ output "order_dlq_name" {
   description = "Name of the order DLQ"
   value       = aws_sqs_queue.order_dlq.name
 }
+
+output "intake_buffer_queue_url" {
+  description = "URL of the intake buffer SQS queue"
+  value       = aws_sqs_queue.intake_buffer_queue.url
+}
+
+output "intake_buffer_queue_arn" {
+  description = "ARN of the intake buffer SQS queue"
+  value       = aws_sqs_queue.intake_buffer_queue.arn
+}
+
+output "intake_buffer_dlq_url" {
+  description = "URL of the intake buffer DLQ"
+  value       = aws_sqs_queue.intake_buffer_dlq.url
+}
+
+output "intake_buffer_dlq_arn" {
+  description = "ARN of the intake buffer DLQ"
+  value       = aws_sqs_queue.intake_buffer_dlq.arn
+}
+
+output "outbox_relay_dlq_url" {
+  description = "URL of the outbox relay DLQ"
+  value       = aws_sqs_queue.outbox_relay_dlq.url
+}
+
+output "outbox_relay_dlq_arn" {
+  description = "ARN of the outbox relay DLQ (outbox stream mapping on-failure destination)"
+  value       = aws_sqs_queue.outbox_relay_dlq.arn
+}
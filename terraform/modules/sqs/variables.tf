@@ -16,6 +16,24 @@ variable "max_receive_count" {
   default     = 3
 }
 
+variable "order_queue_visibility_timeout_seconds" {
+  description = "Visibility timeout of the order and priority order queues - at least the fulfillment Lambda timeout, which their event source mappings require"
+  type        = number
+  default     = 300
+}
+
+variable "intake_buffer_max_receive_count" {
+  description = "Deliveries of a buffered order (each deferred by backpressure) before it moves to the intake buffer DLQ"
+  type        = number
+  default     = 20
+}
+
+variable "intake_buffer_visibility_timeout_seconds" {
+  description = "Visibility timeout of the intake buffer queue - at least the intake drainer Lambda timeout"
+  type        = number
+  default     = 120
+}
+
 variable "dlq_alarm_threshold" {
   description = "Threshold for DLQ depth alarm"
   type        = number
@@ -12,6 +12,9 @@ output "lambda_function_names" {
     order_storage = module.compute.order_storage_function_name
     fulfillment = module.compute.fulfillment_function_name
     dlq_processor = module.compute.dlq_processor_function_name
+    intake_drainer = module.compute.intake_drainer_function_name
+    reconciler = module.compute.reconciler_function_name
+    outbox_relay = module.compute.outbox_relay_function_name
   }
 }
 
@@ -20,6 +23,8 @@ output "dynamodb_table_names" {
   value       = {
     orders = module.dynamodb.orders_table_name
     failed_orders = module.dynamodb.failed_orders_table_name
+    order_outbox = module.dynamodb.order_outbox_table_name
+    customer_summaries = module.dynamodb.customer_summaries_table_name
   }
 }
 
@@ -27,7 +32,11 @@ output "sqs_queue_urls" {
   description = "SQS queue URLs"
   value       = {
     order_queue = module.sqs.order_queue_url
+    priority_order_queue = module.sqs.priority_order_queue_url
     order_dlq = module.sqs.order_dlq_url
+    intake_buffer = module.sqs.intake_buffer_queue_url
+    intake_buffer_dlq = module.sqs.intake_buffer_dlq_url
+    outbox_relay_dlq = module.sqs.outbox_relay_dlq_url
   }
 }
 
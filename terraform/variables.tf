@@ -29,6 +29,30 @@ variable "dlq_alarm_threshold" {
   default     = 5
 }
 
+variable "order_pipeline_mode" {
+  description = "How api_handler processes orders: stepfunctions (workflow) or direct (in-process validation and storage)"
+  type        = string
+  default     = "stepfunctions"
+}
+
+variable "fulfillment_timeout_seconds" {
+  description = "Fulfillment Lambda timeout - also the visibility timeout of the order queues it reads"
+  type        = number
+  default     = 300
+}
+
+variable "order_enqueue_mode" {
+  description = "How stored orders reach the order queue: send (SendMessage after the write) or outbox (transactional outbox + relay)"
+  type        = string
+  default     = "send"
+}
+
+variable "priority_amount_threshold" {
+  description = "total_amount from which an order goes to the priority fulfillment lane (0 = by shipping_method only)"
+  type        = number
+  default     = 500
+}
+
 variable "tags" {
   description = "Common tags for all resources"
   type        = map(string)